@@ -1,21 +1,56 @@
+import asyncio
 import json
 import logging
 import os
 import threading
 import time
-from datetime import datetime
-from typing import Any, Dict, List
-
-from fastapi import APIRouter, Depends, Query
+from datetime import datetime, timedelta
+from typing import Any, AsyncGenerator, Dict, Iterator, List, Optional
+
+import anyio
+from fastapi import APIRouter, Body, Depends, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.config import Config
+from app.core.db_log_writer import exec_log_to_dict
+from app.core.failure_journal import failure_journal
+from app.core.job_archive import job_archiver, restore_jobs, search_archive
+from app.core.job_bulk import bulk_create, bulk_delete, bulk_update
+from app.core.job_counters import job_state_counters
+from app.core.job_logger import read_job_log_records
+from app.core.job_purger import job_purger
+from app.core.job_query import (
+    SORT_FIELDS,
+    apply_job_filters,
+    apply_keyset,
+    job_count_cache,
+    list_jobs_page,
+)
+from app.core.job_stats import job_stats
+from app.core.job_transfer import JobImporter, iter_job_records, iter_stream_lines
+from app.core.log_export import iter_export_records, iter_gzip, iter_ndjson
+from app.core.log_policy import log_sampler
+from app.core.log_pubsub import (
+    ALL_JOBS_TOPIC,
+    SYSTEM_TOPIC,
+    job_topic,
+    log_broker,
+    system_log_follower,
+)
+from app.core.log_tail import read_since, tail_lines
+from app.core.metrics_store import metrics_store
+from app.core.query_stats import query_metrics
 from app.core.scheduler import add_job_to_scheduler, remove_job, run_job, scheduler
-from app.deps import SessionLocal, get_db
+from app.deps import SessionLocal, get_async_db, get_db, get_read_db
 from app.function.registry import hot_reload
 from app.middlewares.ip_control import ip_control
 from app.models.base import error_response, paginated_response, success_response
 from app.models.job import Job
+from app.models.log import JobExecLog
 from app.models.schemas import JobCreate, JobResponse, JobUpdate
 
 router = APIRouter(prefix="/jobs", tags=["任务管理"])
@@ -44,6 +79,8 @@ def add_job(job: JobCreate, db: Session = Depends(get_db)) -> Dict[str, Any]:
     db.add(db_job)
     db.commit()
     db.refresh(db_job)
+    job_count_cache.invalidate()
+    job_state_counters.adjust(None, db_job.state)
     add_job_to_scheduler(db_job)
     return success_response(data={"id": db_job.id}, msg="任务创建成功")
 
@@ -85,10 +122,13 @@ def edit_job(
             break
     
     # 更新数据库中的任务
+    old_state = db_job.state
     for k, v in update_data.items():
         setattr(db_job, k, v)
     db.commit()
     db.refresh(db_job)
+    job_count_cache.invalidate()
+    job_state_counters.adjust(old_state, db_job.state)
     
     # 只有在调度相关字段变更时才更新调度器
     if update_scheduler and db_job.state != 2:  # 不是停止状态才更新调度器
@@ -116,12 +156,230 @@ def delete_job(
     db_job = db.query(Job).filter(Job.id == id).first()
     if not db_job:
         return error_response(code=404, msg="任务不存在")
+    old_state = db_job.state
+    # 执行日志由数据库级联删除，日志目录交给后台清理，接口立即返回
     db.delete(db_job)
     db.commit()
+    job_count_cache.invalidate()
+    job_state_counters.adjust(old_state, None)
     remove_job(id)
+    job_stats.forget(id)
+    log_sampler.forget(id)
+    job_purger.purge([id])
     return success_response(msg="任务删除成功")
 
 
+# 批量创建任务
+@router.post(
+    "/bulk/add",
+    summary="批量创建任务",
+    description="一次创建多个任务：逐条校验，有效条目在一个事务内批量写入并批量加入调度器",
+    response_description="成功/失败数量和逐条结果",
+    status_code=200,
+)
+def bulk_add_jobs(
+    items: List[Dict[str, Any]] = Body(..., description="任务列表，字段同 /jobs/add"),
+    atomic: bool = Query(False, description="任一条目无效时整批不写入"),
+    db: Session = Depends(get_db),
+) -> Dict[str, Any]:
+    """
+    批量创建任务
+
+    - **items**: 任务数组（请求体），每项字段同 /jobs/add
+    - **atomic**: 为 true 时任一条目无效则全部不创建
+    """
+    if len(items) > Config.JOB_BULK_MAX_ITEMS:
+        return error_response(code=400, msg=f"单次最多 {Config.JOB_BULK_MAX_ITEMS} 条")
+    return success_response(data=bulk_create(db, items, atomic), msg="批量创建完成")
+
+
+# 批量更新任务
+@router.post(
+    "/bulk/edit",
+    summary="批量更新任务",
+    description="一次更新多个任务：逐条校验，有效条目在一个事务内批量更新，调度变更批量生效",
+    response_description="成功/失败数量和逐条结果",
+    status_code=200,
+)
+def bulk_edit_jobs(
+    items: List[Dict[str, Any]] = Body(..., description="更新列表，每项包含 id 和要更新的字段"),
+    atomic: bool = Query(False, description="任一条目无效或任务不存在时整批不写入"),
+    db: Session = Depends(get_db),
+) -> Dict[str, Any]:
+    """
+    批量更新任务
+
+    - **items**: 更新数组（请求体），如 [{"id": 1, "state": 2}, {"id": 2, "cron_expr": "*/5 * * * *"}]
+    - **atomic**: 为 true 时任一条目无效则全部不更新
+    """
+    if len(items) > Config.JOB_BULK_MAX_ITEMS:
+        return error_response(code=400, msg=f"单次最多 {Config.JOB_BULK_MAX_ITEMS} 条")
+    return success_response(data=bulk_update(db, items, atomic), msg="批量更新完成")
+
+
+# 批量删除任务
+@router.post(
+    "/bulk/del",
+    summary="批量删除任务",
+    description="一次删除多个任务及其执行日志，并批量移出调度器",
+    response_description="成功/失败数量和逐条结果",
+    status_code=200,
+)
+def bulk_delete_jobs(
+    ids: List[Any] = Body(..., description="任务ID数组"),
+    db: Session = Depends(get_db),
+) -> Dict[str, Any]:
+    """
+    批量删除任务
+
+    - **ids**: 任务ID数组（请求体），如 [1, 2, 3]
+    """
+    if len(ids) > Config.JOB_BULK_MAX_ITEMS:
+        return error_response(code=400, msg=f"单次最多 {Config.JOB_BULK_MAX_ITEMS} 条")
+    return success_response(data=bulk_delete(db, ids), msg="批量删除完成")
+
+
+# 导出任务
+@router.get(
+    "/export",
+    summary="导出任务",
+    description="以NDJSON流式导出全部任务（含状态、执行次数和时间戳），用于迁移到其他环境",
+    response_description="NDJSON数据流（每行一个任务）",
+    status_code=200,
+)
+def export_jobs(db: Session = Depends(get_read_db)) -> Any:
+    """
+    导出任务
+
+    每行一个任务的完整字段，可直接用 /jobs/import 或 cli.py import 导入
+    """
+    filename = f"jobs_{datetime.now():%Y%m%d%H%M%S}.ndjson"
+    return StreamingResponse(
+        iter_ndjson(iter_job_records(db)),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+# 导入任务
+@router.post(
+    "/import",
+    summary="导入任务",
+    description="逐行读取上传的NDJSON（/jobs/export 的格式），按任务ID更新或插入，分批提交并批量注册调度",
+    response_description="插入、更新、失败数量和错误行",
+    status_code=200,
+)
+def import_jobs(
+    request: Request,
+    batch: int = Query(1000, description="每批提交的条数", ge=1, le=10000),
+    db: Session = Depends(get_db),
+) -> Dict[str, Any]:
+    """
+    导入任务
+
+    - 请求体为NDJSON，如 curl --data-binary @jobs.ndjson
+    - **batch**: 每批提交的条数（默认1000）
+    """
+    importer = JobImporter(db, batch)
+    importer.feed_lines(iter_stream_lines(_iter_request_body(request)))
+    return success_response(data=importer.finish(), msg="任务导入完成")
+
+
+def _iter_request_body(request: Request) -> Iterator[bytes]:
+    """在同步接口（线程池）中逐块读取请求体，不把整个请求体读入内存"""
+    chunks = request.stream()
+
+    async def next_chunk() -> bytes:
+        return await chunks.__anext__()
+
+    while True:
+        try:
+            yield anyio.from_thread.run(next_chunk)
+        except StopAsyncIteration:
+            return
+
+
+# 归档任务列表
+@router.get(
+    "/archive/list",
+    summary="搜索归档任务",
+    description="按归档时间倒序搜索已归档的任务，键集翻页",
+    response_description="归档任务列表和下一页游标",
+    status_code=200,
+)
+def list_archived_jobs(
+    cursor: Optional[int] = Query(None, description="翻页游标：传上一页返回的next_cursor"),
+    size: int = Query(20, description="每页数量", ge=1, le=100),
+    name: str = Query("", description="任务名称前缀"),
+    tag: str = Query("", description="任务标签"),
+    mode: Optional[str] = Query(None, description="执行模式"),
+    job_id: Optional[int] = Query(None, description="归档前的任务ID"),
+    db: Session = Depends(get_read_db),
+) -> Dict[str, Any]:
+    """
+    搜索归档任务
+
+    - **cursor** / **size**: 键集翻页，返回 {items, next_cursor}
+    - **name** / **tag** / **mode** / **job_id**: 过滤条件
+    """
+    items, next_cursor = search_archive(db, name, tag, mode, job_id, cursor, size)
+    return success_response(
+        data={"items": items, "next_cursor": next_cursor}, msg="获取归档任务成功"
+    )
+
+
+# 恢复归档任务
+@router.post(
+    "/archive/restore",
+    summary="恢复归档任务",
+    description="把归档任务移回任务表，原任务ID未被占用时沿用，非停止状态的任务重新加入调度器",
+    response_description="恢复的任务ID和不存在的归档ID",
+    status_code=200,
+)
+def restore_archived_jobs(
+    ids: List[int] = Body(..., description="归档ID数组（/jobs/archive/list 返回的 id）"),
+    db: Session = Depends(get_db),
+) -> Dict[str, Any]:
+    """
+    恢复归档任务
+
+    - **ids**: 归档ID数组（请求体），如 [1, 2, 3]
+    """
+    if len(ids) > Config.JOB_BULK_MAX_ITEMS:
+        return error_response(code=400, msg=f"单次最多 {Config.JOB_BULK_MAX_ITEMS} 条")
+    return success_response(data=restore_jobs(db, ids), msg="归档任务恢复完成")
+
+
+# 立即归档休眠任务
+@router.post(
+    "/archive/run",
+    summary="立即归档休眠任务",
+    description="立即执行一轮归档：停止或已达最大执行次数、且超过指定天数未更新的任务移到归档表，"
+    "其执行记录、日志、执行指标和失败记录随之删除",
+    response_description="归档的任务数",
+    status_code=200,
+)
+def run_archive(
+    days: Optional[int] = Query(
+        None, description="未更新天数，默认 JOB_ARCHIVE_AFTER_DAYS", ge=0
+    ),
+    purge_history: bool = Query(False, description="确认删除归档任务的执行历史"),
+    db: Session = Depends(get_db),
+) -> Dict[str, Any]:
+    """
+    立即归档休眠任务
+
+    - **days**: 超过该天数未更新才归档（查询参数）
+    - **purge_history**: 归档只保留任务定义，须传 true 确认删除执行历史
+    """
+    if not purge_history:
+        return error_response(
+            code=400, msg="归档会删除任务的执行记录和日志，确认后传 purge_history=true"
+        )
+    archived = job_archiver.run_once(db, after_days=days)
+    return success_response(data={"archived": archived}, msg=f"已归档 {archived} 个任务")
+
+
 # 任务列表
 @router.get(
     "/list",
@@ -130,38 +388,74 @@ def delete_job(
     response_description="任务列表和总数",
     status_code=200,
 )
-def list_jobs(
+async def list_jobs(
     page: int = Query(1, description="页码", ge=1),
     size: int = Query(10, description="每页数量", ge=1, le=100),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(
+        None, description="键集翻页游标：首页传空字符串，之后传上一页返回的next_cursor"
+    ),
+    sort: str = Query("id", description="排序：id / -id / updated_at / -updated_at"),
+    state: Optional[int] = Query(None, description="任务状态（0=等待, 1=运行, 2=停止）"),
+    mode: Optional[str] = Query(None, description="执行模式"),
+    trigger_type: Optional[str] = Query(None, description="触发器类型（cron/interval）"),
+    name: str = Query("", description="任务名称前缀"),
+    tag: str = Query("", description="任务标签"),
+    with_total: bool = Query(True, description="是否返回总数（总数有短时缓存）"),
+    db: AsyncSession = Depends(get_async_db),
 ) -> Dict[str, Any]:
     """
     获取任务列表
 
     - **page**: 页码（默认1）
     - **size**: 每页数量（默认10，最大100）
+    - **cursor**: 传入时使用键集翻页，返回 {items, next_cursor, total}，深页不变慢
+    - **sort**: 排序字段，前缀 - 表示倒序
+    - **state** / **mode** / **trigger_type** / **name** / **tag**: 过滤条件
+    - **with_total**: 为 false 时不统计总数
     """
-    q = db.query(Job)
-    total = q.count()
-    jobs = q.offset((page - 1) * size).limit(size).all()
-
-    job_list = [
-        {
-            "id": j.id,
-            "name": j.name,
-            "cron_expr": j.cron_expr,
-            "mode": j.mode,
-            "command": j.command,
-            "state": j.state,
-        }
-        for j in jobs
-    ]
+    if sort not in SORT_FIELDS:
+        return error_response(code=400, msg=f"排序字段错误，支持：{', '.join(SORT_FIELDS)}")
+    q = apply_job_filters(select(Job), state, mode, trigger_type, name, tag)
+    count_key = (state, mode, trigger_type, name, tag)
+
+    if cursor is not None:
+        try:
+            jobs, next_cursor = await list_jobs_page(db, q, sort, cursor, size)
+        except ValueError as e:
+            return error_response(code=400, msg=str(e))
+        total = await job_count_cache.count(db, q, count_key) if with_total else None
+        return success_response(
+            data={
+                "items": [_job_list_item(j) for j in jobs],
+                "next_cursor": next_cursor,
+                "total": total,
+            },
+            msg="获取任务列表成功",
+        )
+
+    total = await job_count_cache.count(db, q, count_key) if with_total else 0
+    jobs = (await db.scalars(apply_keyset(q, sort, None).offset((page - 1) * size).limit(size))).all()
+
+    job_list = [_job_list_item(j) for j in jobs]
 
     return paginated_response(
         data=job_list, total=total, page=page, page_size=size, msg="获取任务列表成功"
     )
 
 
+def _job_list_item(j: Job) -> Dict[str, Any]:
+    return {
+        "id": j.id,
+        "name": j.name,
+        "cron_expr": j.cron_expr,
+        "mode": j.mode,
+        "command": j.command,
+        "state": j.state,
+        "trigger_type": j.trigger_type,
+        "tags": j.tags,
+    }
+
+
 # 任务详情
 @router.get(
     "/read",
@@ -170,15 +464,15 @@ def list_jobs(
     response_description="任务的完整信息",
     status_code=200,
 )
-def job_detail(
-    id: int = Query(..., description="任务ID", ge=1), db: Session = Depends(get_db)
+async def job_detail(
+    id: int = Query(..., description="任务ID", ge=1), db: AsyncSession = Depends(get_async_db)
 ) -> Dict[str, Any]:
     """
     获取任务详情
 
     - **id**: 任务ID（查询参数）
     """
-    job = db.query(Job).filter(Job.id == id).first()
+    job = await db.get(Job, id)
     if not job:
         return error_response(code=404, msg="任务不存在")
     return success_response(data=JobResponse.model_validate(job), msg="获取任务详情成功")
@@ -231,8 +525,11 @@ def stop_job(
     job = db.query(Job).filter(Job.id == id).first()
     if not job:
         return error_response(code=404, msg="任务不存在")
+    old_state = job.state
     setattr(job, "state", 2)
     db.commit()
+    job_count_cache.invalidate()
+    job_state_counters.adjust(old_state, 2)
     remove_job(id)
     return success_response(msg="任务已停止")
 
@@ -261,6 +558,7 @@ def restart_job(
         return error_response(code=404, msg="任务不存在")
     
     # 设为运行中
+    old_state = job.state
     setattr(job, "state", 1)
     
     # 根据参数决定是否重置执行次数
@@ -269,6 +567,8 @@ def restart_job(
     
     db.commit()
     db.refresh(job)
+    job_count_cache.invalidate()
+    job_state_counters.adjust(old_state, 1)
     add_job_to_scheduler(job)
     return success_response(msg="任务已重启")
 
@@ -313,10 +613,14 @@ def stop_all_jobs(db: Session = Depends(get_db)) -> Dict[str, Any]:
     停止所有正在运行或等待中的任务
     """
     jobs = db.query(Job).filter(Job.state.in_([0, 1])).all()
+    old_states = [job.state for job in jobs]
     for job in jobs:
         setattr(job, "state", 2)
         remove_job(job.id)
     db.commit()
+    job_count_cache.invalidate()
+    for old_state in old_states:
+        job_state_counters.adjust(old_state, 2)
     return success_response(msg="所有任务已停止")
 
 
@@ -328,18 +632,20 @@ def stop_all_jobs(db: Session = Depends(get_db)) -> Dict[str, Any]:
     response_description="任务状态统计",
     status_code=200,
 )
-def job_state(db: Session = Depends(get_db)) -> Dict[str, Any]:
+async def job_state(db: AsyncSession = Depends(get_async_db)) -> Dict[str, Any]:
     """
     获取任务状态统计
 
     获取任务总数、运行中、已停止的统计信息
     """
-    total = db.query(Job).count()
-    running = db.query(Job).filter(Job.state == 1).count()
-    stopped = db.query(Job).filter(Job.state == 2).count()
+    counts = await job_state_counters.summary(db)
 
     return success_response(
-        data={"total": total, "running": running, "stopped": stopped},
+        data={
+            "total": counts["total"],
+            "running": counts["running"],
+            "stopped": counts["stopped"],
+        },
         msg="获取任务状态统计成功",
     )
 
@@ -393,12 +699,12 @@ def calibrate_jobs() -> Dict[str, Any]:
     response_description="任务执行日志列表",
     status_code=200,
 )
-def job_logs(
+async def job_logs(
     id: int = Query(..., description="任务ID", ge=1),
     limit: int = Query(10, description="每页数量", ge=1, le=100),
     page: int = Query(1, description="页码", ge=1),
     date: str = Query("", description="日期过滤（格式：YYYY-MM-DD）"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ) -> Dict[str, Any]:
     """
     获取任务执行日志
@@ -408,65 +714,183 @@ def job_logs(
     - **page**: 页码（默认1）
     - **date**: 日期过滤（可选，格式：YYYY-MM-DD）
     """
-    # 从文件读取日志
-    return get_job_logs_from_file(id, limit, page, date)
+    if Config.JOB_LOG_STORAGE == "db":
+        return await get_job_logs_from_db(db, id, limit, page, date)
+    # 从文件读取日志（文件IO放到线程池）
+    return await run_in_threadpool(get_job_logs_from_file, id, limit, page, date)
+
+
+async def get_job_logs_from_db(
+    db: AsyncSession, job_id: int, limit: int, page: int, date: str
+) -> Dict[str, Any]:
+    """从 job_exec_logs 表读取任务日志（走 job_id + created_at 索引）"""
+    if not date:
+        date = datetime.now().strftime("%Y-%m-%d")
+    try:
+        day_start = datetime.strptime(date[:10], "%Y-%m-%d")
+    except ValueError:
+        return error_response(msg="日期格式错误，应为YYYY-MM-DD")
+    day_end = day_start + timedelta(days=1)
+
+    conditions = (
+        JobExecLog.job_id == job_id,
+        JobExecLog.created_at >= day_start,
+        JobExecLog.created_at < day_end,
+    )
+    total = await db.scalar(select(func.count(JobExecLog.id)).where(*conditions)) or 0
+    rows = (
+        await db.scalars(
+            select(JobExecLog)
+            .where(*conditions)
+            .order_by(JobExecLog.created_at.desc(), JobExecLog.id.desc())
+            .offset((page - 1) * limit)
+            .limit(limit)
+        )
+    ).all()
+    return paginated_response(
+        data=[exec_log_to_dict(row) for row in rows],
+        total=total,
+        page=page,
+        page_size=limit,
+        msg="获取任务执行日志成功",
+    )
 
 
 def get_job_logs_from_file(
     job_id: int, limit: int, page: int, date: str
 ) -> Dict[str, Any]:
-    """从文件读取任务日志"""
+    """从文件读取任务日志（JSON日志与二进制日志段）"""
     # 如果date为空，默认当天
     if not date:
         date = datetime.now().strftime("%Y-%m-%d")
 
-    # 构建日志文件路径，年月合并
-    year = date[:4]
-    month = date[5:7]
-    day = date[8:10]
-    year_month = f"{year}{month}"
-    log_file = f"runtime/jobs/{job_id}/{year_month}/{day}.log"
-
-    logs = []
+    logs: List[Dict[str, Any]] = []
     total = 0
 
     try:
-        if os.path.exists(log_file):
-            with open(log_file, "r", encoding="utf-8") as f:
-                lines = f.readlines()
-                total = len(lines)
-
-                # 解析JSON日志
-                for line in lines:
-                    line = line.strip()
-                    if line:
-                        try:
-                            log_entry = json.loads(line)
-                            logs.append(log_entry)
-                        except json.JSONDecodeError:
-                            continue
-
-                # 按时间倒序排列（最新的在前）
-                logs.reverse()
-
-                # 分页处理
-                start = (page - 1) * limit
-                end = start + limit
-                logs = logs[start:end]
-        else:
-            # 文件不存在，返回空结果
-            logs = []
-            total = 0
+        logs = read_job_log_records(job_id, date)
+        total = len(logs)
+
+        # 按时间倒序排列（最新的在前）
+        logs.reverse()
 
+        # 分页处理
+        start = (page - 1) * limit
+        end = start + limit
+        logs = logs[start:end]
     except Exception:
         # 处理异常
-        pass
+        logs = []
 
     return paginated_response(
         data=logs, total=total, page=page, page_size=limit, msg="获取任务执行日志成功"
     )
 
 
+# 批量导出任务日志
+@router.get(
+    "/logs/export",
+    summary="批量导出任务日志",
+    description="以NDJSON流式导出多个任务在日期范围内的执行日志，可选gzip压缩",
+    response_description="NDJSON数据流（每行一条执行记录）",
+    status_code=200,
+)
+def export_job_logs(
+    ids: str = Query("", description="任务ID列表（逗号分隔），不传导出所有任务"),
+    start: str = Query(..., description="开始日期（YYYY-MM-DD）"),
+    end: str = Query("", description="结束日期（YYYY-MM-DD，含当天），默认与开始日期相同"),
+    gzip: bool = Query(False, description="是否gzip压缩"),
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    批量导出任务日志
+
+    - **ids**: 任务ID列表，如 1,2,3（可选）
+    - **start** / **end**: 日期范围（最长366天）
+    - **gzip**: 是否gzip压缩（文件名 job_logs.ndjson.gz）
+    """
+    try:
+        job_ids = [int(i) for i in ids.split(",") if i.strip()] or None
+    except ValueError:
+        return error_response(msg="任务ID列表格式错误")
+    try:
+        start_day = datetime.strptime(start, "%Y-%m-%d").date()
+        end_day = datetime.strptime(end, "%Y-%m-%d").date() if end else start_day
+    except ValueError:
+        return error_response(msg="日期格式错误，应为YYYY-MM-DD")
+    if end_day < start_day or (end_day - start_day).days >= 366:
+        return error_response(msg="日期范围错误，结束日期不能早于开始日期且最长366天")
+
+    chunks = iter_ndjson(iter_export_records(db, job_ids, start_day, end_day))
+    filename = f"job_logs_{start_day:%Y%m%d}_{end_day:%Y%m%d}.ndjson"
+    if gzip:
+        return StreamingResponse(
+            iter_gzip(chunks),
+            media_type="application/gzip",
+            headers={"Content-Disposition": f'attachment; filename="{filename}.gz"'},
+        )
+    return StreamingResponse(
+        chunks,
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+# 实时日志推送（SSE）
+@router.get(
+    "/logs/stream",
+    summary="实时推送任务日志",
+    description="以Server-Sent Events推送任务执行记录或系统日志新增行",
+    response_description="text/event-stream 事件流",
+    status_code=200,
+)
+async def job_logs_stream(
+    id: Optional[int] = Query(None, description="任务ID，不传则推送所有任务", ge=1),
+    source: str = Query("job", description="日志来源：job=任务执行记录, system=系统日志", pattern="^(job|system)$"),
+) -> StreamingResponse:
+    """
+    实时推送日志
+
+    - **id**: 任务ID（可选，不传则推送所有任务的执行记录）
+    - **source**: job=任务执行记录，system=跟随系统日志
+    """
+    if source == "system":
+        topic = SYSTEM_TOPIC
+    else:
+        topic = job_topic(id) if id else ALL_JOBS_TOPIC
+
+    async def event_stream() -> AsyncGenerator[str, None]:
+        subscription = log_broker.subscribe(topic)
+        if source == "system":
+            system_log_follower.acquire()
+        try:
+            yield ": connected\n\n"
+            while True:
+                try:
+                    item = await asyncio.wait_for(
+                        subscription.queue.get(), timeout=Config.LOG_STREAM_KEEPALIVE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if item is None:
+                    # 消费过慢被断开
+                    yield "event: dropped\ndata: {}\n\n"
+                    break
+                event = "system" if source == "system" else "log"
+                yield f"event: {event}\ndata: {json.dumps(item, ensure_ascii=False)}\n\n"
+        finally:
+            log_broker.unsubscribe(subscription)
+            if source == "system":
+                system_log_follower.release()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # 系统日志（读取最近N行日志文件）
 @router.get(
     "/zapLogs",
@@ -475,20 +899,26 @@ def get_job_logs_from_file(
     response_description="系统日志内容",
     status_code=200,
 )
-def zap_logs(n: int = Query(100, description="读取行数", ge=1, le=1000)) -> Dict[str, Any]:
+def zap_logs(
+    n: int = Query(100, description="读取行数", ge=1, le=1000),
+    since_offset: Optional[int] = Query(None, description="增量读取起始偏移（上次返回的offset）", ge=0),
+    grep: str = Query("", description="只返回包含该内容的行"),
+) -> Dict[str, Any]:
     """
     获取系统日志
 
     - **n**: 读取行数（默认100，最大1000）
+    - **since_offset**: 增量轮询游标，传入上次返回的 offset 只读取新增内容
+    - **grep**: 过滤条件，只返回包含该字符串的行
     """
     log_path = os.getenv("SYSTEM_LOG_PATH", "./runtime/system.log")
     if not os.path.exists(log_path):
         return error_response(msg="日志文件不存在", code=404)
-    lines = []
-    with open(log_path, "r", encoding="utf-8", errors="ignore") as f:
-        for line in f.readlines()[-n:]:
-            lines.append(line.rstrip())
-    return success_response(data={"lines": lines}, msg="获取系统日志成功")
+    if since_offset is None:
+        lines, offset = tail_lines(log_path, n, grep)
+    else:
+        lines, offset = read_since(log_path, since_offset, n, grep)
+    return success_response(data={"lines": lines, "offset": offset}, msg="获取系统日志成功")
 
 
 # 日志开关状态（示例：返回True/False）
@@ -517,17 +947,133 @@ def log_switch_state() -> Dict[str, Any]:
     response_description="系统状态统计",
     status_code=200,
 )
-def job_status(db: Session = Depends(get_db)) -> Dict[str, int]:
+async def job_status(db: AsyncSession = Depends(get_async_db)) -> Dict[str, int]:
     """
     获取系统状态
 
     返回系统整体状态统计信息
     """
-    total = db.query(Job).count()
-    running = db.query(Job).filter(Job.state == 1).count()
-    waiting = db.query(Job).filter(Job.state == 0).count()
-    stopped = db.query(Job).filter(Job.state == 2).count()
-    return {"total": total, "running": running, "waiting": waiting, "stopped": stopped}
+    return await job_state_counters.summary(db)
+
+
+# 任务执行统计
+@router.get(
+    "/stats",
+    summary="获取任务执行统计",
+    description="获取任务在最近时间窗口内的执行次数、成功率和耗时分位数（p50/p95/p99）",
+    response_description="任务执行统计",
+    status_code=200,
+)
+def job_stats_api(
+    id: Optional[int] = Query(None, description="任务ID，不传返回所有任务", ge=1),
+    window: int = Query(3600, description="统计时间窗口（秒）", ge=1, le=30 * 86400),
+) -> Dict[str, Any]:
+    """
+    获取任务执行统计
+
+    - **id**: 任务ID（可选）
+    - **window**: 统计时间窗口（秒，默认3600）
+
+    只统计最近 JOB_STATS_WINDOW_SIZE 次执行：truncated 为 true 时窗口早于缓冲区中最早的
+    记录（covered_since），结果只覆盖 covered_since 之后的执行
+    """
+    if id is None:
+        return success_response(data=job_stats.all_summaries(window), msg="获取任务执行统计成功")
+    stats = job_stats.summary(id, window)
+    if stats is None:
+        return error_response(code=404, msg="暂无该任务的执行统计")
+    return success_response(data=stats, msg="获取任务执行统计成功")
+
+
+# SQL查询统计
+@router.get(
+    "/queryStats",
+    summary="获取SQL查询统计",
+    description="按接口路由和任务汇总的SQL查询次数与耗时，按查询总耗时降序",
+    response_description="SQL查询统计",
+    status_code=200,
+)
+def query_stats_api(
+    key: Optional[str] = Query(None, description="只返回包含该字符串的项，如 /jobs/list 或 job:1"),
+    reset: bool = Query(False, description="返回后清空统计"),
+) -> Dict[str, Any]:
+    """
+    获取SQL查询统计
+
+    - **key**: 过滤条件（可选）
+    - **reset**: 返回后清空统计
+    """
+    items = query_metrics.snapshot()
+    if key:
+        items = [item for item in items if key in item["key"]]
+    if reset:
+        query_metrics.reset()
+    return success_response(data=items, msg="获取SQL查询统计成功")
+
+
+# 最近失败记录（所有任务）
+@router.get(
+    "/failures",
+    summary="查询最近失败记录",
+    description="按时间倒序查询所有任务的失败执行，支持游标翻页和按任务、模式、错误内容、标签过滤",
+    response_description="失败记录列表和下一页游标",
+    status_code=200,
+)
+def job_failures(
+    limit: int = Query(50, description="每页数量", ge=1, le=500),
+    cursor: Optional[int] = Query(None, description="翻页游标（上一页返回的next_cursor）", ge=1),
+    id: Optional[int] = Query(None, description="任务ID", ge=1),
+    mode: Optional[str] = Query(None, description="任务模式（command/http/function）"),
+    q: str = Query("", description="错误信息包含的内容"),
+    tag: str = Query("", description="任务标签"),
+    minutes: Optional[int] = Query(None, description="只查询最近N分钟", ge=1),
+) -> Dict[str, Any]:
+    """
+    查询最近失败记录
+
+    - **limit**: 每页数量（默认50）
+    - **cursor**: 翻页游标，不传从最新开始
+    - **id** / **mode** / **q** / **tag**: 过滤条件
+    - **minutes**: 时间范围，如 15 表示最近15分钟
+    """
+    since = time.time() - minutes * 60 if minutes else None
+    data = failure_journal.query(limit, cursor, id, mode, q, tag, since)
+    return success_response(data=data, msg="获取失败记录成功")
+
+
+# 任务执行指标（时序）
+@router.get(
+    "/metrics",
+    summary="查询任务执行指标",
+    description="按时间桶聚合任务的执行次数、失败率和耗时分位数，可按任务或模式过滤",
+    response_description="按时间桶聚合的执行指标",
+    status_code=200,
+)
+def job_metrics(
+    id: Optional[int] = Query(None, description="任务ID，不传统计所有任务", ge=1),
+    mode: Optional[str] = Query(None, description="任务模式（command/http/function）"),
+    start: Optional[datetime] = Query(None, description="开始时间，默认结束时间前1小时"),
+    end: Optional[datetime] = Query(None, description="结束时间，默认当前时间"),
+    bucket: int = Query(60, description="时间桶大小（秒）", ge=1, le=86400),
+) -> Dict[str, Any]:
+    """
+    查询任务执行指标
+
+    - **id**: 任务ID（可选）
+    - **mode**: 任务模式（可选）
+    - **start** / **end**: 时间范围，如 2024-01-01T00:00:00
+    - **bucket**: 时间桶大小（秒，默认60即每分钟）
+    """
+    if not metrics_store.available:
+        return error_response(code=501, msg="未安装 numpy，执行指标不可用")
+    end = end or datetime.now()
+    start = start or end - timedelta(hours=1)
+    if start >= end:
+        return error_response(code=400, msg="开始时间必须早于结束时间")
+    if (end - start).total_seconds() / bucket > 10000:
+        return error_response(code=400, msg="时间桶数量过多，请增大 bucket 或缩小时间范围")
+    data = metrics_store.query(start, end, bucket, id, mode)
+    return success_response(data=data, msg="获取任务执行指标成功")
 
 
 # 获取所有可用函数（示例返回）
@@ -736,6 +1282,8 @@ def add_and_run_job(
         db.add(db_job)
         db.commit()
         db.refresh(db_job)
+        job_count_cache.invalidate()
+        job_state_counters.adjust(None, db_job.state)
 
         # 异步执行任务
         def execute_and_cleanup() -> None:
@@ -752,14 +1300,20 @@ def add_and_run_job(
                     if remove_task:
                         cleanup_job = cleanup_db.query(Job).filter(Job.id == db_job.id).first()
                         if cleanup_job:
+                            old_state = cleanup_job.state
                             cleanup_db.delete(cleanup_job)
                             cleanup_db.commit()
+                            job_count_cache.invalidate()
+                            job_state_counters.adjust(old_state, None)
                     else:
                         # 如果不删除任务，则将其设置为停止状态
                         cleanup_job = cleanup_db.query(Job).filter(Job.id == db_job.id).first()
                         if cleanup_job:
+                            old_state = cleanup_job.state
                             cleanup_job.state = 2  # 设置为停止状态
                             cleanup_db.commit()
+                            job_count_cache.invalidate()
+                            job_state_counters.adjust(old_state, 2)
 
                 # 根据参数决定是否删除日志
                 if remove_log:
@@ -800,7 +1354,7 @@ def add_and_run_job(
 @router.post(
     "/createLogCleaner",
     summary="创建日志清理任务",
-    description="创建一个每10秒执行一次的日志清理任务，清理日志中的特定字段",
+    description="创建一个每10秒执行一次的日志清理任务，按保留策略删除过期日志",
     response_description="日志清理任务创建成功",
     status_code=200,
 )
@@ -808,12 +1362,12 @@ def create_log_cleaner_task(db: Session = Depends(get_db)) -> Dict[str, Any]:
     """
     创建日志清理任务
 
-    创建一个shell命令任务，每10秒执行一次，清理日志文件中的特定字段
+    创建一个shell命令任务，每10秒执行一次，按 LOG_DAYS / JOB_LOG_KEEP_COUNT 删除过期日志
     """
     # 创建日志清理任务
     log_cleaner_job = Job(
         name="日志清理任务",
-        desc="每10秒清理日志文件中的exit_code、http_status、func_name、func_args字段",
+        desc="每10秒按日志保留策略删除过期的任务日志",
         cron_expr="*/10 * * * * *",  # 每10秒执行一次
         mode="command",
         command="python scripts/log_cleaner.py",
@@ -825,6 +1379,8 @@ def create_log_cleaner_task(db: Session = Depends(get_db)) -> Dict[str, Any]:
     db.add(log_cleaner_job)
     db.commit()
     db.refresh(log_cleaner_job)
+    job_count_cache.invalidate()
+    job_state_counters.adjust(None, log_cleaner_job.state)
     add_job_to_scheduler(log_cleaner_job)
 
     return success_response(
@@ -867,6 +1423,8 @@ def create_backup_task(db: Session = Depends(get_db)) -> Dict[str, Any]:
     db.add(backup_job)
     db.commit()
     db.refresh(backup_job)
+    job_count_cache.invalidate()
+    job_state_counters.adjust(None, backup_job.state)
     add_job_to_scheduler(backup_job)
 
     return success_response(
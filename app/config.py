@@ -42,6 +42,43 @@ class Config:
     DATABASE_SQLITE_MAXIDLECONNS: Final[int] = int(
         os.getenv("DATABASE_SQLITE_MAXIDLECONNS", "5")
     )
+    # SQLite生产配置：WAL（读写并发）、同步级别、锁等待（毫秒）、内存映射和页缓存（MB）
+    DATABASE_SQLITE_WAL: Final[bool] = os.getenv("DATABASE_SQLITE_WAL", "true").lower() == "true"
+    DATABASE_SQLITE_SYNCHRONOUS: Final[str] = os.getenv(
+        "DATABASE_SQLITE_SYNCHRONOUS", "NORMAL"
+    ).upper()
+    DATABASE_SQLITE_BUSY_TIMEOUT_MS: Final[int] = int(
+        os.getenv("DATABASE_SQLITE_BUSY_TIMEOUT_MS", "5000")
+    )
+    DATABASE_SQLITE_MMAP_SIZE_MB: Final[int] = int(os.getenv("DATABASE_SQLITE_MMAP_SIZE_MB", "256"))
+    DATABASE_SQLITE_CACHE_SIZE_MB: Final[int] = int(
+        os.getenv("DATABASE_SQLITE_CACHE_SIZE_MB", "64")
+    )
+    # 后台写入（执行次数、db日志）经单写连接队列串行提交，避免 database is locked
+    DATABASE_SQLITE_WRITE_QUEUE: Final[bool] = (
+        os.getenv("DATABASE_SQLITE_WRITE_QUEUE", "true").lower() == "true"
+    )
+    # 历史库：设置后执行记录（job_exec_logs）存放在单独的SQLite文件，使用独立的引擎、连接池
+    # 和单写连接，大量执行记录写入不再与任务编辑、执行次数更新争用同一个数据库文件锁
+    DATABASE_HISTORY_SQLITE_PATH: Final[str] = os.getenv("DATABASE_HISTORY_SQLITE_PATH", "")
+
+    # 启动时按 Alembic 迁移自动升级表结构（关闭后需手动执行 alembic upgrade head）
+    DATABASE_AUTO_MIGRATE: Final[bool] = (
+        os.getenv("DATABASE_AUTO_MIGRATE", "true").lower() == "true"
+    )
+    # 只读副本：逗号分隔的数据库URL（与主库同类型），为空则读写都走主库
+    DATABASE_REPLICA_URLS: Final[List[str]] = (
+        [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+    )
+    # 主库提交后该秒数内读请求仍走主库，保证读到刚写入的数据（需大于副本复制延迟）
+    DATABASE_REPLICA_STICKY_SECONDS: Final[float] = float(
+        os.getenv("DATABASE_REPLICA_STICKY_SECONDS", "5")
+    )
+
+    # SQL查询统计：每个请求、每次任务执行的查询次数和耗时（响应头 X-Query-*、/jobs/queryStats）
+    QUERY_STATS_ENABLED: Final[bool] = os.getenv("QUERY_STATS_ENABLED", "true").lower() == "true"
+    # 单条语句超过该毫秒数记录慢查询警告，0为不记录
+    QUERY_SLOW_MS: Final[int] = int(os.getenv("QUERY_SLOW_MS", "500"))
 
     # 日志配置
     LOG_DAYS: Final[int] = int(os.getenv("LOG_DAYS", "3"))
@@ -82,6 +119,88 @@ class Config:
     # 任务日志保留数量
     JOB_LOG_KEEP_COUNT: Final[int] = int(os.getenv("JOB_LOG_KEEP_COUNT", "3"))
 
+    # 任务日志格式：json=每行一条JSON，binary=长度前缀的紧凑二进制段
+    JOB_LOG_FORMAT: Final[str] = os.getenv("JOB_LOG_FORMAT", "json").lower()
+    # 任务日志存储：file=每个任务独立目录，shared=所有任务共享按天段文件+二级索引，
+    # db=批量写入 job_exec_logs 表
+    JOB_LOG_STORAGE: Final[str] = os.getenv("JOB_LOG_STORAGE", "file").lower()
+    # db存储的批量写入间隔（毫秒）和单批最大条数
+    JOB_LOG_DB_FLUSH_MS: Final[int] = int(os.getenv("JOB_LOG_DB_FLUSH_MS", "500"))
+    JOB_LOG_DB_BATCH_SIZE: Final[int] = int(os.getenv("JOB_LOG_DB_BATCH_SIZE", "500"))
+    # 日志段滚动大小（字节，二进制段与共享段通用），除按天切分外超过该大小也会滚动
+    JOB_LOG_SEGMENT_MAX_BYTES: Final[int] = int(
+        os.getenv("JOB_LOG_SEGMENT_MAX_BYTES", str(16 * 1024 * 1024))
+    )
+    # 共享段索引缓存的最大条目数（每条约100字节内存），超出的日期按查询流式扫描索引
+    JOB_LOG_INDEX_CACHE_ENTRIES: Final[int] = int(
+        os.getenv("JOB_LOG_INDEX_CACHE_ENTRIES", "200000")
+    )
+
+    # 日志保留策略：后台按 LOG_DAYS / JOB_LOG_KEEP_COUNT 增量清理
+    JOB_LOG_RETENTION_ENABLED: Final[bool] = (
+        os.getenv("JOB_LOG_RETENTION_ENABLED", "true").lower() == "true"
+    )
+    # 每轮间隔（秒）、每批处理的任务数、批次之间的暂停（毫秒）
+    JOB_LOG_RETENTION_INTERVAL: Final[int] = int(os.getenv("JOB_LOG_RETENTION_INTERVAL", "300"))
+    JOB_LOG_RETENTION_BATCH: Final[int] = int(os.getenv("JOB_LOG_RETENTION_BATCH", "200"))
+    JOB_LOG_RETENTION_PAUSE_MS: Final[int] = int(os.getenv("JOB_LOG_RETENTION_PAUSE_MS", "50"))
+    # 删除任务后后台清理其日志目录：每批删除的文件数、批次间暂停毫秒数
+    JOB_PURGE_BATCH: Final[int] = int(os.getenv("JOB_PURGE_BATCH", "500"))
+    JOB_PURGE_PAUSE_MS: Final[int] = int(os.getenv("JOB_PURGE_PAUSE_MS", "20"))
+    # 任务归档：停止或已达最大执行次数、超过 JOB_ARCHIVE_AFTER_DAYS 天未更新的任务移到归档表
+    # 只保留任务定义，执行记录、日志、执行指标和失败记录随之删除，因此默认关闭
+    JOB_ARCHIVE_ENABLED: Final[bool] = os.getenv("JOB_ARCHIVE_ENABLED", "false").lower() == "true"
+    JOB_ARCHIVE_AFTER_DAYS: Final[int] = int(os.getenv("JOB_ARCHIVE_AFTER_DAYS", "30"))
+    # 每轮间隔（秒）、每批归档的任务数、批次之间的暂停（毫秒）
+    JOB_ARCHIVE_INTERVAL: Final[int] = int(os.getenv("JOB_ARCHIVE_INTERVAL", "3600"))
+    JOB_ARCHIVE_BATCH: Final[int] = int(os.getenv("JOB_ARCHIVE_BATCH", "500"))
+    JOB_ARCHIVE_PAUSE_MS: Final[int] = int(os.getenv("JOB_ARCHIVE_PAUSE_MS", "50"))
+    # 任务日志全局磁盘预算（MB），超出时从最旧的日志开始淘汰，0表示不限制
+    JOB_LOG_DISK_BUDGET_MB: Final[int] = int(os.getenv("JOB_LOG_DISK_BUDGET_MB", "0"))
+    # 执行输出去重：不小于该字节数的输出按内容哈希只保存一次（file/binary/shared 存储）
+    JOB_LOG_OUTPUT_DEDUPE: Final[bool] = (
+        os.getenv("JOB_LOG_OUTPUT_DEDUPE", "true").lower() == "true"
+    )
+    JOB_LOG_DEDUPE_MIN_BYTES: Final[int] = int(os.getenv("JOB_LOG_DEDUPE_MIN_BYTES", "256"))
+
+    # 实时日志推送（SSE）：每个订阅者的队列上限（超出即断开）和心跳间隔（秒）
+    LOG_STREAM_QUEUE_SIZE: Final[int] = int(os.getenv("LOG_STREAM_QUEUE_SIZE", "1000"))
+    LOG_STREAM_KEEPALIVE_SECONDS: Final[int] = int(
+        os.getenv("LOG_STREAM_KEEPALIVE_SECONDS", "15")
+    )
+
+    # 日志投递：udp://、tcp://（NDJSON）、syslog://、syslog+tcp:// 地址，为空不投递
+    JOB_LOG_SINK_URL: Final[str] = os.getenv("JOB_LOG_SINK_URL", "")
+    # 投递队列上限、单批条数、发送间隔（毫秒）
+    JOB_LOG_SINK_QUEUE_SIZE: Final[int] = int(os.getenv("JOB_LOG_SINK_QUEUE_SIZE", "10000"))
+    JOB_LOG_SINK_BATCH_SIZE: Final[int] = int(os.getenv("JOB_LOG_SINK_BATCH_SIZE", "200"))
+    JOB_LOG_SINK_FLUSH_MS: Final[int] = int(os.getenv("JOB_LOG_SINK_FLUSH_MS", "500"))
+    # 队列满时的处理：drop_oldest / drop_newest（提交不等待，不拖慢任务执行）
+    JOB_LOG_SINK_DROP_POLICY: Final[str] = os.getenv(
+        "JOB_LOG_SINK_DROP_POLICY", "drop_oldest"
+    ).lower()
+
+    # 全局失败日志：环形文件槽位数（每条1KB）、内存中保留的最近条数
+    JOB_FAILURE_JOURNAL_SIZE: Final[int] = int(os.getenv("JOB_FAILURE_JOURNAL_SIZE", "10000"))
+    JOB_FAILURE_MEMORY_SIZE: Final[int] = int(os.getenv("JOB_FAILURE_MEMORY_SIZE", "2000"))
+
+    # 内存执行统计：每个任务保留的最近执行次数、快照保存间隔（秒）
+    JOB_STATS_WINDOW_SIZE: Final[int] = int(os.getenv("JOB_STATS_WINDOW_SIZE", "1024"))
+    JOB_STATS_SNAPSHOT_INTERVAL: Final[int] = int(
+        os.getenv("JOB_STATS_SNAPSHOT_INTERVAL", "60")
+    )
+
+    # 任务列表总数缓存（秒），任务增删改时自动失效，0表示不缓存
+    JOB_LIST_COUNT_CACHE_SECONDS: Final[int] = int(
+        os.getenv("JOB_LIST_COUNT_CACHE_SECONDS", "5")
+    )
+    # 任务状态计数的数据库校准间隔（秒），0表示只在首次读取时校准
+    JOB_STATE_RECONCILE_SECONDS: Final[int] = int(
+        os.getenv("JOB_STATE_RECONCILE_SECONDS", "30")
+    )
+    # 批量接口（/jobs/bulk/*）单次最多条目数
+    JOB_BULK_MAX_ITEMS: Final[int] = int(os.getenv("JOB_BULK_MAX_ITEMS", "10000"))
+
     # 安全配置
     SECRET_KEY: Final[str] = os.getenv("SECRET_KEY", "change-me")
 
@@ -121,6 +240,34 @@ class Config:
         else:
             return f"sqlite:///{cls.DATABASE_SQLITE_PATH}"
 
+    @classmethod
+    def get_history_database_url(cls) -> str:
+        """执行记录所在数据库的URL，未单独配置时与主库相同（仅SQLite支持单独存放）"""
+        if cls.DATABASE_TYPE.lower() == "sqlite" and cls.DATABASE_HISTORY_SQLITE_PATH:
+            return f"sqlite:///{cls.DATABASE_HISTORY_SQLITE_PATH}"
+        return cls.get_database_url()
+
+    @classmethod
+    def history_database_separate(cls) -> bool:
+        """执行记录是否存放在单独的数据库"""
+        return cls.get_history_database_url() != cls.get_database_url()
+
+    @classmethod
+    def get_async_database_url(cls) -> str:
+        """异步引擎的数据库URL（SQLite 使用 aiosqlite，MySQL 使用 asyncmy）"""
+        return cls.to_async_url(cls.get_database_url())
+
+    @classmethod
+    def to_async_url(cls, url: str) -> str:
+        """同步驱动URL转为异步驱动URL（pymysql→asyncmy，sqlite→aiosqlite）"""
+        if url.startswith("mysql+pymysql://"):
+            return "mysql+asyncmy://" + url[len("mysql+pymysql://") :]
+        if url.startswith("mysql://"):
+            return "mysql+asyncmy://" + url[len("mysql://") :]
+        if url.startswith("sqlite://"):
+            return "sqlite+aiosqlite://" + url[len("sqlite://") :]
+        return url
+
     @classmethod
     def get_database_engine_options(cls) -> dict:
         """获取数据库引擎配置选项"""
@@ -132,8 +279,11 @@ class Config:
                 "pool_recycle": 3600,
             }
         else:
+            # 本地文件无需连接探活；WAL 下读连接可并行，空闲连接保留 MAXIDLECONNS 个
             return {
-                "pool_size": cls.DATABASE_SQLITE_MAXOPENCONNS,
-                "max_overflow": 0,
-                "pool_pre_ping": True,
+                "pool_size": cls.DATABASE_SQLITE_MAXIDLECONNS,
+                "max_overflow": max(
+                    cls.DATABASE_SQLITE_MAXOPENCONNS - cls.DATABASE_SQLITE_MAXIDLECONNS, 0
+                ),
+                "pool_pre_ping": False,
             }
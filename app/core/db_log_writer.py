@@ -0,0 +1,177 @@
+"""
+数据库日志后端
+
+JOB_LOG_STORAGE=db 时，执行记录先进入内存缓冲区，由后台线程每
+JOB_LOG_DB_FLUSH_MS 毫秒（或缓冲达到 JOB_LOG_DB_BATCH_SIZE 条时）
+以一条 executemany INSERT 批量写入 job_exec_logs 表。SQLite 下写入经
+单写连接队列（app.core.db_writer）提交，不与任务执行次数等写入争抢写锁；
+配置 DATABASE_HISTORY_SQLITE_PATH 时写入单独的历史库。
+"""
+
+import json
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.engine import Engine
+
+from app.config import Config
+from app.core.db_writer import DBWriteQueue, history_write_queue
+from app.models.log import JobExecLog
+
+logger = logging.getLogger(__name__)
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+
+def build_exec_log_row(log_data: Dict[str, Any]) -> Dict[str, Any]:
+    """将 run_job 的汇总日志转换为 job_exec_logs 行"""
+    end_text = log_data.get("time") or datetime.now().strftime(TIME_FORMAT)[:-3]
+    try:
+        end_at = datetime.strptime(end_text, TIME_FORMAT)
+    except ValueError:
+        end_at = datetime.now()
+    duration_ms = int(log_data.get("duration_ms") or 0)
+    start_at = end_at - timedelta(milliseconds=duration_ms)
+
+    mode = log_data.get("mode") or ""
+    result = log_data.get("result") or log_data.get("output") or ""
+    func_args = log_data.get("func_args")
+    if func_args is not None and not isinstance(func_args, str):
+        func_args = json.dumps(func_args, ensure_ascii=False)
+
+    return {
+        "time": start_at.strftime(TIME_FORMAT)[:-3],
+        "end_time": end_at.strftime(TIME_FORMAT)[:-3],
+        "job_id": log_data.get("job_id"),
+        "job_name": log_data.get("job_name") or "",
+        "status": log_data.get("status") or "",
+        "duration_ms": duration_ms,
+        "mode": mode,
+        "command": log_data.get("command") or "",
+        "exit_code": log_data.get("exit_code"),
+        "stdout": log_data.get("stdout") or (result if mode == "command" else None),
+        "stderr": log_data.get("stderr"),
+        "http_url": log_data.get("url"),
+        "http_method": log_data.get("method") if mode == "http" else None,
+        "http_status": log_data.get("status_code"),
+        "http_resp": result if mode == "http" else None,
+        "func_name": log_data.get("func_name"),
+        "func_args": func_args,
+        "func_result": result if mode in ("function", "func") else None,
+        "error_msg": log_data.get("error_msg"),
+        "created_at": end_at,
+        "updated_at": end_at,
+    }
+
+
+def exec_log_to_dict(row: JobExecLog) -> Dict[str, Any]:
+    """将 job_exec_logs 行转换为与文件日志一致的结构"""
+    return {
+        "time": row.end_time,
+        "job_id": row.job_id,
+        "job_name": row.job_name,
+        "status": row.status,
+        "duration_ms": row.duration_ms,
+        "mode": row.mode,
+        "command": row.command,
+        "output": row.stdout or row.func_result or row.http_resp or "",
+        "error_msg": row.error_msg or "",
+        "exit_code": row.exit_code or 0,
+        "http_status": row.http_status or 0,
+        "func_name": row.func_name or "",
+        "func_args": row.func_args or "",
+    }
+
+
+class DBLogWriter:
+    """缓冲并批量写入执行日志"""
+
+    def __init__(
+        self,
+        bind: Optional[Engine] = None,
+        flush_ms: Optional[int] = None,
+        batch_size: Optional[int] = None,
+    ):
+        # 指定 bind 时直接写入该引擎，否则使用执行记录的写入队列（主库或历史库）
+        self.write_queue = (
+            DBWriteQueue(bind, enabled=False) if bind is not None else history_write_queue
+        )
+        self.flush_interval = (flush_ms or Config.JOB_LOG_DB_FLUSH_MS) / 1000.0
+        self.batch_size = batch_size or Config.JOB_LOG_DB_BATCH_SIZE
+        self._buffer: List[Dict[str, Any]] = []
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+    def submit(self, row: Dict[str, Any]) -> None:
+        """加入缓冲区，由后台线程批量写入"""
+        with self._cond:
+            self._buffer.append(row)
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(
+                    target=self._run, name="db-log-writer", daemon=True
+                )
+                self._thread.start()
+            if len(self._buffer) >= self.batch_size:
+                self._cond.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._stopping and len(self._buffer) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+                stopping = self._stopping
+            self.flush()
+            if stopping:
+                return
+
+    def flush(self) -> int:
+        """立即写入缓冲区中的全部记录，返回写入条数"""
+        with self._flush_lock:
+            with self._cond:
+                rows, self._buffer = self._buffer, []
+            if not rows:
+                return 0
+
+            written = 0
+            for start in range(0, len(rows), self.batch_size):
+                batch = rows[start : start + self.batch_size]
+                try:
+                    self._insert(batch)
+                    written += len(batch)
+                except Exception as e:
+                    # 批量失败时逐条重试，跳过无法写入的记录（如任务已删除）
+                    logger.warning(f"批量写入执行日志失败，改为逐条写入: {e}")
+                    written += self._insert_one_by_one(batch)
+            return written
+
+    def _insert(self, rows: List[Dict[str, Any]]) -> None:
+        self.write_queue.execute(lambda conn: conn.execute(insert(JobExecLog.__table__), rows))
+
+    def _insert_one_by_one(self, rows: List[Dict[str, Any]]) -> int:
+        written = 0
+        for row in rows:
+            try:
+                self._insert([row])
+                written += 1
+            except Exception as e:
+                logger.error(f"写入执行日志失败 (任务 {row.get('job_id')}): {e}")
+        return written
+
+    def close(self) -> None:
+        """停止后台线程并写入剩余记录"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout=5)
+        self.flush()
+
+
+db_log_writer = DBLogWriter()
@@ -0,0 +1,157 @@
+"""
+SQLite 单写连接队列
+
+SQLite 同一时刻只允许一个写事务，多个线程同时提交（任务执行次数、db日志批量写入）
+会互相等待直至 busy_timeout，超时即报 database is locked。写入队列把这些写操作交给
+一个后台线程，在 writer_engine 的唯一连接上顺序执行；队列里积压的多个操作合并到一个
+事务中提交（组提交），合并事务失败时回滚并逐个重试，互不影响。
+
+    db_write_queue.submit(lambda conn: conn.execute(stmt))          # 不等待结果
+    db_write_queue.execute(lambda conn: conn.execute(stmt)).rowcount  # 等待并返回结果
+
+MySQL 或关闭 DATABASE_SQLITE_WRITE_QUEUE 时直接在调用线程执行。执行记录单独存放在
+历史库（DATABASE_HISTORY_SQLITE_PATH）时使用 history_write_queue，与任务表的写入互不等待。
+"""
+
+import contextvars
+import functools
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+
+from sqlalchemy.engine import Connection, Engine
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+WriteFn = Callable[[Connection], Any]
+
+# 单次组提交最多合并的写操作数
+MAX_GROUP_SIZE = 256
+
+
+class DBWriteQueue:
+    """单线程、单连接的写入队列"""
+
+    def __init__(
+        self, bind: Optional[Engine] = None, enabled: Optional[bool] = None, history: bool = False
+    ):
+        self._bind = bind
+        # 未指定 bind 时按 history 选择主库或历史库的单写连接
+        self._history = history
+        self._enabled = enabled
+        self._queue: "queue.Queue[Optional[Tuple[WriteFn, Future]]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def bind(self) -> Engine:
+        if self._bind is None:
+            from app.deps import history_writer_engine, writer_engine
+
+            self._bind = history_writer_engine if self._history else writer_engine
+        return self._bind
+
+    @property
+    def enabled(self) -> bool:
+        if self._enabled is None:
+            self._enabled = Config.DATABASE_SQLITE_WRITE_QUEUE and self.bind.dialect.name == "sqlite"
+        return self._enabled
+
+    def submit(self, fn: WriteFn) -> "Future[Any]":
+        """提交写操作，返回 Future（结果为 fn 的返回值）"""
+        future: "Future[Any]" = Future()
+        if not self.enabled:
+            try:
+                with self.bind.begin() as conn:
+                    future.set_result(fn(conn))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        self._ensure_thread()
+        # 在提交方的上下文中执行，查询计入提交方的统计（app.core.query_stats）
+        fn = functools.partial(contextvars.copy_context().run, fn)
+        self._queue.put((fn, future))
+        return future
+
+    def execute(self, fn: WriteFn, timeout: Optional[float] = None) -> Any:
+        """提交写操作并等待完成"""
+        return self.submit(fn).result(timeout)
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name="history-writer" if self._history else "db-writer",
+                    daemon=True,
+                )
+                self._thread.start()
+
+    def _take_group(self) -> Tuple[List[Tuple[WriteFn, Future]], bool]:
+        """阻塞取出一个操作，再顺带取出已排队的操作；返回 (操作列表, 是否收到停止信号)"""
+        item = self._queue.get()
+        if item is None:
+            return [], True
+        group = [item]
+        stop = False
+        while len(group) < MAX_GROUP_SIZE:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                stop = True
+                break
+            group.append(item)
+        return group, stop
+
+    def _run(self) -> None:
+        while True:
+            group, stop = self._take_group()
+            if group:
+                self._execute_group(group)
+            if stop:
+                return
+
+    def _execute_group(self, group: List[Tuple[WriteFn, Future]]) -> None:
+        group = [(fn, future) for fn, future in group if future.set_running_or_notify_cancel()]
+        if not group:
+            return
+        if len(group) > 1:
+            try:
+                with self.bind.begin() as conn:
+                    results = [fn(conn) for fn, _ in group]
+            except Exception as e:
+                logger.debug(f"组提交失败，逐个重试: {e}")
+            else:
+                for (_, future), result in zip(group, results):
+                    future.set_result(result)
+                return
+        for fn, future in group:
+            try:
+                with self.bind.begin() as conn:
+                    future.set_result(fn(conn))
+            except Exception as e:
+                future.set_exception(e)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """处理完已排队的写操作后停止后台线程"""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        self._queue.put(None)
+        thread.join(timeout=timeout)
+        self._thread = None
+
+
+db_write_queue = DBWriteQueue()
+# 执行记录的写入队列：历史库单独存放时使用历史库的单写连接，否则与主库共用同一队列
+history_write_queue = (
+    DBWriteQueue(history=True) if Config.history_database_separate() else db_write_queue
+)
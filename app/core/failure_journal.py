@@ -0,0 +1,293 @@
+"""
+全局失败日志
+
+所有任务的失败执行按时间顺序追加到一个有界环形文件，最近的记录同时保存在内存中，
+用于跨任务快速排查（“最近15分钟哪些任务失败了”）而无需遍历各任务日志目录。
+
+环形文件 runtime/failures.ring：
+
+    头部  <4s H I I>  魔数 XHFJ、版本、槽位数、槽位大小
+    槽位  <Q d H> + JSON   序号、时间戳、正文长度、正文（超出槽位时截断字段）
+
+序号从1递增，写入第 seq % 槽位数 个槽位，启动时扫描全部槽位恢复。删除任务后其记录的
+槽位保留序号、正文长度置0，按序号回溯时跳过而不会误判为已被覆盖。
+"""
+
+import json
+import logging
+import os
+import struct
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional
+
+from app.config import Config
+from app.models.fields import parse_tags
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"XHFJ"
+VERSION = 1
+SLOT_SIZE = 1024
+
+_HEADER = struct.Struct("<4sHII")
+_SLOT_HEADER = struct.Struct("<QdH")
+_MAX_PAYLOAD = SLOT_SIZE - _SLOT_HEADER.size
+
+ERROR_MAX_CHARS = 500
+OUTPUT_MAX_CHARS = 200
+
+
+def _truncate(value: Any, limit: int) -> str:
+    text = "" if value is None else str(value)
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+def _dumps(entry: Dict[str, Any]) -> bytes:
+    return json.dumps(entry, ensure_ascii=False).encode("utf-8")
+
+
+def _shrink_text(entry: Dict[str, Any], field: str) -> bytes:
+    """逐次截半文本字段直到正文放得下或字段为空，返回编码后的正文"""
+    payload = _dumps(entry)
+    text = entry[field]
+    while len(payload) > _MAX_PAYLOAD and text:
+        text = text[: len(text) // 2]
+        entry[field] = text + "..." if text else ""
+        payload = _dumps(entry)
+    return payload
+
+
+def _encode_payload(entry: Dict[str, Any]) -> bytes:
+    """编码正文，超出槽位时依次截断输出、错误信息、标签和任务名称
+
+    只截断字段而不截断编码后的字节，写入的正文总是完整的JSON。
+    """
+    payload = _dumps(entry)
+    if len(payload) <= _MAX_PAYLOAD:
+        return payload
+    entry = dict(entry, output="", tags=list(entry["tags"]))
+    payload = _shrink_text(entry, "error_msg")
+    while len(payload) > _MAX_PAYLOAD and entry["tags"]:
+        entry["tags"].pop()
+        payload = _dumps(entry)
+    return _shrink_text(entry, "job_name")
+
+
+class FailureJournal:
+    """失败记录环形文件 + 内存尾部"""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        capacity: Optional[int] = None,
+        memory_size: Optional[int] = None,
+    ):
+        self.path = path or os.path.join("runtime", "failures.ring")
+        self.capacity = capacity or Config.JOB_FAILURE_JOURNAL_SIZE
+        self.memory_size = min(memory_size or Config.JOB_FAILURE_MEMORY_SIZE, self.capacity)
+        self._tail: Deque[Dict[str, Any]] = deque(maxlen=self.memory_size)
+        self._seq = 0
+        self._fh: Optional[Any] = None
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # 文件
+    # ------------------------------------------------------------------
+
+    def _slot_offset(self, seq: int) -> int:
+        return _HEADER.size + (seq % self.capacity) * SLOT_SIZE
+
+    def _open(self) -> Any:
+        """打开（必要时创建）环形文件并恢复序号和内存尾部"""
+        if self._fh is not None:
+            return self._fh
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        fh = open(self.path, "r+b" if os.path.exists(self.path) else "w+b")
+        header = fh.read(_HEADER.size)
+        if len(header) == _HEADER.size:
+            magic, version, capacity, slot_size = _HEADER.unpack(header)
+            if magic != MAGIC or version != VERSION or slot_size != SLOT_SIZE:
+                logger.warning(f"失败日志文件格式不兼容，已重建: {self.path}")
+                header = b""
+            elif capacity != self.capacity:
+                # 槽位数以文件为准，避免修改配置后错位
+                self.capacity = capacity
+                self.memory_size = min(self.memory_size, capacity)
+                self._tail = deque(maxlen=self.memory_size)
+        if len(header) != _HEADER.size:
+            fh.seek(0)
+            fh.truncate()
+            fh.write(_HEADER.pack(MAGIC, VERSION, self.capacity, SLOT_SIZE))
+            fh.flush()
+        self._fh = fh
+
+        entries = sorted(self._scan(), key=lambda e: e["seq"])
+        if entries:
+            self._seq = entries[-1]["seq"]
+        live = [e for e in entries if not e.get("deleted")]
+        self._tail.extend(live[-self.memory_size :])
+        return fh
+
+    def _read_slot(self, fh: Any, slot: int) -> Optional[Dict[str, Any]]:
+        fh.seek(_HEADER.size + slot * SLOT_SIZE)
+        data = fh.read(SLOT_SIZE)
+        if len(data) < _SLOT_HEADER.size:
+            return None
+        seq, ts, length = _SLOT_HEADER.unpack_from(data)
+        if seq == 0 or length > _MAX_PAYLOAD:
+            return None
+        if length == 0:
+            # 已删除任务的记录
+            return {"seq": seq, "ts": ts, "deleted": True}
+        try:
+            entry = json.loads(data[_SLOT_HEADER.size : _SLOT_HEADER.size + length])
+        except (ValueError, UnicodeDecodeError):
+            return None
+        entry["seq"] = seq
+        return entry
+
+    def _scan(self) -> Iterator[Dict[str, Any]]:
+        assert self._fh is not None
+        for slot in range(self.capacity):
+            entry = self._read_slot(self._fh, slot)
+            if entry is not None:
+                yield entry
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+
+    def append(
+        self,
+        job_id: int,
+        job_name: str,
+        mode: str,
+        error_msg: Optional[str],
+        duration_ms: int = 0,
+        output: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        timestamp: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """记录一次失败，返回写入的条目"""
+        ts = time.time() if timestamp is None else timestamp
+        entry = {
+            "time": datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
+            "ts": ts,
+            "job_id": job_id,
+            "job_name": job_name,
+            "mode": mode,
+            "error_msg": _truncate(error_msg, ERROR_MAX_CHARS),
+            "duration_ms": duration_ms,
+            "output": _truncate(output, OUTPUT_MAX_CHARS),
+            "tags": tags or [],
+        }
+        payload = _encode_payload(entry)
+        with self._lock:
+            fh = self._open()
+            self._seq += 1
+            entry["seq"] = self._seq
+            fh.seek(self._slot_offset(self._seq))
+            fh.write(_SLOT_HEADER.pack(self._seq, ts, len(payload)) + payload)
+            fh.flush()
+            self._tail.append(entry)
+        return entry
+
+    def forget(self, job_ids: Iterable[int], before: Optional[float] = None) -> int:
+        """清除已删除任务在 before（时间戳，默认当前）之前的失败记录，返回清除的条数"""
+        ids = set(job_ids)
+        if not ids or (self._fh is None and not os.path.exists(self.path)):
+            return 0
+        before = time.time() if before is None else before
+
+        def stale(entry: Dict[str, Any]) -> bool:
+            return entry["job_id"] in ids and entry["ts"] < before
+
+        removed = 0
+        with self._lock:
+            fh = self._open()
+            live = [entry for entry in self._tail if not stale(entry)]
+            self._tail.clear()
+            self._tail.extend(live)
+            for slot in range(self.capacity):
+                entry = self._read_slot(fh, slot)
+                if entry is None or entry.get("deleted") or not stale(entry):
+                    continue
+                fh.seek(_HEADER.size + slot * SLOT_SIZE)
+                fh.write(_SLOT_HEADER.pack(entry["seq"], entry["ts"], 0))
+                removed += 1
+            fh.flush()
+        return removed
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+                self._tail.clear()
+                self._seq = 0
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+
+    def _iter_newest(self, before: Optional[int]) -> Iterator[Dict[str, Any]]:
+        """按序号从新到旧遍历：先内存尾部，再回退到环形文件"""
+        with self._lock:
+            fh = self._open()
+            latest = self._seq
+            tail = list(self._tail)
+        upper = latest if before is None else min(before - 1, latest)
+        oldest_in_memory = tail[0]["seq"] if tail else latest + 1
+        for entry in reversed(tail):
+            if entry["seq"] <= upper:
+                yield entry
+        # 内存之外的旧记录从文件读取，序号不连续（已被覆盖）即停止，无法解析的槽位跳过
+        seq = min(upper, oldest_in_memory - 1)
+        lowest = max(1, latest - self.capacity + 1)
+        while seq >= lowest:
+            with self._lock:
+                entry = self._read_slot(fh, seq % self.capacity)
+            if entry is not None and entry["seq"] != seq:
+                return
+            seq -= 1
+            if entry is not None and not entry.get("deleted"):
+                yield entry
+
+    def query(
+        self,
+        limit: int = 50,
+        cursor: Optional[int] = None,
+        job_id: Optional[int] = None,
+        mode: Optional[str] = None,
+        keyword: str = "",
+        tag: str = "",
+        since: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """从新到旧分页查询，返回 {items, next_cursor}；next_cursor 传回 cursor 继续翻页"""
+        items: List[Dict[str, Any]] = []
+        next_cursor = None
+        for entry in self._iter_newest(cursor):
+            if since is not None and entry["ts"] < since:
+                break
+            if job_id is not None and entry["job_id"] != job_id:
+                continue
+            if mode and entry["mode"] != mode:
+                continue
+            if keyword and keyword not in entry["error_msg"]:
+                continue
+            if tag and tag not in entry["tags"]:
+                continue
+            if len(items) == limit:
+                next_cursor = items[-1]["seq"]
+                break
+            items.append(entry)
+        return {"items": items, "next_cursor": next_cursor}
+
+
+failure_journal = FailureJournal()
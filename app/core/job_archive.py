@@ -0,0 +1,240 @@
+"""
+任务归档
+
+停止（state=2）或已达最大执行次数、且超过 JOB_ARCHIVE_AFTER_DAYS 天未更新的任务由后台
+分批移到 job_archive 表，jobs 表只保留活跃任务，列表、计数和调度校准不再随历史任务增长：
+
+- 每批按主键顺序选出一批休眠任务，在一个事务内 INSERT ... SELECT 到归档表并从 jobs 删除，
+  批次之间暂停以平滑IO
+- 归档只保留任务定义：执行记录随任务行级联删除，日志目录、执行指标和失败记录交给
+  job_purger 后台清理，恢复的任务没有历史记录。后台归档默认关闭（JOB_ARCHIVE_ENABLED），
+  手动归档须传 purge_history=true 确认
+- 归档表有独立主键，job_id 记录原任务ID；恢复时原ID未被占用则沿用，否则分配新ID
+- 恢复的任务更新时间记为恢复时刻，不会在下一轮被立即归档；非停止状态的任务重新加入调度器
+"""
+
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import DateTime, and_, delete, insert, literal, or_, select
+from sqlalchemy.orm import Session
+
+from app.config import Config
+from app.core.job_bulk import chunked, forget_jobs, job_view
+from app.core.job_counters import STATE_STOPPED, job_state_counters
+from app.core.job_query import job_count_cache, name_prefix_condition
+from app.core.scheduler import add_jobs_to_scheduler
+from app.models.job import Job
+from app.models.job_archive import JobArchive
+
+logger = logging.getLogger(__name__)
+
+# 归档表与 jobs 表共有的字段（jobs.id 对应归档表的 job_id）
+ARCHIVE_FIELDS = tuple(column.key for column in Job.__table__.columns if column.key != "id")
+
+
+def dormant_condition(cutoff: datetime) -> Any:
+    """休眠任务：停止或已达最大执行次数，且更新时间早于 cutoff"""
+    return and_(
+        Job.updated_at < cutoff,
+        or_(
+            Job.state == STATE_STOPPED,
+            and_(Job.max_run_count > 0, Job.run_count >= Job.max_run_count),
+        ),
+    )
+
+
+def archive_batch(
+    db: Session, cutoff: datetime, after_id: int, batch_size: int
+) -> Tuple[List[int], Dict[int, int]]:
+    """归档 after_id 之后的一批休眠任务并提交，返回 (选出的候选任务ID, {已归档任务ID: 归档前状态})
+
+    候选任务在选出后被其他请求更新（如重新启动）时不再满足条件，不会归档，因此已归档的
+    数量可能少于候选数量。
+    """
+    condition = dormant_condition(cutoff)
+    rows = db.execute(
+        select(Job.id, Job.state)
+        .where(Job.id > after_id, condition)
+        .order_by(Job.id)
+        .limit(batch_size)
+    ).all()
+    if not rows:
+        return [], {}
+    states = {job_id: state for job_id, state in rows}
+    ids = list(states)
+    table = Job.__table__
+    db.execute(
+        insert(JobArchive).from_select(
+            ["job_id", "archived_at", *ARCHIVE_FIELDS],
+            select(
+                table.c.id,
+                literal(datetime.utcnow(), DateTime),
+                *(table.c[field] for field in ARCHIVE_FIELDS),
+            ).where(table.c.id.in_(ids), condition),
+        )
+    )
+    deleted = db.execute(delete(Job).where(Job.id.in_(ids), condition)).rowcount
+    if deleted != len(ids):
+        # 选出后被其他请求更新（如重新启动）的任务不再满足条件，未被归档
+        remaining = set(db.scalars(select(Job.id).where(Job.id.in_(ids))).all())
+        states = {job_id: state for job_id, state in states.items() if job_id not in remaining}
+    db.commit()
+    db.expire_all()
+    return ids, states
+
+
+def search_archive(
+    db: Session,
+    name: str = "",
+    tag: str = "",
+    mode: Optional[str] = None,
+    job_id: Optional[int] = None,
+    cursor: Optional[int] = None,
+    size: int = 20,
+) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """按归档时间倒序搜索归档任务（按归档表主键键集翻页），返回 (条目, 下一页游标)"""
+    q = select(JobArchive)
+    if name:
+        q = q.where(name_prefix_condition(JobArchive.name, name))
+    if tag:
+        q = q.where((literal(",") + JobArchive.tags + literal(",")).contains(f",{tag},"))
+    if mode:
+        q = q.where(JobArchive.mode == mode)
+    if job_id is not None:
+        q = q.where(JobArchive.job_id == job_id)
+    if cursor:
+        q = q.where(JobArchive.id < cursor)
+    rows = db.scalars(q.order_by(JobArchive.id.desc()).limit(size + 1)).all()
+    next_cursor = rows[size - 1].id if len(rows) > size else None
+    return [archive_item(row) for row in rows[:size]], next_cursor
+
+
+def archive_item(row: JobArchive) -> Dict[str, Any]:
+    item = {"id": row.id, "job_id": row.job_id, "archived_at": row.archived_at}
+    item.update((field, getattr(row, field)) for field in ARCHIVE_FIELDS)
+    return item
+
+
+def restore_jobs(db: Session, archive_ids: List[int]) -> Dict[str, Any]:
+    """把归档任务移回 jobs 表，返回 {"restored": [{"archive_id", "id"}], "missing": [归档ID]}"""
+    archive_ids = list(dict.fromkeys(archive_ids))
+    now = datetime.utcnow()
+    pending: List[Tuple[int, Job]] = []
+    for chunk in chunked(archive_ids):
+        rows = db.scalars(select(JobArchive).where(JobArchive.id.in_(chunk))).all()
+        taken = set(
+            db.scalars(select(Job.id).where(Job.id.in_([row.job_id for row in rows]))).all()
+        )
+        for row in rows:
+            values = {field: getattr(row, field) for field in ARCHIVE_FIELDS}
+            values["updated_at"] = now
+            if row.job_id not in taken:
+                values["id"] = row.job_id
+                taken.add(row.job_id)
+            job = Job(**values)
+            db.add(job)
+            pending.append((row.id, job))
+        db.execute(delete(JobArchive).where(JobArchive.id.in_([row.id for row in rows])))
+    db.flush()
+    # 提交前取出字段，提交后不再逐个刷新ORM对象
+    restored = [
+        (archive_id, {field: getattr(job, field) for field in ("id", *ARCHIVE_FIELDS)})
+        for archive_id, job in pending
+    ]
+    db.commit()
+
+    for _, values in restored:
+        job_state_counters.adjust(None, values["state"])
+    if restored:
+        job_count_cache.invalidate()
+    add_jobs_to_scheduler(
+        job_view(values) for _, values in restored if values["state"] != STATE_STOPPED
+    )
+    done = {archive_id for archive_id, _ in restored}
+    return {
+        "restored": [{"archive_id": archive_id, "id": values["id"]} for archive_id, values in restored],
+        "missing": [archive_id for archive_id in archive_ids if archive_id not in done],
+    }
+
+
+class JobArchiver:
+    """后台任务归档服务"""
+
+    def __init__(
+        self,
+        after_days: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        pause_ms: Optional[int] = None,
+    ):
+        self.after_days = Config.JOB_ARCHIVE_AFTER_DAYS if after_days is None else after_days
+        self.batch_size = batch_size or Config.JOB_ARCHIVE_BATCH
+        self.pause = (Config.JOB_ARCHIVE_PAUSE_MS if pause_ms is None else pause_ms) / 1000.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pass_lock = threading.Lock()
+
+    def run_once(
+        self,
+        db: Optional[Session] = None,
+        after_days: Optional[int] = None,
+        now: Optional[datetime] = None,
+    ) -> int:
+        """执行一轮归档，返回归档的任务数；未传入会话时使用新会话"""
+        if db is None:
+            from app.deps import SessionLocal
+
+            with SessionLocal() as session:
+                return self.run_once(session, after_days, now)
+
+        days = self.after_days if after_days is None else after_days
+        cutoff = (now or datetime.utcnow()) - timedelta(days=days)
+        archived = 0
+        last_id = 0
+        with self._pass_lock:
+            while not self._stop.is_set():
+                ids, states = archive_batch(db, cutoff, last_id, self.batch_size)
+                if states:
+                    forget_jobs(states)
+                    archived += len(states)
+                # 只有候选不足一批时才说明已扫描到末尾
+                if len(ids) < self.batch_size:
+                    break
+                last_id = ids[-1]
+                if self.pause > 0:
+                    self._stop.wait(self.pause)
+        if archived:
+            logger.info(f"已归档 {archived} 个休眠任务")
+        return archived
+
+    # ------------------------------------------------------------------
+    # 后台线程
+    # ------------------------------------------------------------------
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"任务归档执行失败: {e}")
+            self._stop.wait(Config.JOB_ARCHIVE_INTERVAL)
+
+    def start(self) -> None:
+        """启动后台归档线程"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="job-archiver", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止后台归档线程"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+job_archiver = JobArchiver()
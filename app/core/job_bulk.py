@@ -0,0 +1,214 @@
+"""
+任务批量操作
+
+/jobs/bulk/add、/jobs/bulk/edit、/jobs/bulk/del 的实现：先逐条校验，有效条目在一个事务内
+批量写入（bulk_insert_mappings / bulk_update_mappings / 按主键 IN 删除），提交后调度器
+变更只获取一次锁批量生效。返回逐条结果：
+
+    {"succeeded": 2, "failed": 1, "results": [{"index": 0, "id": 11, "ok": true, "msg": ""}, ...]}
+
+atomic=True 时任一条目校验失败则整批不写入。
+"""
+
+import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+
+from app.core.job_counters import job_state_counters
+from app.core.job_purger import job_purger
+from app.core.job_query import job_count_cache
+from app.core.job_stats import job_stats
+from app.core.log_policy import log_sampler
+from app.core.scheduler import add_jobs_to_scheduler, remove_jobs
+from app.models.job import Job
+from app.models.schemas import JobCreate, JobUpdate
+
+# IN 查询每批主键数，低于各数据库的参数个数上限
+ID_CHUNK_SIZE = 500
+
+# 变更后需要重新调度的字段
+SCHEDULER_FIELDS = (
+    "cron_expr",
+    "state",
+    "command",
+    "mode",
+    "allow_mode",
+    "trigger_type",
+    "interval_seconds",
+)
+JOB_FIELDS = tuple(JobCreate.model_fields) + ("id",)
+
+
+def chunked(values: Sequence[Any], size: int = ID_CHUNK_SIZE) -> Iterator[Sequence[Any]]:
+    for start in range(0, len(values), size):
+        yield values[start : start + size]
+
+
+def format_validation_error(e: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in e.errors()
+    )
+
+
+def _result(index: int, job_id: Optional[int], ok: bool, msg: str = "") -> Dict[str, Any]:
+    return {"index": index, "id": job_id, "ok": ok, "msg": msg}
+
+
+def _summary(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    succeeded = sum(1 for r in results if r["ok"])
+    return {"succeeded": succeeded, "failed": len(results) - succeeded, "results": results}
+
+
+def job_view(values: Dict[str, Any]) -> Job:
+    """由字段值构造不入会话的任务对象，仅供调度器读取配置"""
+    return Job(**{k: v for k, v in values.items() if k in JOB_FIELDS})
+
+
+def bulk_create(db: Session, items: List[Dict[str, Any]], atomic: bool = False) -> Dict[str, Any]:
+    """批量创建任务"""
+    results: List[Dict[str, Any]] = []
+    rows: List[Dict[str, Any]] = []
+    row_indexes: List[int] = []
+    for index, item in enumerate(items):
+        try:
+            row = JobCreate.model_validate(item).model_dump()
+        except ValidationError as e:
+            results.append(_result(index, None, False, format_validation_error(e)))
+            continue
+        if not row["cron_expr"]:
+            results.append(_result(index, None, False, "cron_expr: cron表达式不能为空"))
+            continue
+        rows.append(row)
+        row_indexes.append(index)
+        results.append(_result(index, None, True))
+    if atomic and len(rows) != len(items):
+        return _rollback_summary(results)
+    if not rows:
+        return _summary(results)
+
+    now = datetime.datetime.utcnow()
+    for row in rows:
+        row.setdefault("run_count", 0)
+        row["created_at"] = row["updated_at"] = now
+    # return_defaults 回填自增主键
+    db.bulk_insert_mappings(Job, rows, return_defaults=True)
+    db.commit()
+
+    for index, row in zip(row_indexes, rows):
+        results[index]["id"] = row["id"]
+        job_state_counters.adjust(None, row["state"])
+    job_count_cache.invalidate()
+    add_jobs_to_scheduler(job_view(row) for row in rows)
+    return _summary(results)
+
+
+def bulk_update(db: Session, items: List[Dict[str, Any]], atomic: bool = False) -> Dict[str, Any]:
+    """批量更新任务，每个条目为 {"id": 任务ID, 其余为要更新的字段}"""
+    results: List[Dict[str, Any]] = []
+    updates: List[Tuple[int, int, Dict[str, Any]]] = []
+    for index, item in enumerate(items):
+        job_id = item.get("id") if isinstance(item, dict) else None
+        if not isinstance(job_id, int) or isinstance(job_id, bool) or job_id < 1:
+            results.append(_result(index, None, False, "id: 缺少有效的任务ID"))
+            continue
+        try:
+            fields = {k: v for k, v in item.items() if k != "id"}
+            data = JobUpdate.model_validate(fields).model_dump(exclude_unset=True)
+        except ValidationError as e:
+            results.append(_result(index, job_id, False, format_validation_error(e)))
+            continue
+        updates.append((index, job_id, data))
+        results.append(_result(index, job_id, True))
+
+    existing: Dict[int, Dict[str, Any]] = {}
+    ids = list(dict.fromkeys(job_id for _, job_id, _ in updates))
+    for chunk in chunked(ids):
+        for job in db.query(Job).filter(Job.id.in_(chunk)):
+            existing[job.id] = {field: getattr(job, field) for field in JOB_FIELDS}
+    for index, job_id, _ in updates:
+        if job_id not in existing:
+            results[index].update(ok=False, msg="任务不存在")
+    if atomic and not all(r["ok"] for r in results):
+        return _rollback_summary(results)
+
+    now = datetime.datetime.utcnow()
+    mappings: List[Dict[str, Any]] = []
+    state_changes: List[Tuple[int, int]] = []
+    reschedule: Dict[int, Dict[str, Any]] = {}
+    for index, job_id, data in updates:
+        if not results[index]["ok"]:
+            continue
+        before = existing[job_id]
+        after = dict(before, **data)
+        existing[job_id] = after
+        mappings.append(dict(data, id=job_id, updated_at=now))
+        state_changes.append((before["state"], after["state"]))
+        if any(before[field] != after[field] for field in SCHEDULER_FIELDS if field in data):
+            reschedule[job_id] = after
+    if not mappings:
+        return _summary(results)
+
+    db.bulk_update_mappings(Job, mappings)
+    db.commit()
+    # 批量更新不经过会话中已加载的对象，使其在下次访问时重新加载
+    db.expire_all()
+
+    for old_state, new_state in state_changes:
+        job_state_counters.adjust(old_state, new_state)
+    job_count_cache.invalidate()
+    stopped = [job_id for job_id, values in reschedule.items() if values["state"] == 2]
+    if stopped:
+        remove_jobs(stopped)
+    add_jobs_to_scheduler(
+        job_view(values) for values in reschedule.values() if values["state"] != 2
+    )
+    return _summary(results)
+
+
+def bulk_delete(db: Session, ids: List[Any]) -> Dict[str, Any]:
+    """批量删除任务（执行日志由外键 ON DELETE CASCADE 删除，日志目录由后台清理）"""
+    results = [
+        _result(index, job_id, True)
+        if isinstance(job_id, int) and not isinstance(job_id, bool) and job_id >= 1
+        else _result(index, None, False, "无效的任务ID")
+        for index, job_id in enumerate(ids)
+    ]
+    valid = list(dict.fromkeys(r["id"] for r in results if r["ok"]))
+
+    states: Dict[int, int] = {}
+    for chunk in chunked(valid):
+        states.update(db.query(Job.id, Job.state).filter(Job.id.in_(chunk)).all())
+        db.query(Job).filter(Job.id.in_(chunk)).delete(synchronize_session=False)
+    db.commit()
+    db.expire_all()
+
+    for result in results:
+        if result["ok"] and result["id"] not in states:
+            result.update(ok=False, msg="任务不存在")
+    forget_jobs(states)
+    return _summary(results)
+
+
+def forget_jobs(states: Dict[int, int]) -> None:
+    """任务行已从 jobs 表删除（删除或归档）后，更新计数、移出调度器并清理内存状态和日志目录
+
+    - **states**: {任务ID: 删除前的状态}
+    """
+    for state in states.values():
+        job_state_counters.adjust(state, None)
+    job_count_cache.invalidate()
+    remove_jobs(states)
+    for job_id in states:
+        job_stats.forget(job_id)
+        log_sampler.forget(job_id)
+    job_purger.purge(states)
+
+
+def _rollback_summary(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """atomic 模式下有失败条目：整批不写入，原本有效的条目也标记为未执行"""
+    for result in results:
+        if result["ok"]:
+            result.update(ok=False, msg="同批存在无效条目，未执行")
+    return _summary(results)
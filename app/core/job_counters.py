@@ -0,0 +1,186 @@
+"""
+任务状态计数
+
+/jobs/jobState、/jobs/jobStatus 由内存计数直接返回：新增、编辑、删除、停止、重启等
+接口在提交后调用 adjust 增量更新，后台线程每隔 JOB_STATE_RECONCILE_SECONDS 秒用一次
+``SELECT state, COUNT(*) ... GROUP BY state`` 校准，纠正其他进程或直接改库造成的偏差。
+
+只有尚未校准（启动后首次读取、invalidate 之后）时才在请求中查询。校准查询期间的
+adjust 会另外记录下来，查询结束后叠加到查询结果上，不会被校准覆盖。每次提交记下提交
+时刻，adjust 按当前上下文最近一次提交的时刻标记增量：查询开始前已提交的变更已包含在
+查询结果中，不再叠加。
+"""
+
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import Config
+from app.models.job import Job
+
+logger = logging.getLogger(__name__)
+
+STATE_WAITING = 0
+STATE_RUNNING = 1
+STATE_STOPPED = 2
+
+_COUNT_QUERY = select(Job.state, func.count(Job.id)).group_by(Job.state)
+
+# 当前上下文最近一次提交的时刻（time.monotonic），adjust 据此判断变更是否已在校准查询结果中
+_committed_at: ContextVar[Optional[float]] = ContextVar("job_counters_committed_at", default=None)
+
+
+@event.listens_for(Session, "after_commit")
+def _record_commit(session: Session) -> None:
+    _committed_at.set(time.monotonic())
+
+
+class _Snapshot:
+    """一次进行中的校准：查询开始时刻，以及期间记录的 (提交时刻, 原状态, 新状态)"""
+
+    def __init__(self) -> None:
+        self.deltas: List[Tuple[float, Optional[int], Optional[int]]] = []
+        self.started = time.monotonic()
+
+
+class JobStateCounters:
+    """按状态计数的任务数"""
+
+    def __init__(self, reconcile_seconds: Optional[float] = None):
+        self.reconcile_seconds = (
+            Config.JOB_STATE_RECONCILE_SECONDS if reconcile_seconds is None else reconcile_seconds
+        )
+        self._counts: Dict[int, int] = {}
+        self._reconciled_at: Optional[float] = None
+        # 进行中的校准各自记录查询期间的增量
+        self._pending: List[_Snapshot] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def adjust(self, old_state: Optional[int], new_state: Optional[int]) -> None:
+        """记录一次状态变化；新增任务 old_state 为 None，删除任务 new_state 为 None"""
+        if old_state == new_state:
+            return
+        # 调用方在提交后调用；当前上下文没有提交记录时按现在计，视为查询之后的变更
+        committed_at = _committed_at.get() or time.monotonic()
+        with self._lock:
+            if old_state is not None:
+                self._counts[old_state] = max(self._counts.get(old_state, 0) - 1, 0)
+            if new_state is not None:
+                self._counts[new_state] = self._counts.get(new_state, 0) + 1
+            for snapshot in self._pending:
+                snapshot.deltas.append((committed_at, old_state, new_state))
+
+    def _begin(self) -> _Snapshot:
+        """开始一次校准，紧接着执行查询"""
+        snapshot = _Snapshot()
+        with self._lock:
+            self._pending.append(snapshot)
+        return snapshot
+
+    def _finish(self, snapshot: _Snapshot, rows: Optional[list]) -> Dict[int, int]:
+        """结束一次校准：查询结果叠加查询开始后提交的增量再替换计数；查询失败时 rows 为 None"""
+        with self._lock:
+            self._pending.remove(snapshot)
+            if rows is None:
+                return dict(self._counts)
+            counts = {int(state or 0): int(count) for state, count in rows}
+            for committed_at, old_state, new_state in snapshot.deltas:
+                if committed_at < snapshot.started:
+                    continue
+                if old_state is not None:
+                    counts[old_state] = max(counts.get(old_state, 0) - 1, 0)
+                if new_state is not None:
+                    counts[new_state] = counts.get(new_state, 0) + 1
+            self._counts = counts
+            self._reconciled_at = time.monotonic()
+            return dict(counts)
+
+    async def reconcile(self, db: AsyncSession) -> Dict[int, int]:
+        """一次 GROUP BY 查询重建计数"""
+        snapshot = self._begin()
+        rows = None
+        try:
+            rows = (await db.execute(_COUNT_QUERY)).all()
+        finally:
+            counts = self._finish(snapshot, rows)
+        return counts
+
+    def reconcile_sync(self, db: Session) -> Dict[int, int]:
+        """同步会话版本的 reconcile，后台线程使用"""
+        snapshot = self._begin()
+        rows = None
+        try:
+            rows = db.execute(_COUNT_QUERY).all()
+        finally:
+            counts = self._finish(snapshot, rows)
+        return counts
+
+    def invalidate(self) -> None:
+        """下次读取时重新校准"""
+        with self._lock:
+            self._reconciled_at = None
+
+    async def counts(self, db: AsyncSession) -> Dict[int, int]:
+        """返回 {状态: 数量}；尚未校准时才查询数据库，之后的定期校准由后台线程完成"""
+        with self._lock:
+            if self._reconciled_at is not None:
+                return dict(self._counts)
+        return await self.reconcile(db)
+
+    async def summary(self, db: AsyncSession) -> Dict[str, int]:
+        counts = await self.counts(db)
+        return {
+            "total": sum(counts.values()),
+            "running": counts.get(STATE_RUNNING, 0),
+            "waiting": counts.get(STATE_WAITING, 0),
+            "stopped": counts.get(STATE_STOPPED, 0),
+        }
+
+    # ------------------------------------------------------------------
+    # 后台线程
+    # ------------------------------------------------------------------
+
+    def run_once(self, db: Optional[Session] = None) -> Dict[int, int]:
+        """执行一次校准；未传入会话时使用新会话"""
+        if db is None:
+            from app.deps import SessionLocal
+
+            with SessionLocal() as session:
+                return self.reconcile_sync(session)
+        return self.reconcile_sync(db)
+
+    def _run(self) -> None:
+        # 首次校准在第一次读取时完成，之后按间隔校准
+        while not self._stop.wait(self.reconcile_seconds):
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"任务状态计数校准失败: {e}")
+
+    def start(self) -> None:
+        """启动后台校准线程（校准间隔为0时只在首次读取时校准）"""
+        if self.reconcile_seconds <= 0:
+            return
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="job-state-counters", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止后台校准线程"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+job_state_counters = JobStateCounters()
@@ -3,15 +3,24 @@ import os
 import threading
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
+from app.config import Config
+from app.core.db_log_writer import build_exec_log_row, db_log_writer
+from app.core.log_policy import AGGREGATE_STATUS, log_sampler
+from app.core.log_pubsub import log_broker
+from app.core.log_sink import close_log_shipper, get_log_shipper
+from app.core.log_segment import close_all_segment_writers, get_segment_writer, iter_binary_logs
+from app.core.log_store import shared_log_store
+from app.core.output_store import output_store
 
 class JobLogger:
     """任务日志管理器 - 按照 runtime/jobs/任务id/年月/日.log 格式安全写入"""
 
-    def __init__(self, job_id: int, job_name: str):
+    def __init__(self, job_id: int, job_name: str, log_policy: Optional[str] = None):
         self.job_id = job_id
         self.job_name = job_name
+        self.log_policy = log_policy
         self._file_handles: Dict[str, Any] = {}
         self._file_mutex = threading.RLock()
         self._write_mutex = threading.Lock()
@@ -225,14 +234,10 @@ class JobLogger:
         except Exception as e:
             print(f"写入聚合日志失败: {e}")
 
-    def write_text_log(self, log_data: Dict[str, Any]) -> None:
-        """写入JSON格式聚合日志，便于结构化查询"""
-        log_path = self._get_log_path()
-        if not log_path:
-            return
-
-        # 构建JSON日志数据，使用get方法避免KeyError
-        json_log = {
+    def _build_json_log(self, log_data: Dict[str, Any]) -> Dict[str, Any]:
+        """构建统一结构的执行记录（JSON与二进制格式共用）"""
+        # 使用get方法避免KeyError
+        return {
             "time": log_data.get("time", datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]),
             "job_id": log_data.get("job_id", self.job_id),
             "job_name": log_data.get("job_name", self.job_name),
@@ -254,6 +259,58 @@ class JobLogger:
             "func_args": log_data.get("func_args", ""),
         }
 
+    def write_text_log(self, log_data: Dict[str, Any]) -> None:
+        """写入JSON格式聚合日志，便于结构化查询"""
+        json_log = self._build_json_log(log_data)
+        # 推送给实时日志订阅者
+        log_broker.publish_job_record(json_log)
+        # 按任务日志策略采样或汇总后落盘
+        for record in log_sampler.filter(self.job_id, self.log_policy, json_log):
+            is_summary = record.get("status") == AGGREGATE_STATUS
+            self._store_record(record, record if is_summary else log_data)
+
+    def _store_record(self, json_log: Dict[str, Any], log_data: Dict[str, Any]) -> None:
+        """按存储方式写入一条执行记录（log_data为原始汇总日志，db存储使用）"""
+        # 只在关键日志时执行fsync，减少IO开销
+        need_sync = log_data.get("status") == "失败" or bool(log_data.get("error_msg"))
+
+        # 投递到集中日志系统（只入队，不阻塞）
+        shipper = get_log_shipper()
+        if shipper is not None:
+            shipper.submit(json_log)
+
+        if Config.JOB_LOG_STORAGE == "db":
+            # 补全时间、任务ID等默认值后交给批量写入线程
+            row_data = dict(log_data)
+            row_data.update({k: json_log[k] for k in ("time", "job_id", "job_name")})
+            db_log_writer.submit(build_exec_log_row(row_data))
+            return
+
+        if Config.JOB_LOG_OUTPUT_DEDUPE:
+            try:
+                # 共享存储的输出包放在共享段日目录下，不再创建任务目录
+                json_log = output_store.dedupe(json_log, shared=Config.JOB_LOG_STORAGE == "shared")
+            except Exception as e:
+                print(f"保存执行输出失败: {e}")
+
+        if Config.JOB_LOG_STORAGE == "shared":
+            try:
+                shared_log_store.append(json_log, sync=need_sync)
+            except Exception as e:
+                print(f"写入共享日志段失败: {e}")
+            return
+
+        if Config.JOB_LOG_FORMAT == "binary":
+            try:
+                get_segment_writer(self.job_id).append(json_log, sync=need_sync)
+            except Exception as e:
+                print(f"写入二进制日志失败: {e}")
+            return
+
+        log_path = self._get_log_path()
+        if not log_path:
+            return
+
         # 获取文件句柄
         file_handle = self._get_file_handle(log_path)
         if not file_handle:
@@ -265,8 +322,7 @@ class JobLogger:
                 log_line = json.dumps(json_log, ensure_ascii=False) + "\n"
                 file_handle.write(log_line)
                 file_handle.flush()
-                # 只在关键日志时执行fsync，减少IO开销
-                if log_data.get("status") == "失败" or log_data.get("error_msg"):
+                if need_sync:
                     os.fsync(file_handle.fileno())
             except Exception as e:
                 print(f"写入JSON日志失败: {e}")
@@ -302,3 +358,64 @@ def close_all_job_loggers() -> None:
             except Exception as e:
                 print(f"关闭文件句柄失败 {path}: {e}")
         _file_handles.clear()
+    # 先写入未完成的汇总窗口，再关闭各存储
+    log_sampler.close()
+    close_log_shipper()
+    close_all_segment_writers()
+    shared_log_store.close()
+    db_log_writer.close()
+
+
+def _write_summary_record(summary: Dict[str, Any]) -> None:
+    """写入采样策略产生的窗口汇总记录"""
+    job_logger = JobLogger(job_id=summary["job_id"], job_name=summary.get("job_name", ""))
+    try:
+        job_logger._store_record(summary, summary)
+    finally:
+        job_logger.close_all_handles()
+
+
+log_sampler.on_summary = _write_summary_record
+
+
+def iter_job_log_records(job_id: int, date: str) -> Iterator[Dict[str, Any]]:
+    """逐条读取某任务某天（YYYY-MM-DD）的执行记录，按时间正序
+
+    依次读取JSON日志文件、二进制日志段和共享日志段，切换日志格式或存储方式后
+    历史记录仍可查询；去重保存的输出会按引用还原。
+    """
+    year_month = f"{date[:4]}{date[5:7]}"
+    day = date[8:10]
+    log_file = os.path.join("runtime", "jobs", str(job_id), year_month, f"{day}.log")
+
+    # (记录来源, 是否共享存储)：共享存储的输出包在共享段日目录下
+    sources: List[Tuple[Iterable[Dict[str, Any]], bool]] = [
+        (iter_binary_logs(job_id, date), False),
+        (shared_log_store.iter_job_records(job_id, date), True),
+    ]
+    if os.path.exists(log_file):
+        sources.insert(0, (_iter_json_log(log_file), False))
+
+    for records, shared in sources:
+        for record in records:
+            # 还原去重后的输出
+            if record.get("output_ref"):
+                output_store.rehydrate(record, shared=shared)
+            yield record
+
+
+def _iter_json_log(log_file: str) -> Iterator[Dict[str, Any]]:
+    with open(log_file, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def read_job_log_records(job_id: int, date: str) -> List[Dict[str, Any]]:
+    """读取某任务某天（YYYY-MM-DD）的执行记录，按时间正序"""
+    return list(iter_job_log_records(job_id, date))
@@ -0,0 +1,246 @@
+"""
+任务数据清理
+
+删除任务时，数据库中的执行记录由外键 ON DELETE CASCADE 删除（Job.logs 为
+passive_deletes，ORM 不再把关联行逐条加载到内存）；磁盘上的 runtime/jobs/<任务ID>
+目录交给后台清理：
+
+- 删除接口中只把目录改名到 runtime/purge/<任务ID>-<纳秒时间戳>（同一文件系统内
+  rename，耗时与文件数无关），之后复用相同 ID 的新任务不会读到旧日志
+- 共享日志段（JOB_LOG_STORAGE=shared）无法原地删除记录，删除接口中同步记下删除位置，
+  之后读取该任务时忽略此前的记录
+- 后台线程逐个删除文件，每 JOB_PURGE_BATCH 个文件暂停 JOB_PURGE_PAUSE_MS 毫秒
+- 同一后台线程清除任务在执行指标列文件和全局失败日志中的记录
+- 服务启动时继续清理上次未完成的目录
+
+执行记录单独存放在历史库（DATABASE_HISTORY_SQLITE_PATH）时没有跨库外键，删除任务后由
+同一后台线程经历史库写入队列按 JOB_PURGE_BATCH 行分批删除其执行记录；服务启动时清理
+已不存在的任务遗留的执行记录。
+
+后台清理只删除删除时刻之前的记录，任务ID被新任务复用时不会误删新任务的记录。
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple, Union
+
+from sqlalchemy import delete, distinct, select
+
+from app.config import Config
+from app.core.db_writer import DBWriteQueue, history_write_queue
+from app.core.failure_journal import failure_journal
+from app.core.log_retention import JOBS_DIR
+from app.core.log_segment import close_segment_writer
+from app.core.log_store import shared_log_store
+from app.core.metrics_store import metrics_store
+from app.core.output_store import output_store
+from app.models.job import Job
+from app.models.log import JobExecLog
+
+logger = logging.getLogger(__name__)
+
+PURGE_DIR = os.path.join("runtime", "purge")
+
+# 待清除记录的任务：(任务ID列表, 删除时刻的时间戳)
+PurgeRecords = Tuple[List[int], float]
+
+
+class JobPurger:
+    """后台分批删除已删除任务的日志目录"""
+
+    def __init__(
+        self,
+        batch_size: Optional[int] = None,
+        pause_ms: Optional[int] = None,
+        jobs_dir: str = JOBS_DIR,
+        purge_dir: str = PURGE_DIR,
+        history_queue: Optional[DBWriteQueue] = None,
+    ):
+        self.batch_size = batch_size or Config.JOB_PURGE_BATCH
+        self.pause = (Config.JOB_PURGE_PAUSE_MS if pause_ms is None else pause_ms) / 1000.0
+        self.jobs_dir = jobs_dir
+        self.purge_dir = purge_dir
+        # 执行记录在单独的历史库时用于删除执行记录，否则由外键级联删除，为 None
+        if history_queue is None and Config.history_database_separate():
+            history_queue = history_write_queue
+        self.history_queue = history_queue
+        # 待删除的日志目录，或待清除记录的任务
+        self._queue: "queue.Queue[Union[str, PurgeRecords]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def purge(self, job_ids: Iterable[int]) -> int:
+        """移走任务日志目录并排队删除，排队清除任务的其他记录，返回排队的目录数"""
+        job_ids = list(job_ids)
+        if job_ids:
+            self._queue.put((job_ids, time.time()))
+            self._ensure_thread()
+        queued = 0
+        for job_id in job_ids:
+            close_segment_writer(job_id)
+            output_store.forget(job_id)
+            try:
+                shared_log_store.forget_job(job_id)
+            except OSError as e:
+                logger.error(f"记录共享日志删除位置失败 (任务 {job_id}): {e}")
+            source = os.path.join(self.jobs_dir, str(job_id))
+            if not os.path.isdir(source):
+                continue
+            target = os.path.join(self.purge_dir, f"{job_id}-{time.time_ns()}")
+            try:
+                os.makedirs(self.purge_dir, exist_ok=True)
+                os.rename(source, target)
+            except OSError as e:
+                # 无法改名（如文件被占用）时原地删除
+                logger.warning(f"移动任务日志目录失败，原地清理 {source}: {e}")
+                target = source
+            self._queue.put(target)
+            queued += 1
+        if queued:
+            self._ensure_thread()
+        return queued
+
+    def resume(self) -> int:
+        """排队清理上次未完成的目录（及历史库中已删除任务遗留的执行记录）"""
+        if self.history_queue is not None:
+            try:
+                orphans = self._orphan_history_job_ids()
+            except Exception as e:
+                logger.error(f"查询遗留执行记录失败: {e}")
+                orphans = []
+            if orphans:
+                self._queue.put((orphans, time.time()))
+                self._ensure_thread()
+        try:
+            entries = [entry.path for entry in os.scandir(self.purge_dir) if entry.is_dir()]
+        except OSError:
+            return 0
+        for path in entries:
+            self._queue.put(path)
+        if entries:
+            self._ensure_thread()
+        return len(entries)
+
+    def _ensure_thread(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="job-purger", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        # 队列清空后退出，下次 purge 时再启动（在锁内判断，避免与 _ensure_thread 竞争）
+        while not self._stop.is_set():
+            with self._lock:
+                try:
+                    path = self._queue.get_nowait()
+                except queue.Empty:
+                    self._thread = None
+                    return
+            if isinstance(path, tuple):
+                self._purge_records(*path)
+                continue
+            try:
+                removed = self._remove_tree(path)
+                logger.info(f"已清理任务日志目录 {path}，删除 {removed} 个文件")
+            except Exception as e:
+                logger.error(f"清理任务日志目录失败 {path}: {e}")
+        with self._lock:
+            self._thread = None
+
+    def _remove_tree(self, path: str) -> int:
+        """自底向上逐个删除文件和空目录，返回删除的文件数"""
+        removed = 0
+        for root, _, files in os.walk(path, topdown=False):
+            for name in files:
+                if self._stop.is_set():
+                    return removed
+                try:
+                    os.remove(os.path.join(root, name))
+                except FileNotFoundError:
+                    pass
+                removed += 1
+                if self.pause > 0 and removed % self.batch_size == 0:
+                    self._stop.wait(self.pause)
+            try:
+                os.rmdir(root)
+            except OSError:
+                pass
+        return removed
+
+    def _purge_records(self, job_ids: List[int], deleted_at: float) -> None:
+        """清除任务在删除时刻之前的执行记录、执行指标和失败日志"""
+        if self.history_queue is not None:
+            try:
+                removed = self._delete_history(job_ids, deleted_at)
+                logger.info(f"已删除 {len(job_ids)} 个任务的执行记录 {removed} 条")
+            except Exception as e:
+                logger.error(f"删除执行记录失败 {job_ids[:10]}: {e}")
+        try:
+            metrics_store.forget(job_ids, deleted_at)
+        except Exception as e:
+            logger.error(f"删除执行指标失败 {job_ids[:10]}: {e}")
+        try:
+            failure_journal.forget(job_ids, deleted_at)
+        except Exception as e:
+            logger.error(f"删除失败日志失败 {job_ids[:10]}: {e}")
+
+    def _delete_history(self, job_ids: List[int], deleted_at: float) -> int:
+        """经历史库写入队列分批删除任务在删除时刻之前的执行记录，返回删除的行数"""
+        assert self.history_queue is not None
+        # 执行记录的 created_at 为本地时间
+        cutoff = datetime.fromtimestamp(deleted_at)
+        removed = 0
+        for start in range(0, len(job_ids), self.batch_size):
+            chunk = job_ids[start : start + self.batch_size]
+            while not self._stop.is_set():
+                ids_q = (
+                    select(JobExecLog.id)
+                    .where(JobExecLog.job_id.in_(chunk), JobExecLog.created_at <= cutoff)
+                    .limit(self.batch_size)
+                )
+                count = self.history_queue.execute(
+                    lambda conn: conn.execute(
+                        delete(JobExecLog).where(JobExecLog.id.in_(ids_q.scalar_subquery()))
+                    ).rowcount
+                )
+                removed += count
+                if count < self.batch_size:
+                    break
+                if self.pause > 0:
+                    self._stop.wait(self.pause)
+        return removed
+
+    def _orphan_history_job_ids(self) -> List[int]:
+        """历史库中有执行记录、主库中已不存在的任务ID"""
+        from app.deps import engine
+
+        assert self.history_queue is not None
+        with self.history_queue.bind.connect() as conn:
+            history_ids = conn.execute(select(distinct(JobExecLog.job_id))).scalars().all()
+        orphans: List[int] = []
+        with engine.connect() as conn:
+            for start in range(0, len(history_ids), self.batch_size):
+                chunk = history_ids[start : start + self.batch_size]
+                existing = set(conn.execute(select(Job.id).where(Job.id.in_(chunk))).scalars())
+                orphans.extend(job_id for job_id in chunk if job_id not in existing)
+        return orphans
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        """等待已排队的目录清理完成"""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def stop(self) -> None:
+        """停止后台线程（未清理完的目录下次启动时继续）"""
+        self._stop.set()
+        self.join(timeout=5)
+
+
+job_purger = JobPurger()
@@ -0,0 +1,144 @@
+"""
+任务列表查询
+
+/jobs/list 的过滤、排序和键集分页：
+
+- 过滤：state、mode、trigger_type、名称前缀、标签
+- 排序：id 或 updated_at（升序/降序），相同 updated_at 以 id 区分
+- 键集分页：游标编码上一页最后一条的 (排序值, id)，下一页从游标之后开始，
+  不使用 OFFSET，翻到第几页都只扫描 size 条索引记录
+- 总数：按过滤条件缓存 JOB_LIST_COUNT_CACHE_SECONDS 秒，任务增删改时清空
+"""
+
+import base64
+import json
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import Select, and_, func, literal, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import Config
+from app.models.job import Job
+
+SORT_FIELDS = ("id", "-id", "updated_at", "-updated_at")
+MAX_CACHED_COUNTS = 1024
+
+
+def name_prefix_condition(column: Any, prefix: str) -> Any:
+    """名称前缀条件：LIKE 'prefix%'，转义前缀中的通配符
+
+    不使用 name < prefix + U+10FFFF 的范围上界，MySQL utf8（3字节）字符集无法表示该字符。
+    """
+    escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return column.like(escaped + "%", escape="\\")
+
+
+def apply_job_filters(
+    q: Select,
+    state: Optional[int] = None,
+    mode: Optional[str] = None,
+    trigger_type: Optional[str] = None,
+    name: str = "",
+    tag: str = "",
+) -> Select:
+    """追加过滤条件"""
+    if state is not None:
+        q = q.where(Job.state == state)
+    if mode:
+        q = q.where(Job.mode == mode)
+    if trigger_type:
+        q = q.where(Job.trigger_type == trigger_type)
+    if name:
+        q = q.where(name_prefix_condition(Job.name, name))
+    if tag:
+        # tags 为逗号分隔，两端补逗号后整词匹配
+        q = q.where((literal(",") + Job.tags + literal(",")).contains(f",{tag},"))
+    return q
+
+
+def encode_cursor(job: Job, sort: str) -> str:
+    """编码游标：(排序值, id) 的 JSON 经 urlsafe base64"""
+    if sort.lstrip("-") == "updated_at":
+        value: Any = job.updated_at.isoformat() if job.updated_at else ""
+    else:
+        value = job.id
+    raw = json.dumps([value, job.id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[Any, int]:
+    """解码游标，格式错误抛出 ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, job_id = json.loads(raw)
+        job_id = int(job_id)
+        if sort.lstrip("-") == "updated_at":
+            value = datetime.fromisoformat(value)
+        else:
+            value = int(value)
+    except (TypeError, ValueError) as e:
+        raise ValueError("翻页游标无效") from e
+    return value, job_id
+
+
+def apply_keyset(q: Select, sort: str, cursor: Optional[str]) -> Select:
+    """按排序字段排序，并从游标之后开始"""
+    descending = sort.startswith("-")
+    if sort.lstrip("-") == "updated_at":
+        column = Job.updated_at
+        order = [column.desc(), Job.id.desc()] if descending else [column.asc(), Job.id.asc()]
+    else:
+        column = None
+        order = [Job.id.desc()] if descending else [Job.id.asc()]
+
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort)
+        if column is None:
+            q = q.where(Job.id < last_id if descending else Job.id > last_id)
+        elif descending:
+            q = q.where(or_(column < value, and_(column == value, Job.id < last_id)))
+        else:
+            q = q.where(or_(column > value, and_(column == value, Job.id > last_id)))
+    return q.order_by(*order)
+
+
+async def list_jobs_page(
+    db: AsyncSession, q: Select, sort: str, cursor: Optional[str], size: int
+) -> Tuple[List[Job], Optional[str]]:
+    """键集分页查询一页，返回 (任务列表, 下一页游标)；多取一条判断是否还有下一页"""
+    jobs = list((await db.scalars(apply_keyset(q, sort, cursor).limit(size + 1))).all())
+    next_cursor = encode_cursor(jobs[size - 1], sort) if len(jobs) > size else None
+    return jobs[:size], next_cursor
+
+
+class JobCountCache:
+    """按过滤条件缓存任务总数"""
+
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = Config.JOB_LIST_COUNT_CACHE_SECONDS if ttl is None else ttl
+        self._items: Dict[Tuple[Any, ...], Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+
+    async def count(self, db: AsyncSession, q: Select, key: Tuple[Any, ...]) -> int:
+        now = time.monotonic()
+        with self._lock:
+            cached = self._items.get(key)
+        if cached is not None and now - cached[0] < self.ttl:
+            return cached[1]
+        total = await db.scalar(select(func.count()).select_from(q.order_by(None).subquery())) or 0
+        if self.ttl > 0:
+            with self._lock:
+                if len(self._items) >= MAX_CACHED_COUNTS:
+                    self._items.clear()
+                self._items[key] = (now, total)
+        return total
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+job_count_cache = JobCountCache()
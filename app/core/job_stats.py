@@ -0,0 +1,321 @@
+"""
+任务执行统计（内存）
+
+每次任务执行完成时更新：
+
+- 每个任务一个基于 array 的环形缓冲区，保存最近 JOB_STATS_WINDOW_SIZE 次执行的
+  时间、耗时和结果，用于计算时间窗口内的成功率和耗时分位数
+- 每个任务一个流式分位数草图（对数分桶，相对误差约1%），统计全部历史的 p50/p95/p99
+
+统计数据定期快照到 runtime/job_stats.json，重启后恢复。快照时只在锁内复制环形缓冲区，
+序列化和写文件在锁外进行，不阻塞 record；两次快照之间没有新记录时跳过写入。
+
+环形缓冲区只保存最近 N 次执行，执行频繁的任务其时间窗口统计可能覆盖不到整个窗口，
+summary 返回 samples（缓冲区中的记录数）、covered_since（缓冲区最早记录的时间）和
+truncated（窗口早于最早记录且缓冲区已满，即窗口统计不完整）。
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from array import array
+from typing import Any, Dict, List, Optional
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class QuantileSketch:
+    """对数分桶的分位数草图，相对误差为 relative_accuracy"""
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        if value <= 0:
+            self.zero_count += 1
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+        seen = self.zero_count
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                # 返回桶的中点估计
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "buckets": {str(k): v for k, v in self.buckets.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "QuantileSketch":
+        sketch = cls(data.get("relative_accuracy", 0.01))
+        sketch.zero_count = int(data.get("zero_count", 0))
+        sketch.count = int(data.get("count", 0))
+        sketch.buckets = {int(k): int(v) for k, v in data.get("buckets", {}).items()}
+        return sketch
+
+
+def _percentile(sorted_values: List[int], q: float) -> Optional[float]:
+    """线性插值分位数"""
+    if not sorted_values:
+        return None
+    position = q * (len(sorted_values) - 1)
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    fraction = position - lower
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * fraction
+
+
+class JobWindow:
+    """单个任务最近N次执行的环形缓冲区"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.timestamps = array("d", [0.0] * capacity)
+        self.durations = array("l", [0] * capacity)
+        self.outcomes = array("b", [0] * capacity)
+        self.head = 0  # 下一个写入位置
+        self.size = 0
+        self.sketch = QuantileSketch()
+        self.total_runs = 0
+        self.total_failures = 0
+
+    def add(self, timestamp: float, duration_ms: int, success: bool) -> None:
+        self.timestamps[self.head] = timestamp
+        self.durations[self.head] = duration_ms
+        self.outcomes[self.head] = 1 if success else 0
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        self.sketch.add(duration_ms)
+        self.total_runs += 1
+        if not success:
+            self.total_failures += 1
+
+    def copy(self) -> "JobWindow":
+        """复制当前状态（array 按内存整体复制），用于在锁外序列化"""
+        window = JobWindow.__new__(JobWindow)
+        window.capacity = self.capacity
+        window.timestamps = array("d", self.timestamps)
+        window.durations = array("l", self.durations)
+        window.outcomes = array("b", self.outcomes)
+        window.head = self.head
+        window.size = self.size
+        window.sketch = QuantileSketch.from_dict(self.sketch.to_dict())
+        window.total_runs = self.total_runs
+        window.total_failures = self.total_failures
+        return window
+
+    def _ordered_indexes(self) -> range:
+        """按时间正序的下标（相对head偏移）"""
+        return range(self.head - self.size, self.head)
+
+    def summary(self, since: float) -> Dict[str, Any]:
+        durations: List[int] = []
+        successes = 0
+        last_run_at = None
+        for i in self._ordered_indexes():
+            index = i % self.capacity
+            timestamp = self.timestamps[index]
+            last_run_at = timestamp
+            if timestamp < since:
+                continue
+            durations.append(self.durations[index])
+            successes += self.outcomes[index]
+        durations.sort()
+        runs = len(durations)
+        oldest = self.timestamps[(self.head - self.size) % self.capacity] if self.size else None
+        return {
+            "samples": self.size,
+            "covered_since": oldest,
+            "truncated": self.size == self.capacity and oldest is not None and oldest > since,
+            "runs": runs,
+            "success": successes,
+            "failures": runs - successes,
+            "success_rate": round(successes / runs, 4) if runs else None,
+            "p50_ms": _percentile(durations, 0.5),
+            "p95_ms": _percentile(durations, 0.95),
+            "p99_ms": _percentile(durations, 0.99),
+            "last_run_at": last_run_at,
+            "lifetime": {
+                "runs": self.total_runs,
+                "failures": self.total_failures,
+                **{
+                    f"p{int(q * 100)}_ms": self.sketch.quantile(q)
+                    for q in QUANTILES
+                },
+            },
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        indexes = [i % self.capacity for i in self._ordered_indexes()]
+        return {
+            "timestamps": [self.timestamps[i] for i in indexes],
+            "durations": [self.durations[i] for i in indexes],
+            "outcomes": [self.outcomes[i] for i in indexes],
+            "sketch": self.sketch.to_dict(),
+            "total_runs": self.total_runs,
+            "total_failures": self.total_failures,
+        }
+
+    @classmethod
+    def from_dict(cls, capacity: int, data: Dict[str, Any]) -> "JobWindow":
+        window = cls(capacity)
+        samples = list(zip(data.get("timestamps", []), data.get("durations", []), data.get("outcomes", [])))
+        for timestamp, duration_ms, outcome in samples[-capacity:]:
+            window.timestamps[window.head] = timestamp
+            window.durations[window.head] = int(duration_ms)
+            window.outcomes[window.head] = 1 if outcome else 0
+            window.head = (window.head + 1) % capacity
+            window.size = min(window.size + 1, capacity)
+        window.sketch = QuantileSketch.from_dict(data.get("sketch", {}))
+        window.total_runs = int(data.get("total_runs", 0))
+        window.total_failures = int(data.get("total_failures", 0))
+        return window
+
+
+class JobStats:
+    """所有任务的滚动执行统计"""
+
+    def __init__(self, window_size: Optional[int] = None, snapshot_path: Optional[str] = None):
+        self.window_size = window_size or Config.JOB_STATS_WINDOW_SIZE
+        self.snapshot_path = snapshot_path or os.path.join("runtime", "job_stats.json")
+        self._windows: Dict[int, JobWindow] = {}
+        self._lock = threading.Lock()
+        # 上次快照后是否有新记录
+        self._dirty = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def record(
+        self, job_id: int, duration_ms: int, success: bool, timestamp: Optional[float] = None
+    ) -> None:
+        """记录一次执行结果"""
+        with self._lock:
+            window = self._windows.get(job_id)
+            if window is None:
+                window = JobWindow(self.window_size)
+                self._windows[job_id] = window
+            window.add(timestamp or time.time(), duration_ms, success)
+            self._dirty = True
+
+    def forget(self, job_id: int) -> None:
+        with self._lock:
+            if self._windows.pop(job_id, None) is not None:
+                self._dirty = True
+
+    def summary(self, job_id: int, window_seconds: int = 3600) -> Optional[Dict[str, Any]]:
+        """某任务在最近window_seconds秒内的统计，无记录返回None"""
+        since = time.time() - window_seconds
+        with self._lock:
+            window = self._windows.get(job_id)
+            if window is None:
+                return None
+            return {"job_id": job_id, "window_seconds": window_seconds, **window.summary(since)}
+
+    def all_summaries(self, window_seconds: int = 3600) -> List[Dict[str, Any]]:
+        with self._lock:
+            job_ids = sorted(self._windows)
+        return [s for s in (self.summary(job_id, window_seconds) for job_id in job_ids) if s]
+
+    # ------------------------------------------------------------------
+    # 快照
+    # ------------------------------------------------------------------
+
+    def save(self, force: bool = False) -> bool:
+        """原子写入快照文件，没有新记录时跳过（force 除外），返回是否写入"""
+        with self._lock:
+            if not self._dirty and not force:
+                return False
+            windows = {job_id: window.copy() for job_id, window in self._windows.items()}
+            self._dirty = False
+        try:
+            self._write_snapshot(windows)
+        except Exception:
+            with self._lock:
+                self._dirty = True
+            raise
+        return True
+
+    def _write_snapshot(self, windows: Dict[int, JobWindow]) -> None:
+        data = {str(job_id): window.to_dict() for job_id, window in windows.items()}
+        directory = os.path.dirname(self.snapshot_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"saved_at": time.time(), "jobs": data}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.snapshot_path)
+
+    def load(self) -> int:
+        """从快照恢复，返回恢复的任务数"""
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError) as e:
+            logger.error(f"读取任务统计快照失败: {e}")
+            return 0
+        windows = {
+            int(job_id): JobWindow.from_dict(self.window_size, window)
+            for job_id, window in data.get("jobs", {}).items()
+        }
+        with self._lock:
+            self._windows.update(windows)
+        return len(windows)
+
+    def _run(self) -> None:
+        while not self._stop.wait(Config.JOB_STATS_SNAPSHOT_INTERVAL):
+            try:
+                self.save()
+            except Exception as e:
+                logger.error(f"保存任务统计快照失败: {e}")
+
+    def start(self) -> None:
+        """加载快照并启动定期保存线程"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self.load()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="job-stats-snapshot", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止定期保存并写入最终快照"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        try:
+            self.save()
+        except Exception as e:
+            logger.error(f"保存任务统计快照失败: {e}")
+
+
+job_stats = JobStats()
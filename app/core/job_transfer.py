@@ -0,0 +1,216 @@
+"""
+任务导入导出
+
+用于在环境之间迁移任务。每行一个任务的 NDJSON，包含 Job 表全部字段（含状态、执行次数和
+时间戳），可原样导入：
+
+    {"id": 1, "name": "...", "cron_expr": "0 0 * * *", ..., "state": 1, "run_count": 42,
+     "created_at": "2024-01-01T00:00:00", "updated_at": "2024-01-02T08:00:00"}
+
+导出按主键分批读取；导入逐行解析，每 batch_size 条按 id 做一次 upsert（已存在更新、
+不存在按原 id 插入）并提交，内存占用只与批大小有关。整批写入出错时回滚该批并逐条重试，
+写入失败的行记入导入结果的错误列表。
+"""
+
+import datetime
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.core.job_bulk import chunked, format_validation_error, job_view
+from app.core.job_counters import job_state_counters
+from app.core.job_query import job_count_cache
+from app.core.scheduler import add_jobs_to_scheduler, remove_jobs
+from app.models.job import Job
+from app.models.schemas import JobCreate
+
+DEFAULT_BATCH_SIZE = 1000
+# 导入结果中最多返回的错误条数
+MAX_REPORTED_ERRORS = 100
+
+EXPORT_FIELDS = tuple(column.key for column in Job.__table__.columns)
+DATETIME_FIELDS = ("created_at", "updated_at")
+
+
+def job_to_record(values: Any) -> Dict[str, Any]:
+    """任务（ORM对象或行映射）转为导出记录"""
+    if isinstance(values, Job):
+        record = {field: getattr(values, field) for field in EXPORT_FIELDS}
+    else:
+        record = {field: values[field] for field in EXPORT_FIELDS}
+    for field in DATETIME_FIELDS:
+        if record[field] is not None:
+            record[field] = record[field].isoformat()
+    return record
+
+
+def iter_job_records(db: Session, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+    """按主键分批读取全部任务（直接读取行，不构造ORM对象）"""
+    table = Job.__table__
+    last_id = 0
+    while True:
+        rows = (
+            db.execute(select(table).where(table.c.id > last_id).order_by(table.c.id).limit(batch_size))
+            .mappings()
+            .all()
+        )
+        if not rows:
+            return
+        for row in rows:
+            yield job_to_record(row)
+        last_id = rows[-1]["id"]
+
+
+def parse_record(data: Any) -> Dict[str, Any]:
+    """校验一条导入记录，返回可直接写入的字段，格式错误抛出 ValueError"""
+    if not isinstance(data, dict):
+        raise ValueError("记录必须是JSON对象")
+    job_id = data.get("id")
+    if not isinstance(job_id, int) or isinstance(job_id, bool) or job_id < 1:
+        raise ValueError("id: 缺少有效的任务ID")
+    try:
+        row = JobCreate.model_validate(data).model_dump()
+    except ValidationError as e:
+        raise ValueError(format_validation_error(e)) from e
+    if not row["cron_expr"]:
+        raise ValueError("cron_expr: cron表达式不能为空")
+    row["id"] = job_id
+    row["run_count"] = int(data.get("run_count") or 0)
+    now = datetime.datetime.utcnow()
+    for field in DATETIME_FIELDS:
+        value = data.get(field)
+        try:
+            row[field] = datetime.datetime.fromisoformat(value) if value else now
+        except TypeError as e:
+            raise ValueError(f"{field}: 时间格式错误") from e
+    return row
+
+
+class JobImporter:
+    """逐行导入，每 batch_size 条 upsert 并提交一次"""
+
+    def __init__(self, db: Session, batch_size: int = DEFAULT_BATCH_SIZE, schedule: bool = True):
+        self.db = db
+        self.batch_size = batch_size
+        # 是否同步调度器（离线导入时为False）
+        self.schedule = schedule
+        self.line_no = 0
+        self.inserted = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+        # (行号, 记录)
+        self._batch: List[Tuple[int, Dict[str, Any]]] = []
+
+    def _fail(self, line_no: int, msg: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line_no, "msg": msg})
+
+    def feed(self, line: Any) -> None:
+        """导入一行（str / bytes），空行忽略"""
+        self.line_no += 1
+        if not line.strip():
+            return
+        try:
+            if isinstance(line, bytes):
+                line = line.decode("utf-8")
+            self._batch.append((self.line_no, parse_record(json.loads(line))))
+        except ValueError as e:
+            self._fail(self.line_no, str(e))
+            return
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def feed_lines(self, lines: Iterable[Any]) -> None:
+        for line in lines:
+            self.feed(line)
+
+    def flush(self) -> None:
+        """写入当前批次"""
+        batch, self._batch = self._batch, []
+        if not batch:
+            return
+        # 同一批内重复的 id 以最后一条为准
+        lines = list({row["id"]: (line_no, row) for line_no, row in batch}.values())
+        rows = [row for _, row in lines]
+        existing: Dict[int, int] = {}
+        for chunk in chunked([row["id"] for row in rows]):
+            existing.update(self.db.query(Job.id, Job.state).filter(Job.id.in_(chunk)).all())
+        try:
+            self._write(rows, existing)
+        except SQLAlchemyError:
+            self.db.rollback()
+            rows = self._write_each(lines, existing)
+        self.db.expire_all()
+        if self.schedule:
+            self._apply_schedule(rows, existing)
+
+    def _write(self, rows: List[Dict[str, Any]], existing: Dict[int, int]) -> None:
+        """在一个事务内插入新任务、更新已有任务并提交"""
+        inserts = [row for row in rows if row["id"] not in existing]
+        updates = [row for row in rows if row["id"] in existing]
+        if inserts:
+            self.db.bulk_insert_mappings(Job, inserts)
+        if updates:
+            self.db.bulk_update_mappings(Job, updates)
+        self.db.commit()
+        self.inserted += len(inserts)
+        self.updated += len(updates)
+
+    def _write_each(
+        self, lines: List[Tuple[int, Dict[str, Any]]], existing: Dict[int, int]
+    ) -> List[Dict[str, Any]]:
+        """整批写入失败后逐条写入，返回写入成功的记录"""
+        written: List[Dict[str, Any]] = []
+        for line_no, row in lines:
+            try:
+                self._write([row], existing)
+            except SQLAlchemyError as e:
+                self.db.rollback()
+                self._fail(line_no, f"写入失败: {getattr(e, 'orig', None) or e}")
+                continue
+            written.append(row)
+        return written
+
+    def _apply_schedule(self, rows: List[Dict[str, Any]], existing: Dict[int, int]) -> None:
+        stopped = [row["id"] for row in rows if row["state"] == 2 and row["id"] in existing]
+        if stopped:
+            remove_jobs(stopped)
+        add_jobs_to_scheduler(job_view(row) for row in rows if row["state"] != 2)
+
+    def finish(self) -> Dict[str, Any]:
+        """写入剩余记录并返回统计"""
+        self.flush()
+        job_state_counters.invalidate()
+        job_count_cache.invalidate()
+        return {
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "failed": self.failed,
+            "errors": self.errors,
+        }
+
+
+def import_lines(
+    db: Session, lines: Iterable[Any], batch_size: int = DEFAULT_BATCH_SIZE, schedule: bool = True
+) -> Dict[str, Any]:
+    importer = JobImporter(db, batch_size, schedule)
+    importer.feed_lines(lines)
+    return importer.finish()
+
+
+def iter_stream_lines(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """把字节块流（如逐块读取的请求体）切分为行"""
+    buffer = b""
+    for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
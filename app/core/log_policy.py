@@ -0,0 +1,180 @@
+"""
+任务日志采样策略
+
+高频任务（秒级 cron、短 interval）每天产生大量几乎相同的成功记录，按任务配置
+Job.log_policy 决定哪些执行记录落盘：
+
+- ``always``：每次执行都写入（默认）
+- ``sample:N``：失败全部写入，成功每N次写入1次（记录带 sampled=N）
+- ``aggregate:秒``：失败照常写入，每个时间窗口写入一条汇总记录（次数、成功/失败数、
+  最小/最大/平均耗时、最后一次输出）
+
+实时推送、内存统计和时序指标不受采样影响，每次执行都会更新。
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.models.fields import POLICY_AGGREGATE, POLICY_ALWAYS, POLICY_SAMPLE, parse_log_policy
+
+logger = logging.getLogger(__name__)
+
+AGGREGATE_STATUS = "汇总"
+
+
+class _Window:
+    """汇总窗口"""
+
+    __slots__ = ("started", "count", "failures", "min_ms", "max_ms", "total_ms", "last")
+
+    def __init__(self, started: float):
+        self.started = started
+        self.count = 0
+        self.failures = 0
+        self.min_ms = 0
+        self.max_ms = 0
+        self.total_ms = 0
+        self.last: Dict[str, Any] = {}
+
+    def add(self, record: Dict[str, Any], failed: bool) -> None:
+        duration = int(record.get("duration_ms") or 0)
+        self.min_ms = duration if self.count == 0 else min(self.min_ms, duration)
+        self.max_ms = max(self.max_ms, duration)
+        self.total_ms += duration
+        self.count += 1
+        if failed:
+            self.failures += 1
+        self.last = record
+
+    def summary(self, ended: float) -> Dict[str, Any]:
+        mean_ms = int(self.total_ms / self.count) if self.count else 0
+        return {
+            "time": datetime.fromtimestamp(ended).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
+            "job_id": self.last.get("job_id"),
+            "job_name": self.last.get("job_name", ""),
+            "status": AGGREGATE_STATUS,
+            "duration_ms": mean_ms,
+            "mode": self.last.get("mode", ""),
+            "command": self.last.get("command", ""),
+            "output": self.last.get("output", ""),
+            "error_msg": "",
+            "aggregate": {
+                "window_start": datetime.fromtimestamp(self.started).strftime("%Y-%m-%d %H:%M:%S"),
+                "count": self.count,
+                "success": self.count - self.failures,
+                "failures": self.failures,
+                "min_ms": self.min_ms,
+                "max_ms": self.max_ms,
+                "mean_ms": mean_ms,
+            },
+        }
+
+
+class LogSampler:
+    """按任务策略过滤执行记录"""
+
+    def __init__(self, flush_interval: float = 1.0):
+        self.flush_interval = flush_interval
+        self._counters: Dict[int, int] = {}
+        self._windows: Dict[int, Tuple[int, _Window]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # 窗口到期时写入汇总记录的回调
+        self.on_summary: Optional[Callable[[Dict[str, Any]], None]] = None
+
+    def filter(
+        self, job_id: int, policy: Optional[str], record: Dict[str, Any], now: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """返回需要落盘的记录（可能为空，也可能包含上一窗口的汇总）"""
+        try:
+            mode, value = parse_log_policy(policy)
+        except ValueError:
+            mode, value = POLICY_ALWAYS, 0
+        if mode == POLICY_ALWAYS:
+            return [record]
+
+        failed = record.get("status") == "失败" or bool(record.get("error_msg"))
+        if mode == POLICY_SAMPLE:
+            if failed:
+                return [record]
+            with self._lock:
+                count = self._counters.get(job_id, 0)
+                self._counters[job_id] = count + 1
+            if count % value != 0:
+                return []
+            sampled = dict(record)
+            sampled["sampled"] = value
+            return [sampled]
+
+        now = time.time() if now is None else now
+        records: List[Dict[str, Any]] = [record] if failed else []
+        with self._lock:
+            current = self._windows.get(job_id)
+            if current is not None and (current[0] != value or now - current[1].started >= value):
+                records.append(current[1].summary(now))
+                current = None
+            if current is None:
+                current = (value, _Window(now))
+                self._windows[job_id] = current
+            current[1].add(record, failed)
+        self._ensure_thread()
+        return records
+
+    def forget(self, job_id: int) -> None:
+        with self._lock:
+            self._counters.pop(job_id, None)
+            self._windows.pop(job_id, None)
+
+    def flush_expired(self, now: Optional[float] = None, force: bool = False) -> List[Dict[str, Any]]:
+        """取出已到期（force时为全部）窗口的汇总记录"""
+        now = time.time() if now is None else now
+        summaries = []
+        with self._lock:
+            for job_id, (seconds, window) in list(self._windows.items()):
+                if force or now - window.started >= seconds:
+                    summaries.append(window.summary(now))
+                    del self._windows[job_id]
+        return summaries
+
+    def _emit(self, summaries: List[Dict[str, Any]]) -> None:
+        if self.on_summary is None:
+            return
+        for summary in summaries:
+            try:
+                self.on_summary(summary)
+            except Exception as e:
+                logger.error(f"写入汇总日志失败 (任务 {summary.get('job_id')}): {e}")
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="log-sampler", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self._emit(self.flush_expired())
+            with self._lock:
+                if not self._windows:
+                    self._thread = None
+                    return
+
+    def close(self) -> None:
+        """停止后台线程并写入所有未完成窗口的汇总"""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout=5)
+        self._thread = None
+        self._emit(self.flush_expired(force=True))
+
+
+log_sampler = LogSampler()
@@ -0,0 +1,157 @@
+"""
+进程内日志发布/订阅
+
+JobLogger 写入执行记录时发布到 ``job:任务ID`` 和 ``job:*`` 主题，系统日志由
+单个跟随线程发布到 ``system`` 主题。每个订阅者拥有一个有界的 asyncio 队列，
+发布方在任意线程调用 ``publish``，通过 ``call_soon_threadsafe`` 投递到订阅者
+所在的事件循环；队列已满的慢订阅者会被直接断开，而不是无限缓冲。
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Set
+
+from app.config import Config
+from app.core.log_tail import read_since
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_TOPIC = "system"
+ALL_JOBS_TOPIC = "job:*"
+
+
+def job_topic(job_id: int) -> str:
+    return f"job:{job_id}"
+
+
+class Subscription:
+    """单个订阅者，队列中的 None 表示订阅已被断开"""
+
+    def __init__(self, topic: str, loop: asyncio.AbstractEventLoop, maxsize: int):
+        self.topic = topic
+        self.loop = loop
+        self.queue: "asyncio.Queue[Optional[Any]]" = asyncio.Queue(maxsize=maxsize)
+        self.dropped = False
+
+    def _deliver(self, item: Any) -> None:
+        """在订阅者的事件循环中执行"""
+        if self.dropped:
+            return
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            # 慢订阅者：腾出一个位置放入结束标记
+            self.dropped = True
+            try:
+                self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+            self.queue.put_nowait(None)
+
+
+class LogBroker:
+    """主题 -> 订阅者集合"""
+
+    def __init__(self, queue_size: Optional[int] = None):
+        self.queue_size = queue_size or Config.LOG_STREAM_QUEUE_SIZE
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, topic: str, loop: Optional[asyncio.AbstractEventLoop] = None) -> Subscription:
+        subscription = Subscription(topic, loop or asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.topic]
+
+    def has_subscribers(self, topic: str) -> bool:
+        return topic in self._subscribers
+
+    def subscriber_count(self, topic: str) -> int:
+        with self._lock:
+            return len(self._subscribers.get(topic, ()))
+
+    def publish(self, topic: str, item: Any) -> None:
+        """发布消息（线程安全，不阻塞发布方）"""
+        if topic not in self._subscribers:
+            return
+        with self._lock:
+            subscribers: List[Subscription] = list(self._subscribers.get(topic, ()))
+        for subscription in subscribers:
+            if subscription.dropped:
+                self.unsubscribe(subscription)
+                continue
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._deliver, item)
+            except RuntimeError:
+                # 事件循环已关闭
+                self.unsubscribe(subscription)
+
+    def publish_job_record(self, record: Dict[str, Any]) -> None:
+        """发布一条任务执行记录"""
+        if not self._subscribers:
+            return
+        job_id = record.get("job_id")
+        if job_id is not None:
+            self.publish(job_topic(job_id), record)
+        self.publish(ALL_JOBS_TOPIC, record)
+
+
+class SystemLogFollower:
+    """系统日志跟随线程：有订阅者时运行，所有订阅者共享同一个读取方"""
+
+    def __init__(self, broker: LogBroker, interval: float = 0.5):
+        self.broker = broker
+        self.interval = interval
+        self._refcount = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def log_path(self) -> str:
+        return os.getenv("SYSTEM_LOG_PATH", "./runtime/system.log")
+
+    def acquire(self) -> None:
+        with self._lock:
+            self._refcount += 1
+            if self._thread is None or not self._thread.is_alive():
+                self._stop = threading.Event()
+                self._thread = threading.Thread(
+                    target=self._run, args=(self._stop,), name="system-log-follower", daemon=True
+                )
+                self._thread.start()
+
+    def release(self) -> None:
+        with self._lock:
+            self._refcount = max(0, self._refcount - 1)
+            if self._refcount == 0:
+                self._stop.set()
+                self._thread = None
+
+    def _run(self, stop: threading.Event) -> None:
+        offset: Optional[int] = None
+        while not stop.is_set():
+            try:
+                if os.path.exists(self.log_path):
+                    if offset is None:
+                        offset = os.path.getsize(self.log_path)
+                    lines, offset = read_since(self.log_path, offset, Config.LOG_STREAM_QUEUE_SIZE)
+                    for line in lines:
+                        self.broker.publish(SYSTEM_TOPIC, line)
+            except Exception as e:
+                logger.error(f"跟随系统日志失败: {e}")
+            stop.wait(self.interval)
+
+
+log_broker = LogBroker()
+system_log_follower = SystemLogFollower(log_broker)
@@ -0,0 +1,423 @@
+"""
+日志保留策略
+
+按 Config.LOG_DAYS（保留天数）和 Config.JOB_LOG_KEEP_COUNT（每个任务保留的
+日志天数）增量清理任务日志：
+
+- 维护每个任务的日志日文件目录（catalogue），跨轮保留：处理到该任务时只重新扫描当月
+  和修改时间变化的月目录，其余月份沿用上一轮结果
+- 每轮只删除已过期的日文件，任务按小批次处理，批次之间暂停以平滑IO
+- 可选的全局磁盘预算（JOB_LOG_DISK_BUDGET_MB），超出时按日期从旧到新淘汰
+- 共享日志段（runtime/logstore/年月日）按天整体过期，db存储时分批删除过期行
+- 去重输出包（年月/objects.*）在该月日志全部删除后随之删除
+"""
+
+import heapq
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from app.config import Config
+from app.core.log_segment import SEGMENT_SUFFIX
+from app.core.log_store import STORE_DIR, shared_log_store
+from app.core.output_store import INDEX_NAME, PACK_NAME, output_store
+
+logger = logging.getLogger(__name__)
+
+JOBS_DIR = os.path.join("runtime", "jobs")
+
+
+class DayFile(NamedTuple):
+    day: str  # YYYYMMDD
+    path: str
+    size: int
+
+
+def _parse_day_file(month: str, name: str) -> Optional[str]:
+    """识别日文件（dd.log 或 dd.seq.seg），返回 YYYYMMDD"""
+    if name.endswith(".log") or name.endswith(SEGMENT_SUFFIX):
+        day = name[:2]
+        if day.isdigit() and name[2:3] == ".":
+            return month + day
+    return None
+
+
+class MonthScan(NamedTuple):
+    mtime_ns: int  # 扫描时月目录的修改时间
+    scanned_ns: int
+    files: List[DayFile]
+
+
+# 扫描时月目录在该时间内刚被修改过，下一轮仍重新扫描，避免同一时间戳内新增的文件被漏掉
+_MTIME_SETTLE_NS = 2 * 10**9
+
+
+def _is_month_dir(entry: "os.DirEntry[str]") -> bool:
+    return len(entry.name) == 6 and entry.name.isdigit() and entry.is_dir()
+
+
+def scan_month_days(month_dir: str, month: str) -> List[DayFile]:
+    """扫描任务某个年月目录下的日文件"""
+    files: List[DayFile] = []
+    try:
+        for entry in os.scandir(month_dir):
+            day = _parse_day_file(month, entry.name)
+            if day and entry.is_file():
+                files.append(DayFile(day, entry.path, entry.stat().st_size))
+    except OSError:
+        pass
+    return files
+
+
+def scan_job_days(job_dir: str) -> List[DayFile]:
+    """扫描单个任务目录下的所有日文件"""
+    files: List[DayFile] = []
+    try:
+        month_entries = [entry for entry in os.scandir(job_dir) if _is_month_dir(entry)]
+    except OSError:
+        return files
+    for month_entry in month_entries:
+        files.extend(scan_month_days(month_entry.path, month_entry.name))
+    files.sort()
+    return files
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class LogRetention:
+    """增量日志保留服务"""
+
+    def __init__(
+        self,
+        log_days: Optional[int] = None,
+        keep_count: Optional[int] = None,
+        budget_bytes: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        pause_ms: Optional[int] = None,
+    ):
+        self.log_days = Config.LOG_DAYS if log_days is None else log_days
+        self.keep_count = Config.JOB_LOG_KEEP_COUNT if keep_count is None else keep_count
+        self.budget_bytes = (
+            Config.JOB_LOG_DISK_BUDGET_MB * 1024 * 1024 if budget_bytes is None else budget_bytes
+        )
+        self.batch_size = batch_size or Config.JOB_LOG_RETENTION_BATCH
+        self.pause = (Config.JOB_LOG_RETENTION_PAUSE_MS if pause_ms is None else pause_ms) / 1000.0
+        # 任务ID -> 日文件列表（按日期升序）
+        self.catalogue: Dict[int, List[DayFile]] = {}
+        # 任务ID -> {年月: 上一轮的扫描结果}
+        self.months: Dict[int, Dict[str, MonthScan]] = {}
+        # 共享段：日期 -> 目录大小
+        self.shared_days: Dict[str, int] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pass_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # 删除
+    # ------------------------------------------------------------------
+
+    def _remove_file(self, path: str) -> bool:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error(f"删除日志文件失败 {path}: {e}")
+            return False
+        # 清理空的年月目录和任务目录
+        parent = os.path.dirname(path)
+        for directory in (parent, os.path.dirname(parent)):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                break
+        return True
+
+    def _remove_shared_day(self, day: str) -> bool:
+        try:
+            shutil.rmtree(os.path.join(str(STORE_DIR), day))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error(f"删除共享日志段失败 {day}: {e}")
+            return False
+        shared_log_store.forget_day(day)
+        output_store.forget_day(day)
+        return True
+
+    # ------------------------------------------------------------------
+    # 单轮处理
+    # ------------------------------------------------------------------
+
+    def _cutoff_day(self, today: datetime) -> str:
+        """早于该日期（YYYYMMDD）的日志过期"""
+        return (today - timedelta(days=self.log_days - 1)).strftime("%Y%m%d")
+
+    def _refresh_job(self, job_id: int, month_now: str) -> List[DayFile]:
+        """刷新单个任务的日文件：当月和修改时间变化的月目录重新扫描，其余沿用上一轮结果"""
+        cached = self.months.get(job_id, {})
+        months: Dict[str, MonthScan] = {}
+        try:
+            month_entries = [
+                entry
+                for entry in os.scandir(os.path.join(JOBS_DIR, str(job_id)))
+                if _is_month_dir(entry)
+            ]
+        except OSError:
+            month_entries = []
+        for entry in month_entries:
+            try:
+                mtime_ns = entry.stat().st_mtime_ns
+            except OSError:
+                continue
+            previous = cached.get(entry.name)
+            if (
+                previous is not None
+                and entry.name != month_now
+                and previous.mtime_ns == mtime_ns
+                and previous.scanned_ns - mtime_ns > _MTIME_SETTLE_NS
+            ):
+                months[entry.name] = previous
+            else:
+                scanned_ns = time.time_ns()
+                files = scan_month_days(entry.path, entry.name)
+                months[entry.name] = MonthScan(mtime_ns, scanned_ns, files)
+        if months:
+            self.months[job_id] = months
+        else:
+            self.months.pop(job_id, None)
+        return sorted(f for scan in months.values() for f in scan.files)
+
+    def _expire_job(self, job_id: int, cutoff: Optional[str], month_now: str) -> int:
+        """刷新单个任务的目录并删除过期日文件，返回删除的文件数"""
+        files = self._refresh_job(job_id, month_now)
+        days = sorted({f.day for f in files})
+        expired = set()
+        if cutoff:
+            expired.update(day for day in days if day < cutoff)
+        if self.keep_count > 0 and len(days) > self.keep_count:
+            expired.update(days[: -self.keep_count])
+
+        removed = 0
+        kept: List[DayFile] = []
+        for day_file in files:
+            if day_file.day in expired and self._remove_file(day_file.path):
+                removed += 1
+            else:
+                kept.append(day_file)
+        if kept:
+            self.catalogue[job_id] = kept
+        else:
+            self.catalogue.pop(job_id, None)
+        return removed
+
+    def _expire_packs(self, job_id: int, cutoff: Optional[str], month_now: str) -> int:
+        """删除已无日志引用的月度输出包，返回删除的月数
+
+        共享存储的记录不在任务目录中，只能等该月整体早于保留期限后再删除。
+        """
+        if cutoff:
+            limit = cutoff[:6]
+        elif Config.JOB_LOG_STORAGE != "shared":
+            limit = month_now
+        else:
+            return 0
+        live_months = {f.day[:6] for f in self.catalogue.get(job_id, [])}
+        job_dir = os.path.join(JOBS_DIR, str(job_id))
+        months = self.months.get(job_id, {})
+        removed = 0
+        for month in [m for m in months if m not in live_months and m < limit]:
+            month_dir = os.path.join(job_dir, month)
+            for name in (PACK_NAME, INDEX_NAME):
+                try:
+                    os.remove(os.path.join(month_dir, name))
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.error(f"删除输出包失败 {month_dir}: {e}")
+            output_store.forget(job_id, month)
+            months.pop(month)
+            removed += 1
+            for directory in (month_dir, job_dir):
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    break
+        return removed
+
+    def _expire_shared(self, cutoff: Optional[str], yesterday: str) -> int:
+        """删除过期的共享段日期目录；已不再写入的日期沿用上一轮统计的大小"""
+        if not os.path.isdir(str(STORE_DIR)):
+            self.shared_days = {}
+            return 0
+        removed = 0
+        shared_days: Dict[str, int] = {}
+        for entry in os.scandir(str(STORE_DIR)):
+            if not entry.is_dir() or not entry.name.isdigit():
+                continue
+            if cutoff and entry.name < cutoff:
+                if self._remove_shared_day(entry.name):
+                    removed += 1
+                continue
+            size = self.shared_days.get(entry.name)
+            if size is None or entry.name >= yesterday:
+                size = _dir_size(entry.path)
+            shared_days[entry.name] = size
+        self.shared_days = shared_days
+        return removed
+
+    def _expire_db(self, cutoff: Optional[str]) -> int:
+        """db存储时分批删除过期的 job_exec_logs 行"""
+        if Config.JOB_LOG_STORAGE != "db" or not cutoff:
+            return 0
+        from sqlalchemy import delete, select
+
+        from app.deps import history_engine
+        from app.models.log import JobExecLog
+
+        cutoff_at = datetime.strptime(cutoff, "%Y%m%d")
+        removed = 0
+        while not self._stop.is_set():
+            with history_engine.begin() as conn:
+                ids = conn.execute(
+                    select(JobExecLog.id)
+                    .where(JobExecLog.created_at < cutoff_at)
+                    .limit(self.batch_size * 10)
+                ).scalars().all()
+                if not ids:
+                    break
+                conn.execute(delete(JobExecLog).where(JobExecLog.id.in_(ids)))
+            removed += len(ids)
+            if self.pause > 0:
+                self._stop.wait(self.pause)
+        return removed
+
+    def _enforce_budget(self, today: str) -> int:
+        """超出磁盘预算时按日期从旧到新淘汰（不淘汰当天正在写入的文件）"""
+        if self.budget_bytes <= 0:
+            return 0
+        total = sum(f.size for files in self.catalogue.values() for f in files)
+        total += sum(self.shared_days.values())
+        if total <= self.budget_bytes:
+            return 0
+
+        heap: List[Tuple[str, int, str, int]] = []
+        for job_id, files in self.catalogue.items():
+            for f in files:
+                heap.append((f.day, job_id, f.path, f.size))
+        for day, size in self.shared_days.items():
+            heap.append((day, -1, day, size))
+        heapq.heapify(heap)
+
+        removed = 0
+        while heap and total > self.budget_bytes:
+            day, job_id, target, size = heapq.heappop(heap)
+            if day >= today:
+                break
+            if job_id == -1:
+                ok = self._remove_shared_day(target)
+                if ok:
+                    self.shared_days.pop(target, None)
+            else:
+                ok = self._remove_file(target)
+                if ok:
+                    remaining = [f for f in self.catalogue.get(job_id, []) if f.path != target]
+                    if remaining:
+                        self.catalogue[job_id] = remaining
+                    else:
+                        self.catalogue.pop(job_id, None)
+            if ok:
+                total -= size
+                removed += 1
+        if total > self.budget_bytes:
+            logger.warning(f"日志占用 {total} 字节，仍超出磁盘预算 {self.budget_bytes} 字节")
+        return removed
+
+    def run_once(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """执行一轮保留策略，返回删除统计"""
+        now = now or datetime.now()
+        cutoff = self._cutoff_day(now) if self.log_days > 0 else None
+        month_now = now.strftime("%Y%m")
+        stats = {
+            "jobs": 0,
+            "files": 0,
+            "packs": 0,
+            "shared_days": 0,
+            "db_rows": 0,
+            "budget_evicted": 0,
+        }
+
+        with self._pass_lock:
+            job_ids: List[int] = []
+            if os.path.isdir(JOBS_DIR):
+                job_ids = sorted(
+                    int(entry.name)
+                    for entry in os.scandir(JOBS_DIR)
+                    if entry.name.isdigit() and entry.is_dir()
+                )
+            # 目录已不存在的任务从目录中移除
+            for job_id in (set(self.catalogue) | set(self.months)) - set(job_ids):
+                self.catalogue.pop(job_id, None)
+                self.months.pop(job_id, None)
+
+            for start in range(0, len(job_ids), self.batch_size):
+                if self._stop.is_set():
+                    break
+                for job_id in job_ids[start : start + self.batch_size]:
+                    stats["files"] += self._expire_job(job_id, cutoff, month_now)
+                    stats["packs"] += self._expire_packs(job_id, cutoff, month_now)
+                stats["jobs"] += len(job_ids[start : start + self.batch_size])
+                if self.pause > 0 and start + self.batch_size < len(job_ids):
+                    self._stop.wait(self.pause)
+
+            yesterday = (now - timedelta(days=1)).strftime("%Y%m%d")
+            stats["shared_days"] = self._expire_shared(cutoff, yesterday)
+            stats["db_rows"] = self._expire_db(cutoff)
+            stats["budget_evicted"] = self._enforce_budget(now.strftime("%Y%m%d"))
+
+        if any(stats[key] for key in ("files", "packs", "shared_days", "db_rows", "budget_evicted")):
+            logger.info(f"日志保留策略执行完成: {stats}")
+        return stats
+
+    # ------------------------------------------------------------------
+    # 后台线程
+    # ------------------------------------------------------------------
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"日志保留策略执行失败: {e}")
+            self._stop.wait(Config.JOB_LOG_RETENTION_INTERVAL)
+
+    def start(self) -> None:
+        """启动后台保留线程"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="log-retention", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止后台保留线程"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+log_retention = LogRetention()
@@ -0,0 +1,440 @@
+"""
+二进制日志段格式
+
+紧凑的任务执行记录存储格式，按 runtime/jobs/任务id/年月/日.序号.seg 组织：
+
+- 文件头: 魔数 ``XHLS`` + 1字节版本号
+- 记录帧: 4字节大端长度 + 1字节类型 + msgpack编码的负载
+- 类型 ``DEFINE``: ``[字符串ID, 字符串]``，为段内字典登记一个重复字符串
+- 类型 ``RECORD``: ``{键引用: 值}``，键和 job_name/command/mode 等重复字符串
+  以扩展类型引用字典ID的方式写入，避免每条记录重复序列化
+
+每个段自带字典，可独立读取和删除；段按天切分，同一天内超过
+``Config.JOB_LOG_SEGMENT_MAX_BYTES`` 时滚动到下一个序号。
+"""
+
+import os
+import struct
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from app.config import Config
+
+SEGMENT_MAGIC = b"XHLS"
+SEGMENT_VERSION = 1
+SEGMENT_HEADER = SEGMENT_MAGIC + bytes([SEGMENT_VERSION])
+SEGMENT_SUFFIX = ".seg"
+
+FRAME_DEFINE = 0x01
+FRAME_RECORD = 0x02
+
+# msgpack扩展类型：字典引用
+EXT_STRING_REF = 1
+
+# 需要进入字典的字段（取值高度重复）
+INTERNED_FIELDS = frozenset({"job_name", "command", "mode", "status", "func_name"})
+
+_FRAME_HEADER = struct.Struct(">IB")
+
+
+class StringRef:
+    """字典引用（编码为msgpack扩展类型）"""
+
+    __slots__ = ("index",)
+
+    def __init__(self, index: int):
+        self.index = index
+
+
+# ---------------------------------------------------------------------------
+# msgpack 子集编解码
+# ---------------------------------------------------------------------------
+
+
+def _pack(value: Any, out: bytearray) -> None:
+    """将值按msgpack格式追加到缓冲区"""
+    if value is None:
+        out.append(0xC0)
+    elif value is True:
+        out.append(0xC3)
+    elif value is False:
+        out.append(0xC2)
+    elif isinstance(value, StringRef):
+        out += b"\xd6" + bytes([EXT_STRING_REF]) + struct.pack(">I", value.index)
+    elif isinstance(value, int):
+        if 0 <= value < 0x80:
+            out.append(value)
+        elif -32 <= value < 0:
+            out.append(value & 0xFF)
+        elif 0 <= value <= 0xFFFFFFFF:
+            out += b"\xce" + struct.pack(">I", value)
+        elif -(1 << 63) <= value < (1 << 63):
+            out += b"\xd3" + struct.pack(">q", value)
+        else:
+            _pack(str(value), out)
+    elif isinstance(value, float):
+        out += b"\xcb" + struct.pack(">d", value)
+    elif isinstance(value, str):
+        data = value.encode("utf-8")
+        size = len(data)
+        if size < 32:
+            out.append(0xA0 | size)
+        elif size < 0x100:
+            out += b"\xd9" + bytes([size])
+        elif size < 0x10000:
+            out += b"\xda" + struct.pack(">H", size)
+        else:
+            out += b"\xdb" + struct.pack(">I", size)
+        out += data
+    elif isinstance(value, (list, tuple)):
+        size = len(value)
+        if size < 16:
+            out.append(0x90 | size)
+        elif size < 0x10000:
+            out += b"\xdc" + struct.pack(">H", size)
+        else:
+            out += b"\xdd" + struct.pack(">I", size)
+        for item in value:
+            _pack(item, out)
+    elif isinstance(value, dict):
+        size = len(value)
+        if size < 16:
+            out.append(0x80 | size)
+        elif size < 0x10000:
+            out += b"\xde" + struct.pack(">H", size)
+        else:
+            out += b"\xdf" + struct.pack(">I", size)
+        for key, item in value.items():
+            _pack(key, out)
+            _pack(item, out)
+    else:
+        _pack(str(value), out)
+
+
+def _unpack(data: bytes, pos: int) -> Tuple[Any, int]:
+    """从pos处解码一个msgpack值，返回(值, 新位置)"""
+    code = data[pos]
+    pos += 1
+    if code < 0x80:
+        return code, pos
+    if code >= 0xE0:
+        return code - 0x100, pos
+    if 0xA0 <= code <= 0xBF:
+        size = code & 0x1F
+        return data[pos : pos + size].decode("utf-8"), pos + size
+    if 0x90 <= code <= 0x9F:
+        return _unpack_array(data, pos, code & 0x0F)
+    if 0x80 <= code <= 0x8F:
+        return _unpack_map(data, pos, code & 0x0F)
+    if code == 0xC0:
+        return None, pos
+    if code == 0xC2:
+        return False, pos
+    if code == 0xC3:
+        return True, pos
+    if code == 0xCE:
+        return struct.unpack_from(">I", data, pos)[0], pos + 4
+    if code == 0xD3:
+        return struct.unpack_from(">q", data, pos)[0], pos + 8
+    if code == 0xCB:
+        return struct.unpack_from(">d", data, pos)[0], pos + 8
+    if code == 0xD9:
+        size = data[pos]
+        pos += 1
+        return data[pos : pos + size].decode("utf-8"), pos + size
+    if code == 0xDA:
+        size = struct.unpack_from(">H", data, pos)[0]
+        pos += 2
+        return data[pos : pos + size].decode("utf-8"), pos + size
+    if code == 0xDB:
+        size = struct.unpack_from(">I", data, pos)[0]
+        pos += 4
+        return data[pos : pos + size].decode("utf-8"), pos + size
+    if code == 0xDC:
+        return _unpack_array(data, pos + 2, struct.unpack_from(">H", data, pos)[0])
+    if code == 0xDD:
+        return _unpack_array(data, pos + 4, struct.unpack_from(">I", data, pos)[0])
+    if code == 0xDE:
+        return _unpack_map(data, pos + 2, struct.unpack_from(">H", data, pos)[0])
+    if code == 0xDF:
+        return _unpack_map(data, pos + 4, struct.unpack_from(">I", data, pos)[0])
+    if code == 0xD6:
+        ext_type = data[pos]
+        value = struct.unpack_from(">I", data, pos + 1)[0]
+        if ext_type != EXT_STRING_REF:
+            raise ValueError(f"未知的扩展类型: {ext_type}")
+        return StringRef(value), pos + 5
+    raise ValueError(f"不支持的msgpack类型: 0x{code:02x}")
+
+
+def _unpack_array(data: bytes, pos: int, size: int) -> Tuple[List[Any], int]:
+    items = []
+    for _ in range(size):
+        item, pos = _unpack(data, pos)
+        items.append(item)
+    return items, pos
+
+
+def _unpack_map(data: bytes, pos: int, size: int) -> Tuple[Dict[Any, Any], int]:
+    result: Dict[Any, Any] = {}
+    for _ in range(size):
+        key, pos = _unpack(data, pos)
+        value, pos = _unpack(data, pos)
+        result[key] = value
+    return result, pos
+
+
+def packb(value: Any) -> bytes:
+    """编码为msgpack字节串"""
+    out = bytearray()
+    _pack(value, out)
+    return bytes(out)
+
+
+def unpackb(data: bytes) -> Any:
+    """解码msgpack字节串"""
+    value, _ = _unpack(data, 0)
+    return value
+
+
+# ---------------------------------------------------------------------------
+# 段读取
+# ---------------------------------------------------------------------------
+
+
+def _iter_frames(fh: BinaryIO) -> Iterator[Tuple[int, bytes, int]]:
+    """遍历段中的完整帧，返回(类型, 负载, 帧结束偏移)；末尾残帧被忽略"""
+    header = fh.read(len(SEGMENT_HEADER))
+    if header != SEGMENT_HEADER:
+        return
+    offset = len(SEGMENT_HEADER)
+    while True:
+        frame_header = fh.read(_FRAME_HEADER.size)
+        if len(frame_header) < _FRAME_HEADER.size:
+            return
+        length, kind = _FRAME_HEADER.unpack(frame_header)
+        payload = fh.read(length)
+        if len(payload) < length:
+            return
+        offset += _FRAME_HEADER.size + length
+        yield kind, payload, offset
+
+
+def _resolve(value: Any, strings: Dict[int, str]) -> Any:
+    if isinstance(value, StringRef):
+        return strings.get(value.index, "")
+    return value
+
+
+def iter_segment_records(path: str) -> Iterator[Dict[str, Any]]:
+    """按写入顺序读取一个段文件中的记录（与JSON日志相同的dict结构）"""
+    strings: Dict[int, str] = {}
+    try:
+        with open(path, "rb") as fh:
+            for kind, payload, _ in _iter_frames(fh):
+                try:
+                    value = unpackb(payload)
+                except (ValueError, IndexError, struct.error, UnicodeDecodeError):
+                    continue
+                if kind == FRAME_DEFINE:
+                    strings[value[0]] = value[1]
+                elif kind == FRAME_RECORD:
+                    yield {
+                        _resolve(key, strings): _resolve(item, strings)
+                        for key, item in value.items()
+                    }
+    except OSError:
+        return
+
+
+def _segment_seq(name: str) -> int:
+    """解析段文件名中的序号（dd.seq.seg）"""
+    try:
+        return int(name.split(".")[1])
+    except (IndexError, ValueError):
+        return 0
+
+
+def list_day_segments(job_id: int, date: str) -> List[str]:
+    """列出某任务某天（YYYY-MM-DD）的所有段文件，按序号排序"""
+    year_month = f"{date[:4]}{date[5:7]}"
+    day = date[8:10]
+    log_dir = Path("runtime") / "jobs" / str(job_id) / year_month
+    if not log_dir.is_dir():
+        return []
+    names = [
+        entry.name
+        for entry in os.scandir(log_dir)
+        if entry.name.startswith(f"{day}.") and entry.name.endswith(SEGMENT_SUFFIX)
+    ]
+    names.sort(key=_segment_seq)
+    return [str(log_dir / name) for name in names]
+
+
+def iter_binary_logs(job_id: int, date: str) -> Iterator[Dict[str, Any]]:
+    """逐条读取某任务某天的二进制日志记录（按时间正序）"""
+    for path in list_day_segments(job_id, date):
+        yield from iter_segment_records(path)
+
+
+def read_binary_logs(job_id: int, date: str) -> List[Dict[str, Any]]:
+    """读取某任务某天的全部二进制日志记录（按时间正序）"""
+    return list(iter_binary_logs(job_id, date))
+
+
+# ---------------------------------------------------------------------------
+# 段写入
+# ---------------------------------------------------------------------------
+
+
+class SegmentWriter:
+    """单个任务的二进制段写入器，按天和大小滚动"""
+
+    def __init__(self, job_id: int, max_bytes: Optional[int] = None):
+        self.job_id = job_id
+        self.max_bytes = max_bytes or Config.JOB_LOG_SEGMENT_MAX_BYTES
+        self._lock = threading.Lock()
+        self._fh: Optional[BinaryIO] = None
+        self._path = ""
+        self._day_key = ""
+        self._seq = 0
+        self._size = 0
+        # 段内字典：字符串 -> 已编码的引用
+        self._refs: Dict[str, bytes] = {}
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def _open_segment(self, log_dir: Path, day: str, seq: int) -> None:
+        """打开（或续写）指定序号的段，并恢复其字典"""
+        self._close_current()
+        path = log_dir / f"{day}.{seq:03d}{SEGMENT_SUFFIX}"
+        self._refs = {}
+        valid_end = 0
+        if path.exists():
+            with open(path, "rb") as fh:
+                for kind, payload, end in _iter_frames(fh):
+                    valid_end = end
+                    if kind == FRAME_DEFINE:
+                        try:
+                            index, text = unpackb(payload)
+                            self._refs[text] = packb(StringRef(index))
+                        except (ValueError, IndexError, struct.error):
+                            continue
+        fh = open(path, "ab")
+        if valid_end == 0:
+            # 新文件或文件头损坏，重新写入文件头
+            fh.truncate(0)
+            fh.write(SEGMENT_HEADER)
+            valid_end = len(SEGMENT_HEADER)
+        elif fh.tell() > valid_end:
+            # 截断上次异常退出留下的残帧
+            fh.truncate(valid_end)
+        fh.seek(valid_end)
+        self._fh = fh
+        self._path = str(path)
+        self._seq = seq
+        self._size = valid_end
+
+    def _ensure_segment(self, now: datetime) -> None:
+        year_month = f"{now.year}{now.month:02d}"
+        day = f"{now.day:02d}"
+        day_key = f"{year_month}{day}"
+        log_dir = Path("runtime") / "jobs" / str(self.job_id) / year_month
+
+        if self._fh is None or self._day_key != day_key:
+            log_dir.mkdir(parents=True, exist_ok=True)
+            existing = list_day_segments(self.job_id, now.strftime("%Y-%m-%d"))
+            seq = _segment_seq(os.path.basename(existing[-1])) if existing else 0
+            self._day_key = day_key
+            self._open_segment(log_dir, day, seq)
+
+        if self._size >= self.max_bytes:
+            self._open_segment(log_dir, day, self._seq + 1)
+
+    def _intern(self, text: str, frames: bytearray) -> bytes:
+        """返回字符串的引用编码，首次出现时先写入DEFINE帧"""
+        ref = self._refs.get(text)
+        if ref is None:
+            index = len(self._refs)
+            payload = packb([index, text])
+            frames += _FRAME_HEADER.pack(len(payload), FRAME_DEFINE) + payload
+            ref = packb(StringRef(index))
+            self._refs[text] = ref
+        return ref
+
+    def append(self, record: Dict[str, Any], sync: bool = False) -> int:
+        """追加一条记录，返回写入的字节数"""
+        with self._lock:
+            self._ensure_segment(datetime.now())
+            assert self._fh is not None
+
+            frames = bytearray()
+            payload = bytearray()
+            size = len(record)
+            if size < 16:
+                payload.append(0x80 | size)
+            else:
+                payload += b"\xde" + struct.pack(">H", size)
+            for key, value in record.items():
+                payload += self._intern(key, frames)
+                if key in INTERNED_FIELDS and isinstance(value, str):
+                    payload += self._intern(value, frames)
+                else:
+                    _pack(value, payload)
+            frames += _FRAME_HEADER.pack(len(payload), FRAME_RECORD) + payload
+
+            self._fh.write(frames)
+            self._fh.flush()
+            if sync:
+                os.fsync(self._fh.fileno())
+            self._size += len(frames)
+            return len(frames)
+
+    def _close_current(self) -> None:
+        if self._fh is not None:
+            try:
+                self._fh.close()
+            except Exception as e:
+                print(f"关闭日志段失败 {self._path}: {e}")
+            self._fh = None
+
+    def close(self) -> None:
+        """关闭当前段"""
+        with self._lock:
+            self._close_current()
+            self._day_key = ""
+
+
+_segment_writers: Dict[int, SegmentWriter] = {}
+_segment_writers_lock = threading.Lock()
+
+
+def get_segment_writer(job_id: int) -> SegmentWriter:
+    """获取任务的段写入器（进程内按任务复用，保留字典和当前段）"""
+    with _segment_writers_lock:
+        writer = _segment_writers.get(job_id)
+        if writer is None:
+            writer = SegmentWriter(job_id)
+            _segment_writers[job_id] = writer
+        return writer
+
+
+def close_segment_writer(job_id: int) -> None:
+    """关闭并移除某个任务的段写入器"""
+    with _segment_writers_lock:
+        writer = _segment_writers.pop(job_id, None)
+    if writer:
+        writer.close()
+
+
+def close_all_segment_writers() -> None:
+    """关闭所有段写入器（程序退出时调用）"""
+    with _segment_writers_lock:
+        writers = list(_segment_writers.values())
+        _segment_writers.clear()
+    for writer in writers:
+        writer.close()
@@ -0,0 +1,302 @@
+"""
+日志投递（syslog / UDP / TCP-NDJSON）
+
+JobLogger 落盘的执行记录同时交给投递器，由后台线程批量发送到集中日志系统：
+
+    JOB_LOG_SINK_URL=udp://127.0.0.1:5140          每条记录一个UDP报文（JSON，超长时截短输出）
+    JOB_LOG_SINK_URL=tcp://127.0.0.1:5170          TCP长连接，每行一条JSON（NDJSON）
+    JOB_LOG_SINK_URL=syslog://127.0.0.1:514        RFC 5424 syslog over UDP
+    JOB_LOG_SINK_URL=syslog+tcp://127.0.0.1:601    RFC 5424 syslog over TCP（octet-counting）
+
+提交只做一次入队，不会阻塞任务执行；队列满时按 JOB_LOG_SINK_DROP_POLICY 处理：
+drop_oldest 丢弃最旧记录（默认），drop_newest 丢弃新记录。发送失败时断开重连（指数退避），
+当前批次保留重试。
+"""
+
+import json
+import logging
+import socket
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+from urllib.parse import urlparse
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+DROP_POLICIES = (DROP_OLDEST, DROP_NEWEST)
+
+UDP_MAX_PAYLOAD = 65000
+
+# 报文超长时依次截短的字段
+UDP_TRUNCATE_FIELDS = ("output", "error_msg")
+
+# syslog facility local0，严重级别 info / err
+SYSLOG_FACILITY = 16
+SEVERITY_INFO = 6
+SEVERITY_ERROR = 3
+
+
+def _encode_record(record: Dict[str, Any]) -> bytes:
+    return json.dumps(record, ensure_ascii=False, default=str).encode("utf-8")
+
+
+class LogSink(ABC):
+    """投递目标基类：send_batch 失败时抛出 OSError，由投递器负责重连"""
+
+    def connect(self) -> None:
+        pass
+
+    @abstractmethod
+    def send_batch(self, records: List[Dict[str, Any]]) -> None:
+        """发送一批记录"""
+
+    def close(self) -> None:
+        pass
+
+
+class UDPSink(LogSink):
+    """每条记录一个UDP报文"""
+
+    def __init__(self, host: str, port: int):
+        self.address = (host, port)
+        self._sock: Optional[socket.socket] = None
+
+    def _encode(self, record: Dict[str, Any]) -> bytes:
+        return _encode_record(record)
+
+    def _fit(self, record: Dict[str, Any]) -> Optional[bytes]:
+        """编码为不超过 UDP_MAX_PAYLOAD 的报文：超长时先截短输出再截短错误信息，
+        保证报文仍是完整的JSON；仍然超长时返回 None"""
+        payload = self._encode(record)
+        if len(payload) <= UDP_MAX_PAYLOAD:
+            return payload
+        record = dict(record)
+        for field in UDP_TRUNCATE_FIELDS:
+            while len(payload) > UDP_MAX_PAYLOAD and isinstance(record.get(field), str):
+                value = record[field]
+                if not value:
+                    break
+                record[field] = value[: len(value) // 2] + "..." if len(value) > 16 else ""
+                payload = self._encode(record)
+        return payload if len(payload) <= UDP_MAX_PAYLOAD else None
+
+    def connect(self) -> None:
+        if self._sock is None:
+            self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def send_batch(self, records: List[Dict[str, Any]]) -> None:
+        self.connect()
+        assert self._sock is not None
+        for record in records:
+            payload = self._fit(record)
+            if payload is None:
+                logger.warning(f"执行记录超出UDP报文上限，已跳过 (任务 {record.get('job_id')})")
+                continue
+            self._sock.sendto(payload, self.address)
+
+    def close(self) -> None:
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+
+class TCPSink(LogSink):
+    """TCP长连接，NDJSON"""
+
+    def __init__(self, host: str, port: int, timeout: float = 5.0):
+        self.address = (host, port)
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+
+    def _frame(self, record: Dict[str, Any]) -> bytes:
+        return _encode_record(record) + b"\n"
+
+    def connect(self) -> None:
+        if self._sock is None:
+            self._sock = socket.create_connection(self.address, timeout=self.timeout)
+
+    def send_batch(self, records: List[Dict[str, Any]]) -> None:
+        self.connect()
+        assert self._sock is not None
+        try:
+            self._sock.sendall(b"".join(self._frame(record) for record in records))
+        except OSError:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+
+def format_syslog(record: Dict[str, Any], app_name: str = "pyjobs") -> bytes:
+    """RFC 5424 格式：<PRI>1 时间 主机 应用 - - - JSON正文"""
+    failed = record.get("status") == "失败" or bool(record.get("error_msg"))
+    pri = SYSLOG_FACILITY * 8 + (SEVERITY_ERROR if failed else SEVERITY_INFO)
+    timestamp = datetime.now().astimezone().isoformat(timespec="milliseconds")
+    header = f"<{pri}>1 {timestamp} {socket.gethostname() or '-'} {app_name} - - - "
+    return header.encode("utf-8") + _encode_record(record)
+
+
+class SyslogUDPSink(UDPSink):
+    def _encode(self, record: Dict[str, Any]) -> bytes:
+        return format_syslog(record)
+
+
+class SyslogTCPSink(TCPSink):
+    def _frame(self, record: Dict[str, Any]) -> bytes:
+        # RFC 6587 octet-counting
+        message = format_syslog(record)
+        return f"{len(message)} ".encode("ascii") + message
+
+
+def create_sink(url: str) -> LogSink:
+    """根据URL创建投递目标"""
+    parsed = urlparse(url)
+    if not parsed.hostname or not parsed.port:
+        raise ValueError(f"日志投递地址格式错误: {url}")
+    sinks = {
+        "udp": UDPSink,
+        "tcp": TCPSink,
+        "syslog": SyslogUDPSink,
+        "syslog+udp": SyslogUDPSink,
+        "syslog+tcp": SyslogTCPSink,
+    }
+    sink_class = sinks.get(parsed.scheme)
+    if sink_class is None:
+        raise ValueError(f"不支持的日志投递协议: {parsed.scheme}")
+    return sink_class(parsed.hostname, parsed.port)
+
+
+class LogShipper:
+    """有界队列 + 后台批量发送线程"""
+
+    def __init__(
+        self,
+        sink: LogSink,
+        queue_size: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        flush_ms: Optional[int] = None,
+        drop_policy: Optional[str] = None,
+        retry_min: float = 0.5,
+        retry_max: float = 30.0,
+    ):
+        self.sink = sink
+        self.queue_size = queue_size or Config.JOB_LOG_SINK_QUEUE_SIZE
+        self.batch_size = batch_size or Config.JOB_LOG_SINK_BATCH_SIZE
+        self.flush_interval = (flush_ms or Config.JOB_LOG_SINK_FLUSH_MS) / 1000.0
+        self.drop_policy = drop_policy or Config.JOB_LOG_SINK_DROP_POLICY
+        if self.drop_policy not in DROP_POLICIES:
+            raise ValueError(f"不支持的日志投递丢弃策略: {self.drop_policy}")
+        self.retry_min = retry_min
+        self.retry_max = retry_max
+        self.stats = {"sent": 0, "dropped": 0, "errors": 0}
+        self._queue: Deque[Dict[str, Any]] = deque()
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, record: Dict[str, Any]) -> bool:
+        """入队一条记录，返回是否入队（被丢弃时返回False）"""
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name="log-shipper", daemon=True)
+                self._thread.start()
+            if len(self._queue) >= self.queue_size:
+                self.stats["dropped"] += 1
+                if self.drop_policy == DROP_NEWEST:
+                    return False
+                self._queue.popleft()
+            self._queue.append(record)
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify_all()
+        return True
+
+    def _take_batch(self) -> List[Dict[str, Any]]:
+        with self._cond:
+            if not self._stopping and len(self._queue) < self.batch_size:
+                self._cond.wait(self.flush_interval)
+            count = min(len(self._queue), self.batch_size)
+            return [self._queue.popleft() for _ in range(count)]
+
+    def _run(self) -> None:
+        batch: List[Dict[str, Any]] = []
+        delay = self.retry_min
+        while True:
+            if not batch:
+                batch = self._take_batch()
+            with self._cond:
+                stopping = self._stopping
+            if batch:
+                try:
+                    self.sink.send_batch(batch)
+                    self.stats["sent"] += len(batch)
+                    batch = []
+                    delay = self.retry_min
+                except OSError as e:
+                    self.stats["errors"] += 1
+                    logger.warning(f"日志投递失败，{delay:.1f}秒后重连: {e}")
+                    self.sink.close()
+                    if stopping:
+                        self.stats["dropped"] += len(batch)
+                        return
+                    with self._cond:
+                        self._cond.wait_for(lambda: self._stopping, delay)
+                    delay = min(delay * 2, self.retry_max)
+                    continue
+            if stopping:
+                with self._cond:
+                    if not self._queue:
+                        return
+
+    def close(self, timeout: float = 5.0) -> None:
+        """停止后台线程，尽力发送剩余记录"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout=timeout)
+        self._thread = None
+        self.sink.close()
+
+
+_shipper: Optional[LogShipper] = None
+_shipper_lock = threading.Lock()
+_invalid_url = ""
+
+
+def get_log_shipper() -> Optional[LogShipper]:
+    """按 JOB_LOG_SINK_URL 创建的全局投递器，未配置（或配置错误）时返回None"""
+    global _shipper, _invalid_url
+    url = Config.JOB_LOG_SINK_URL
+    if not url or url == _invalid_url:
+        return None
+    with _shipper_lock:
+        if _shipper is None:
+            try:
+                _shipper = LogShipper(create_sink(url))
+            except ValueError as e:
+                logger.error(str(e))
+                _invalid_url = url
+                return None
+        return _shipper
+
+
+def close_log_shipper() -> None:
+    global _shipper
+    with _shipper_lock:
+        shipper, _shipper = _shipper, None
+    if shipper is not None:
+        shipper.close()
@@ -0,0 +1,378 @@
+"""
+多任务共享日志段存储
+
+所有任务的执行记录顺序追加到按天划分的共享段文件，避免每个任务
+一棵 runtime/jobs/任务id/年月/ 目录树带来的大量小文件和 mkdir：
+
+    runtime/logstore/年月日/000.seg   数据段（每行一条JSON记录）
+    runtime/logstore/年月日/index.idx 二级索引（定长条目）
+
+索引条目为 ``<job_id:u32, seq:u32, offset:u64, length:u32>``，按任务查询时
+只需扫描定长索引（增量加载并缓存），再按偏移读取对应记录。索引缓存最多保留
+JOB_LOG_INDEX_CACHE_ENTRIES 条，超出的日期每次查询时流式扫描索引文件。
+
+打开某天的索引追加写入前先修复：截断到条目大小的整数倍，并丢弃末尾数据超出段文件
+（进程或系统崩溃时数据未落盘）的条目。
+
+段文件只追加，删除任务时无法原地删除其记录，改为在 runtime/logstore/tombstones.idx
+追加 ``<job_id:u32, day:8s, seq:u32, offset:u64>``（删除时的写入位置），读取时忽略该
+位置之前的记录，复用相同ID的新任务不会读到旧日志；旧记录随所在日期整体过期。
+"""
+
+import json
+import logging
+import os
+import struct
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+STORE_DIR = Path("runtime") / "logstore"
+INDEX_FILE = "index.idx"
+TOMBSTONE_FILE = "tombstones.idx"
+SEGMENT_SUFFIX = ".seg"
+
+_INDEX_ENTRY = struct.Struct("<IIQI")
+_TOMBSTONE_ENTRY = struct.Struct("<I8sIQ")
+
+# 流式扫描索引时每次读取的条目数
+_SCAN_ENTRIES = 4096
+
+# 每个任务在某天的位置列表：[(段序号, 偏移, 长度), ...]
+Positions = List[Tuple[int, int, int]]
+JobPositions = Dict[int, Positions]
+
+
+def _day_dir(day: str) -> Path:
+    """day 为 YYYYMMDD"""
+    return STORE_DIR / day
+
+
+def _segment_name(seq: int) -> str:
+    return f"{seq:03d}{SEGMENT_SUFFIX}"
+
+
+def _list_segments(day_dir: Path) -> List[int]:
+    """某天已有的段序号（升序）"""
+    try:
+        names = os.listdir(day_dir)
+    except OSError:
+        return []
+    return sorted(
+        int(name[: -len(SEGMENT_SUFFIX)])
+        for name in names
+        if name.endswith(SEGMENT_SUFFIX) and name[: -len(SEGMENT_SUFFIX)].isdigit()
+    )
+
+
+class _DayIndex:
+    """某天索引的内存缓存，按文件增长增量加载"""
+
+    __slots__ = ("loaded_bytes", "positions")
+
+    def __init__(self) -> None:
+        self.loaded_bytes = 0
+        self.positions: JobPositions = {}
+
+    @property
+    def entries(self) -> int:
+        return self.loaded_bytes // _INDEX_ENTRY.size
+
+
+def _repair_index(day_dir: Path) -> None:
+    """截断不完整的索引条目，并丢弃末尾数据超出段文件的条目"""
+    index_path = day_dir / INDEX_FILE
+    try:
+        size = os.path.getsize(index_path)
+    except OSError:
+        return
+    valid = size - size % _INDEX_ENTRY.size
+    segment_sizes: Dict[int, int] = {}
+    with open(index_path, "rb") as fh:
+        # 条目按写入顺序追加，只需从末尾向前检查
+        while valid > 0:
+            fh.seek(valid - _INDEX_ENTRY.size)
+            _, seq, offset, length = _INDEX_ENTRY.unpack(fh.read(_INDEX_ENTRY.size))
+            if seq not in segment_sizes:
+                try:
+                    segment_sizes[seq] = os.path.getsize(day_dir / _segment_name(seq))
+                except OSError:
+                    segment_sizes[seq] = 0
+            if offset + length <= segment_sizes[seq]:
+                break
+            valid -= _INDEX_ENTRY.size
+    if valid != size:
+        logger.warning(f"修复共享日志索引 {index_path}: {size} -> {valid} 字节")
+        with open(index_path, "r+b") as fh:
+            fh.truncate(valid)
+
+
+class SharedLogStore:
+    """共享日志段存储（进程内单例）"""
+
+    def __init__(
+        self,
+        max_bytes: Optional[int] = None,
+        cached_days: int = 7,
+        cached_entries: Optional[int] = None,
+    ):
+        self.max_bytes = max_bytes or Config.JOB_LOG_SEGMENT_MAX_BYTES
+        self.cached_days = cached_days
+        self.cached_entries = (
+            Config.JOB_LOG_INDEX_CACHE_ENTRIES if cached_entries is None else cached_entries
+        )
+        self._write_lock = threading.Lock()
+        self._index_lock = threading.Lock()
+        self._day = ""
+        self._seq = 0
+        self._size = 0
+        self._data_fh: Optional[BinaryIO] = None
+        self._index_fh: Optional[BinaryIO] = None
+        self._indexes: "OrderedDict[str, _DayIndex]" = OrderedDict()
+        # 任务ID -> 删除时的写入位置 (年月日, 段序号, 偏移)，首次读取时从文件加载
+        self._tombstones: Optional[Dict[int, Tuple[str, int, int]]] = None
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+
+    def _open_day(self, day: str) -> None:
+        self._close_files()
+        day_dir = _day_dir(day)
+        day_dir.mkdir(parents=True, exist_ok=True)
+        segments = _list_segments(day_dir)
+        self._day = day
+        self._open_segment(segments[-1] if segments else 0)
+        _repair_index(day_dir)
+        self._index_fh = open(day_dir / INDEX_FILE, "ab")
+        # 索引可能被截断，丢弃该天的缓存
+        self.forget_day(day)
+
+    def _open_segment(self, seq: int) -> None:
+        if self._data_fh is not None:
+            self._data_fh.close()
+        path = _day_dir(self._day) / _segment_name(seq)
+        self._data_fh = open(path, "ab")
+        self._seq = seq
+        self._size = self._data_fh.tell()
+
+    def append(
+        self, record: Dict[str, Any], sync: bool = False, day: Optional[str] = None
+    ) -> None:
+        """追加一条记录；day（YYYYMMDD）默认为当天，迁移历史日志时指定"""
+        job_id = int(record.get("job_id") or 0)
+        data = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        day = day or datetime.now().strftime("%Y%m%d")
+
+        with self._write_lock:
+            if self._data_fh is None or self._day != day:
+                self._open_day(day)
+            elif self._size >= self.max_bytes:
+                self._open_segment(self._seq + 1)
+            assert self._data_fh is not None and self._index_fh is not None
+
+            offset = self._size
+            self._data_fh.write(data)
+            self._data_fh.flush()
+            self._index_fh.write(_INDEX_ENTRY.pack(job_id, self._seq, offset, len(data)))
+            self._index_fh.flush()
+            if sync:
+                os.fsync(self._data_fh.fileno())
+                os.fsync(self._index_fh.fileno())
+            self._size += len(data)
+
+    def _close_files(self) -> None:
+        for fh in (self._data_fh, self._index_fh):
+            if fh is not None:
+                try:
+                    fh.close()
+                except Exception as e:
+                    logger.error(f"关闭共享日志段失败: {e}")
+        self._data_fh = None
+        self._index_fh = None
+        self._day = ""
+
+    def close(self) -> None:
+        """关闭当前打开的段和索引"""
+        with self._write_lock:
+            self._close_files()
+
+    # ------------------------------------------------------------------
+    # 读取
+    # ------------------------------------------------------------------
+
+    def _cached_index(self, day: str, size: int) -> Optional[_DayIndex]:
+        """增量加载某天索引到缓存（只解析上次之后新增的条目）；超出缓存上限时返回 None"""
+        cached = self._indexes.get(day)
+        if cached is not None and size < cached.loaded_bytes:
+            cached = None
+        if cached is None:
+            self._indexes.pop(day, None)
+            cached = _DayIndex()
+        self._indexes[day] = cached
+        self._indexes.move_to_end(day)
+
+        if size > cached.loaded_bytes:
+            with open(_day_dir(day) / INDEX_FILE, "rb") as fh:
+                fh.seek(cached.loaded_bytes)
+                chunk = fh.read(size - cached.loaded_bytes)
+            for job_id, seq, offset, length in _INDEX_ENTRY.iter_unpack(chunk):
+                cached.positions.setdefault(job_id, []).append((seq, offset, length))
+            cached.loaded_bytes = size
+
+        # 按最近使用淘汰其他日期，直到天数和条目数都不超过上限
+        total = sum(index.entries for index in self._indexes.values())
+        while len(self._indexes) > 1 and (
+            len(self._indexes) > self.cached_days or total > self.cached_entries
+        ):
+            _, evicted = self._indexes.popitem(last=False)
+            total -= evicted.entries
+        if total > self.cached_entries:
+            # 单天条目数超过上限，不缓存
+            self._indexes.pop(day, None)
+            return None
+        return cached
+
+    def _scan_index(self, day: str, job_id: int, size: int) -> Positions:
+        """流式扫描某天索引，只收集该任务的条目"""
+        positions: Positions = []
+        step = _INDEX_ENTRY.size * _SCAN_ENTRIES
+        with open(_day_dir(day) / INDEX_FILE, "rb") as fh:
+            remaining = size
+            while remaining > 0:
+                chunk = fh.read(min(step, remaining))
+                if len(chunk) < _INDEX_ENTRY.size:
+                    break
+                chunk = chunk[: len(chunk) - len(chunk) % _INDEX_ENTRY.size]
+                remaining -= len(chunk)
+                for entry_job_id, seq, offset, length in _INDEX_ENTRY.iter_unpack(chunk):
+                    if entry_job_id == job_id:
+                        positions.append((seq, offset, length))
+        return positions
+
+    def _job_positions(self, day: str, job_id: int) -> Positions:
+        """某任务某天的记录位置（不含任务删除前写入的记录）"""
+        tombstone = self._load_tombstones().get(job_id)
+        if tombstone is not None and day < tombstone[0]:
+            return []
+        try:
+            size = os.path.getsize(_day_dir(day) / INDEX_FILE)
+        except OSError:
+            # 索引被保留策略删除，清空缓存
+            self.forget_day(day)
+            return []
+        size -= size % _INDEX_ENTRY.size
+        try:
+            with self._index_lock:
+                cached = self._cached_index(day, size)
+                if cached is not None:
+                    positions = list(cached.positions.get(job_id, ()))
+                else:
+                    positions = None
+            if positions is None:
+                positions = self._scan_index(day, job_id, size)
+        except OSError:
+            self.forget_day(day)
+            return []
+        if tombstone is not None and day == tombstone[0]:
+            head = tombstone[1:]
+            positions = [p for p in positions if (p[0], p[1]) >= head]
+        return positions
+
+    # ------------------------------------------------------------------
+    # 删除任务
+    # ------------------------------------------------------------------
+
+    def _load_tombstones(self) -> Dict[int, Tuple[str, int, int]]:
+        with self._index_lock:
+            if self._tombstones is None:
+                tombstones: Dict[int, Tuple[str, int, int]] = {}
+                try:
+                    with open(STORE_DIR / TOMBSTONE_FILE, "rb") as fh:
+                        data = fh.read()
+                except OSError:
+                    data = b""
+                data = data[: len(data) - len(data) % _TOMBSTONE_ENTRY.size]
+                for job_id, day, seq, offset in _TOMBSTONE_ENTRY.iter_unpack(data):
+                    tombstones[job_id] = (day.decode("ascii", errors="ignore"), seq, offset)
+                self._tombstones = tombstones
+            return self._tombstones
+
+    def forget_job(self, job_id: int) -> None:
+        """删除任务后调用：记录当前写入位置，之后读取该任务时忽略此前写入的记录"""
+        if not STORE_DIR.is_dir():
+            return
+        today = datetime.now().strftime("%Y%m%d")
+        with self._write_lock:
+            if self._data_fh is not None and self._day == today:
+                head = (self._seq, self._size)
+            else:
+                # 当天的段尚未打开，下一条记录写在最后一个段的末尾
+                segments = _list_segments(_day_dir(today))
+                seq = segments[-1] if segments else 0
+                try:
+                    size = os.path.getsize(_day_dir(today) / _segment_name(seq))
+                except OSError:
+                    size = 0
+                head = (seq, size)
+        tombstones = self._load_tombstones()
+        with self._index_lock:
+            with open(STORE_DIR / TOMBSTONE_FILE, "ab") as fh:
+                fh.write(_TOMBSTONE_ENTRY.pack(job_id, today.encode("ascii"), *head))
+            tombstones[job_id] = (today, *head)
+
+    def job_days(self, job_id: int) -> List[str]:
+        """列出含有该任务记录的日期（YYYYMMDD，升序）"""
+        if not STORE_DIR.is_dir():
+            return []
+        days = sorted(entry.name for entry in os.scandir(STORE_DIR) if entry.is_dir())
+        return [day for day in days if self._job_positions(day, job_id)]
+
+    def iter_job_records(self, job_id: int, date: str) -> Iterator[Dict[str, Any]]:
+        """逐条读取某任务某天（YYYY-MM-DD）的记录，按写入顺序"""
+        day = date.replace("-", "")[:8]
+        positions = self._job_positions(day, job_id)
+        if not positions:
+            return
+
+        handles: Dict[int, BinaryIO] = {}
+        try:
+            for seq, offset, length in positions:
+                fh = handles.get(seq)
+                if fh is None:
+                    try:
+                        fh = open(_day_dir(day) / _segment_name(seq), "rb")
+                    except OSError:
+                        continue
+                    handles[seq] = fh
+                fh.seek(offset)
+                line = fh.read(length)
+                if len(line) != length:
+                    # 数据未完整落盘
+                    continue
+                try:
+                    record = json.loads(line)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    continue
+                yield record
+        finally:
+            for fh in handles.values():
+                fh.close()
+
+    def read_job_records(self, job_id: int, date: str) -> List[Dict[str, Any]]:
+        """读取某任务某天（YYYY-MM-DD）的记录，按写入顺序"""
+        return list(self.iter_job_records(job_id, date))
+
+    def forget_day(self, day: str) -> None:
+        """丢弃某天的索引缓存（删除该天数据后调用）"""
+        with self._index_lock:
+            self._indexes.pop(day, None)
+
+
+shared_log_store = SharedLogStore()
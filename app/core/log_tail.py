@@ -0,0 +1,109 @@
+"""
+日志尾部读取
+
+按固定大小的块从文件末尾向前扫描，直到凑够N行（可带过滤条件），
+内存占用只与N和块大小有关，与文件大小无关。同时支持从上次返回的
+偏移量继续向后读取，用于增量轮询。
+"""
+
+import os
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+BLOCK_SIZE = 64 * 1024
+
+
+def _match(line: bytes, needle: Optional[bytes]) -> bool:
+    return needle is None or needle in line
+
+
+def _decode(line: bytes) -> str:
+    return line.rstrip(b"\r").decode("utf-8", errors="ignore")
+
+
+def tail_lines(
+    path: str, n: int, grep: str = "", block_size: int = BLOCK_SIZE
+) -> Tuple[List[str], int]:
+    """读取文件最后n行（只统计包含grep的行），返回(行列表, 续读偏移)
+
+    续读偏移指向最后一个换行符之后；未写完的最后一行（没有换行符）不返回，写完后由下次
+    增量读取返回，不会重复。
+    """
+    needle = grep.encode("utf-8") if grep else None
+    lines: List[bytes] = []
+
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        position = size
+        carry = b""
+        next_offset: Optional[int] = None
+
+        while position > 0 and len(lines) < n:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            chunk = f.read(read_size) + carry
+            if next_offset is None:
+                last_newline = chunk.rfind(b"\n")
+                if last_newline == -1:
+                    # 仍在未写完的最后一行中
+                    carry = chunk
+                    continue
+                next_offset = position + last_newline + 1
+                chunk = chunk[:last_newline]
+            parts = chunk.split(b"\n")
+            # 第一段可能是不完整的行，留到下一个块拼接
+            carry = parts[0]
+            for line in reversed(parts[1:]):
+                if line and _match(line, needle):
+                    lines.append(line)
+                    if len(lines) >= n:
+                        break
+
+        if (
+            position == 0
+            and next_offset is not None
+            and len(lines) < n
+            and carry
+            and _match(carry, needle)
+        ):
+            lines.append(carry)
+
+    if next_offset is None:
+        next_offset = 0
+    lines.reverse()
+    return [_decode(line) for line in lines], next_offset
+
+
+def read_since(
+    path: str, offset: int, n: int, grep: str = "", block_size: int = BLOCK_SIZE
+) -> Tuple[List[str], int]:
+    """从offset向后读取新增的完整行，最多保留最后n行，返回(行列表, 续读偏移)
+
+    offset超过文件大小（日志被轮转或截断）时退化为读取尾部。
+    """
+    size = os.path.getsize(path)
+    if offset > size:
+        return tail_lines(path, n, grep, block_size)
+
+    needle = grep.encode("utf-8") if grep else None
+    lines: Deque[bytes] = deque(maxlen=n)
+    next_offset = offset
+
+    with open(path, "rb") as f:
+        f.seek(offset)
+        carry = b""
+        while True:
+            chunk = f.read(block_size)
+            if not chunk:
+                break
+            chunk = carry + chunk
+            parts = chunk.split(b"\n")
+            carry = parts.pop()
+            for line in parts:
+                next_offset += len(line) + 1
+                if line and _match(line, needle):
+                    lines.append(line)
+
+    return [_decode(line) for line in lines], next_offset
@@ -0,0 +1,299 @@
+"""
+任务执行指标时序存储
+
+每次执行追加一条定长记录，按列分别写入 runtime/metrics/<yyyymm>/<列名>.col：
+
+    ts(int64 毫秒) | job_id(uint32) | duration_ms(uint32) | status(uint8) | mode(uint8) | code(int32)
+
+列文件只追加，查询时以 numpy.memmap 映射并做向量化聚合（按时间桶统计执行次数、
+失败率和耗时分位数）。删除任务后由 job_purger 在后台重写含该任务记录的月份。
+numpy 为可选依赖，未安装时不记录也不提供查询。
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - 可选依赖
+    np = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+METRICS_DIR = os.path.join("runtime", "metrics")
+COLUMN_SUFFIX = ".col"
+
+# 列名 -> numpy 类型（小端定长）
+COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("ts", "<i8"),
+    ("job_id", "<u4"),
+    ("duration_ms", "<u4"),
+    ("status", "u1"),
+    ("mode", "u1"),
+    ("code", "<i4"),
+)
+
+MODES = ("command", "http", "function")
+STATUS_FAILED = 0
+STATUS_SUCCESS = 1
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def encode_mode(mode: Optional[str]) -> int:
+    """任务模式编码，0 表示未知"""
+    try:
+        return MODES.index(mode or "") + 1
+    except ValueError:
+        return 0
+
+
+def _month_key(timestamp_ms: int) -> str:
+    return datetime.fromtimestamp(timestamp_ms / 1000).strftime("%Y%m")
+
+
+def _months_between(start_ms: int, end_ms: int) -> List[str]:
+    start = datetime.fromtimestamp(start_ms / 1000)
+    end = datetime.fromtimestamp(end_ms / 1000)
+    months = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        months.append(f"{year:04d}{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+class MetricsStore:
+    """按月分区的列式追加存储"""
+
+    def __init__(self, base_dir: str = METRICS_DIR):
+        self.base_dir = base_dir
+        self._month: Optional[str] = None
+        self._handles: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        return np is not None
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+
+    def _column_path(self, month: str, column: str) -> str:
+        return os.path.join(self.base_dir, month, column + COLUMN_SUFFIX)
+
+    def _open_month(self, month: str) -> None:
+        self._close_handles()
+        os.makedirs(os.path.join(self.base_dir, month), exist_ok=True)
+        self._repair_month(month)
+        self._handles = {
+            column: open(self._column_path(month, column), "ab") for column, _ in COLUMNS
+        }
+        self._month = month
+
+    def _repair_month(self, month: str) -> None:
+        """进程中断可能导致各列长度不一致，截断到最短列的完整记录数"""
+        counts = []
+        for column, dtype in COLUMNS:
+            path = self._column_path(month, column)
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            counts.append(size // np.dtype(dtype).itemsize)
+        rows = min(counts)
+        for column, dtype in COLUMNS:
+            path = self._column_path(month, column)
+            if os.path.exists(path) and os.path.getsize(path) != rows * np.dtype(dtype).itemsize:
+                with open(path, "r+b") as f:
+                    f.truncate(rows * np.dtype(dtype).itemsize)
+
+    def append(
+        self,
+        job_id: int,
+        mode: Optional[str],
+        duration_ms: int,
+        success: bool,
+        code: Optional[int] = None,
+        timestamp: Optional[float] = None,
+    ) -> None:
+        """追加一条执行记录"""
+        if np is None:
+            return
+        ts = int((timestamp if timestamp is not None else datetime.now().timestamp()) * 1000)
+        values = {
+            "ts": ts,
+            "job_id": job_id,
+            "duration_ms": max(0, int(duration_ms)),
+            "status": STATUS_SUCCESS if success else STATUS_FAILED,
+            "mode": encode_mode(mode),
+            "code": int(code or 0),
+        }
+        month = _month_key(ts)
+        rows = [(column, np.array([values[column]], dtype=dtype).tobytes()) for column, dtype in COLUMNS]
+        with self._lock:
+            if month != self._month:
+                self._open_month(month)
+            try:
+                for column, data in rows:
+                    f = self._handles[column]
+                    f.write(data)
+                    f.flush()
+            except OSError:
+                # 部分列已写入：截断到完整记录，并关闭句柄使下次写入重新打开
+                self._close_handles()
+                try:
+                    self._repair_month(month)
+                except OSError as e:
+                    logger.error(f"修复执行指标列文件失败 ({month}): {e}")
+                raise
+
+    def _close_handles(self) -> None:
+        for f in self._handles.values():
+            try:
+                f.close()
+            except OSError:
+                pass
+        self._handles = {}
+        self._month = None
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_handles()
+
+    def forget(self, job_ids: Iterable[int], before: Optional[float] = None) -> int:
+        """删除任务在 before（时间戳，默认当前）之前的记录，返回删除的条数
+
+        逐月重写含这些任务记录的列文件（写临时文件后替换），重写期间暂停追加。
+        """
+        ids = list(job_ids)
+        if np is None or not ids or not os.path.isdir(self.base_dir):
+            return 0
+        before_ms = int((time.time() if before is None else before) * 1000)
+        months = sorted(
+            entry.name
+            for entry in os.scandir(self.base_dir)
+            if entry.is_dir() and len(entry.name) == 6 and entry.name.isdigit()
+        )
+        removed = 0
+        for month in months:
+            with self._lock:
+                if month == self._month:
+                    self._close_handles()
+                self._repair_month(month)
+                data = {}
+                for column, dtype in COLUMNS:
+                    path = self._column_path(month, column)
+                    data[column] = (
+                        np.fromfile(path, dtype=dtype) if os.path.exists(path) else np.empty(0, dtype)
+                    )
+                if len(data["ts"]) == 0:
+                    continue
+                drop = np.isin(data["job_id"], ids) & (data["ts"] < before_ms)
+                count = int(drop.sum())
+                if count == 0:
+                    continue
+                # 先写完全部临时文件再逐个替换，缩短各列不一致的时间窗口
+                paths = [self._column_path(month, column) for column, _ in COLUMNS]
+                for (column, _), path in zip(COLUMNS, paths):
+                    data[column][~drop].tofile(path + ".tmp")
+                for path in paths:
+                    os.replace(path + ".tmp", path)
+                removed += count
+        return removed
+
+    # ------------------------------------------------------------------
+    # 读取
+    # ------------------------------------------------------------------
+
+    def _load_month(self, month: str) -> Optional[Dict[str, Any]]:
+        """以 memmap 映射某月的所有列（长度按最短列对齐）"""
+        arrays: Dict[str, Any] = {}
+        for column, dtype in COLUMNS:
+            path = self._column_path(month, column)
+            if not os.path.exists(path) or os.path.getsize(path) < np.dtype(dtype).itemsize:
+                return None
+            arrays[column] = np.memmap(path, dtype=dtype, mode="r")
+        rows = min(len(a) for a in arrays.values())
+        return {column: a[:rows] for column, a in arrays.items()}
+
+    def load(
+        self,
+        start: datetime,
+        end: datetime,
+        job_id: Optional[int] = None,
+        mode: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """读取时间范围内（含start，不含end）符合条件的原始列"""
+        start_ms = int(start.timestamp() * 1000)
+        end_ms = int(end.timestamp() * 1000)
+        parts: Dict[str, List[Any]] = {column: [] for column, _ in COLUMNS}
+        with self._lock:
+            for f in self._handles.values():
+                f.flush()
+        for month in _months_between(start_ms, end_ms):
+            data = self._load_month(month)
+            if data is None:
+                continue
+            mask = (data["ts"] >= start_ms) & (data["ts"] < end_ms)
+            if job_id is not None:
+                mask &= data["job_id"] == job_id
+            if mode:
+                mask &= data["mode"] == encode_mode(mode)
+            for column, _ in COLUMNS:
+                # 布尔索引会复制数据，之后即可释放映射
+                parts[column].append(data[column][mask])
+        return {
+            column: np.concatenate(parts[column]) if parts[column] else np.empty(0, dtype=dtype)
+            for column, dtype in COLUMNS
+        }
+
+    def query(
+        self,
+        start: datetime,
+        end: datetime,
+        bucket_seconds: int = 60,
+        job_id: Optional[int] = None,
+        mode: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """按时间桶聚合：执行次数、失败次数、失败率、耗时 p50/p95/p99（只返回有数据的桶）"""
+        if np is None:
+            raise RuntimeError("未安装 numpy，无法查询执行指标")
+        data = self.load(start, end, job_id, mode)
+        if len(data["ts"]) == 0:
+            return []
+
+        start_ms = int(start.timestamp() * 1000)
+        buckets = (data["ts"] - start_ms) // (bucket_seconds * 1000)
+        # 按(桶, 耗时)排序后，每个桶内的耗时有序，可直接按秩取分位数
+        order = np.lexsort((data["duration_ms"], buckets))
+        buckets = buckets[order]
+        durations = data["duration_ms"][order]
+        failures = (data["status"][order] == STATUS_FAILED).astype(np.int64)
+
+        keys, first, counts = np.unique(buckets, return_index=True, return_counts=True)
+        errors = np.add.reduceat(failures, first)
+        mean = np.add.reduceat(durations.astype(np.float64), first) / counts
+        percentiles = {
+            q: durations[first + np.floor(q * (counts - 1)).astype(np.int64)] for q in QUANTILES
+        }
+
+        result = []
+        for i, key in enumerate(keys.tolist()):
+            bucket_start = datetime.fromtimestamp((start_ms + key * bucket_seconds * 1000) / 1000)
+            result.append(
+                {
+                    "time": bucket_start.strftime("%Y-%m-%d %H:%M:%S"),
+                    "count": int(counts[i]),
+                    "errors": int(errors[i]),
+                    "error_rate": round(float(errors[i]) / int(counts[i]), 4),
+                    "mean_ms": round(float(mean[i]), 2),
+                    **{f"p{int(q * 100)}_ms": int(percentiles[q][i]) for q in QUANTILES},
+                }
+            )
+        return result
+
+
+metrics_store = MetricsStore()
@@ -0,0 +1,99 @@
+"""
+数据库迁移
+
+表结构由 app/migrations 下的 Alembic 迁移维护（create_all 无法给已有表加字段、加索引）。
+服务启动时调用 upgrade_database：先比较数据库记录的版本与迁移脚本的最新版本，一致则
+直接返回，不一致才执行 upgrade。引入迁移前由 create_all 建表的数据库没有版本记录，
+先标记为基线版本 0001 再升级。
+
+执行记录单独存放在历史库（DATABASE_HISTORY_SQLITE_PATH）时，历史库只有 job_exec_logs
+一张表，由 ensure_history_tables 按模型建表（不含指向 jobs 表的外键）。
+"""
+
+import logging
+import os
+from typing import Optional
+
+from alembic import command
+from alembic.config import Config as AlembicConfig
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from app.models.base import get_table_name
+from app.models.log import JobExecLog
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "migrations")
+VERSION_TABLE = get_table_name("alembic_version")
+BASELINE_REVISION = "0001"
+# 存放在历史库的表
+HISTORY_TABLES = (JobExecLog.__table__,)
+
+
+def alembic_config() -> AlembicConfig:
+    cfg = AlembicConfig()
+    cfg.set_main_option("script_location", MIGRATIONS_DIR)
+    return cfg
+
+
+def head_revision() -> Optional[str]:
+    """迁移脚本的最新版本"""
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+
+def current_revision(bind: Engine) -> Optional[str]:
+    """数据库当前版本，未纳入迁移管理时为 None"""
+    with bind.connect() as conn:
+        return MigrationContext.configure(
+            conn, opts={"version_table": VERSION_TABLE}
+        ).get_current_revision()
+
+
+def upgrade_database(bind: Optional[Engine] = None) -> bool:
+    """升级到最新版本，已是最新时返回 False"""
+    if bind is None:
+        from app.deps import engine
+
+        bind = engine
+    head = head_revision()
+    current = current_revision(bind)
+    if current == head:
+        return False
+
+    cfg = alembic_config()
+    with bind.begin() as conn:
+        cfg.attributes["connection"] = conn
+        if current is None and inspect(conn).has_table(get_table_name("jobs")):
+            logger.info("数据库由旧版本创建，标记为基线版本后升级")
+            command.stamp(cfg, BASELINE_REVISION)
+        command.upgrade(cfg, "head")
+    logger.info(f"数据库已升级: {current} -> {head}")
+    return True
+
+
+def ensure_history_tables(bind: Optional[Engine] = None) -> bool:
+    """在单独的历史库中创建缺少的表和索引，有新建时返回 True；未单独配置历史库时跳过
+
+    任务表在主库，历史库中的表不创建外键；删除任务后的执行记录由 job_purger 后台删除。
+    """
+    if bind is None:
+        from app.deps import HISTORY_DB_SEPARATE, history_engine
+
+        if not HISTORY_DB_SEPARATE:
+            return False
+        bind = history_engine
+    created = False
+    with bind.begin() as conn:
+        for table in HISTORY_TABLES:
+            if inspect(conn).has_table(table.name):
+                continue
+            conn.execute(CreateTable(table, include_foreign_key_constraints=[]))
+            for index in table.indexes:
+                conn.execute(CreateIndex(index))
+            logger.info(f"已在历史库创建表 {table.name}")
+            created = True
+    return created
@@ -0,0 +1,188 @@
+"""
+任务输出内容寻址存储
+
+同一任务反复返回相同内容（健康检查、幂等命令）时，输出正文按哈希只保存一次：
+
+    runtime/jobs/<任务ID>/<年月>/objects.pack   输出正文（UTF-8，追加写入）
+    runtime/jobs/<任务ID>/<年月>/objects.idx    定长索引项 <16sQI>（摘要, 偏移, 长度）
+
+执行记录中的 output 置空，改为记录 output_ref（摘要十六进制）和 output_len，
+读取时再还原。按月分区，日志保留策略删除整月日志后随之删除。
+
+共享日志存储（JOB_LOG_STORAGE=shared）不再使用任务目录，输出包放在共享段的日目录下，
+由当天所有任务共用，随该天的段文件一起过期：
+
+    runtime/logstore/<年月日>/objects.pack
+    runtime/logstore/<年月日>/objects.idx
+"""
+
+import hashlib
+import os
+import struct
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.config import Config
+from app.core.log_store import STORE_DIR
+
+PACK_NAME = "objects.pack"
+INDEX_NAME = "objects.idx"
+
+_INDEX_ENTRY = struct.Struct("<16sQI")
+_CACHE_SIZE = 256
+
+
+def output_digest(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def _month_dir(job_id: int, month: str) -> str:
+    return os.path.join("runtime", "jobs", str(job_id), month)
+
+
+def _shared_day_dir(day: str) -> str:
+    """day 为 YYYYMMDD"""
+    return os.path.join(str(STORE_DIR), day)
+
+
+def _record_pack_dir(record: Dict[str, Any], shared: bool) -> Optional[str]:
+    """按记录时间定位输出包目录：共享存储按天，否则按任务和月"""
+    digits = str(record.get("time", ""))[:10].replace("-", "")
+    if shared:
+        return _shared_day_dir(digits) if len(digits) == 8 and digits.isdigit() else None
+    month = digits[:6]
+    if len(month) != 6 or not month.isdigit():
+        return None
+    return _month_dir(int(record["job_id"]), month)
+
+
+class OutputPack:
+    """单个目录（任务单月或共享段单日）的输出包"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.pack_path = os.path.join(self.directory, PACK_NAME)
+        self.index_path = os.path.join(self.directory, INDEX_NAME)
+        self._index: Dict[bytes, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+        self._load_index()
+
+    def _load_index(self) -> None:
+        try:
+            pack_size = os.path.getsize(self.pack_path)
+            with open(self.index_path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return
+        usable = len(data) - len(data) % _INDEX_ENTRY.size
+        for digest, offset, length in _INDEX_ENTRY.iter_unpack(data[:usable]):
+            # 忽略正文未完整写入的索引项
+            if offset + length <= pack_size:
+                self._index[digest] = (offset, length)
+
+    def put(self, data: bytes) -> bytes:
+        """保存正文（已存在则跳过），返回摘要"""
+        digest = output_digest(data)
+        with self._lock:
+            if digest in self._index:
+                return digest
+            os.makedirs(self.directory, exist_ok=True)
+            # 先写正文再写索引，中断时最多留下一段无索引的正文
+            with open(self.pack_path, "ab") as f:
+                offset = f.tell()
+                f.write(data)
+            with open(self.index_path, "ab") as f:
+                f.write(_INDEX_ENTRY.pack(digest, offset, len(data)))
+            self._index[digest] = (offset, len(data))
+        return digest
+
+    def get(self, digest: bytes) -> Optional[bytes]:
+        with self._lock:
+            position = self._index.get(digest)
+        if position is None:
+            return None
+        offset, length = position
+        try:
+            with open(self.pack_path, "rb") as f:
+                f.seek(offset)
+                data = f.read(length)
+        except OSError:
+            return None
+        return data if len(data) == length else None
+
+
+class OutputStore:
+    """按目录缓存输出包"""
+
+    def __init__(self, min_bytes: Optional[int] = None):
+        self.min_bytes = Config.JOB_LOG_DEDUPE_MIN_BYTES if min_bytes is None else min_bytes
+        self._packs: "OrderedDict[str, OutputPack]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _pack(self, directory: str) -> OutputPack:
+        with self._lock:
+            pack = self._packs.get(directory)
+            if pack is None:
+                pack = OutputPack(directory)
+                self._packs[directory] = pack
+                if len(self._packs) > _CACHE_SIZE:
+                    self._packs.popitem(last=False)
+            else:
+                self._packs.move_to_end(directory)
+            return pack
+
+    def _forget_dirs(self, directories: Tuple[str, ...], prefix: str = "") -> None:
+        with self._lock:
+            for key in list(self._packs):
+                if key in directories or (prefix and key.startswith(prefix)):
+                    del self._packs[key]
+
+    def forget(self, job_id: int, month: Optional[str] = None) -> None:
+        """丢弃任务目录下输出包的缓存（删除输出包后调用）"""
+        if month is not None:
+            self._forget_dirs((_month_dir(job_id, month),))
+        else:
+            self._forget_dirs((), _month_dir(job_id, ""))
+
+    def forget_day(self, day: str) -> None:
+        """丢弃共享段某天输出包的缓存（删除该天数据后调用）"""
+        self._forget_dirs((_shared_day_dir(day),))
+
+    def dedupe(self, record: Dict[str, Any], shared: bool = False) -> Dict[str, Any]:
+        """将记录中较长的输出替换为引用，返回新记录（原记录不变）
+
+        shared 为 True 时输出包放在共享段的日目录下，否则放在任务的月目录下。
+        """
+        output = record.get("output")
+        if not isinstance(output, str) or not output:
+            return record
+        data = output.encode("utf-8")
+        if len(data) < self.min_bytes:
+            return record
+        directory = _record_pack_dir(record, shared)
+        if directory is None:
+            return record
+        digest = self._pack(directory).put(data)
+        deduped = dict(record)
+        deduped["output"] = ""
+        deduped["output_ref"] = digest.hex()
+        deduped["output_len"] = len(data)
+        return deduped
+
+    def rehydrate(self, record: Dict[str, Any], shared: bool = False) -> Dict[str, Any]:
+        """还原记录中的输出引用（就地修改并返回），shared 与写入时一致"""
+        ref = record.pop("output_ref", None)
+        if not ref:
+            return record
+        record.pop("output_len", None)
+        try:
+            directory = _record_pack_dir(record, shared)
+            data = self._pack(directory).get(bytes.fromhex(ref)) if directory else None
+        except (KeyError, TypeError, ValueError):
+            data = None
+        record["output"] = data.decode("utf-8", errors="ignore") if data is not None else ""
+        return record
+
+
+output_store = OutputStore()
@@ -0,0 +1,159 @@
+"""
+SQL查询统计
+
+在 Engine 类上注册 before_cursor_execute / after_cursor_execute 监听（同步、异步、副本和
+写入队列引擎都会触发），把每条语句的耗时记入当前上下文的 QueryStats：
+
+    with track_queries() as stats:
+        ...
+    stats.count, stats.total_ms, stats.slowest_ms, stats.slowest_sql
+
+HTTP 请求由 QueryStatsMiddleware 统计并写入响应头，任务执行由 run_job 统计；两者都按
+接口路由 / 任务汇总到 query_metrics（/jobs/queryStats）。经写入队列提交的写入计入提交方；
+db日志批量写入等后台线程自身的查询不在任何统计范围内，不计入。
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+# 记录的语句最大长度
+MAX_SQL_LENGTH = 500
+# 汇总的最大键数（接口路由 + 任务），超出后归入 OTHER_KEY
+MAX_KEYS = 1024
+OTHER_KEY = "other"
+
+_START_KEY = "query_stats_start"
+
+
+class QueryStats:
+    """一个统计范围（一次请求或一次任务执行）内的查询"""
+
+    def __init__(self, keep_statements: bool = False):
+        self.count = 0
+        self.total_ms = 0.0
+        self.slowest_ms = 0.0
+        self.slowest_sql = ""
+        # 测试中保留全部语句，便于超出查询预算时定位
+        self.statements: Optional[List[str]] = [] if keep_statements else None
+
+    def record(self, elapsed_ms: float, statement: str) -> None:
+        self.count += 1
+        self.total_ms += elapsed_ms
+        if elapsed_ms >= self.slowest_ms:
+            self.slowest_ms = elapsed_ms
+            self.slowest_sql = statement[:MAX_SQL_LENGTH]
+        if self.statements is not None:
+            self.statements.append(statement)
+
+    def headers(self) -> Dict[str, str]:
+        return {
+            "X-Query-Count": str(self.count),
+            "X-Query-Time-Ms": f"{self.total_ms:.2f}",
+            "X-Query-Slowest-Ms": f"{self.slowest_ms:.2f}",
+        }
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+@contextmanager
+def track_queries(keep_statements: bool = False) -> Iterator[QueryStats]:
+    """在 with 块内统计当前上下文（含其中启动的线程池调用）执行的查询"""
+    stats = QueryStats(keep_statements)
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if Config.QUERY_STATS_ENABLED and (_current.get() is not None or Config.QUERY_SLOW_MS > 0):
+        conn.info.setdefault(_START_KEY, []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    starts = conn.info.get(_START_KEY)
+    if not starts:
+        return
+    elapsed_ms = (time.perf_counter() - starts.pop()) * 1000
+    stats = _current.get()
+    if stats is not None:
+        stats.record(elapsed_ms, statement)
+    if 0 < Config.QUERY_SLOW_MS <= elapsed_ms:
+        logger.warning(f"慢查询 {elapsed_ms:.1f}ms: {statement[:MAX_SQL_LENGTH]}")
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context) -> None:
+    # 执行失败时不会触发 after_cursor_execute，丢弃对应的开始时间
+    conn = exception_context.connection
+    starts = conn.info.get(_START_KEY) if conn is not None else None
+    if starts:
+        starts.pop()
+
+
+class QueryMetrics:
+    """按接口路由 / 任务汇总查询统计"""
+
+    def __init__(self) -> None:
+        self._items: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: str, stats: QueryStats) -> None:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                if len(self._items) >= MAX_KEYS:
+                    key = OTHER_KEY
+                item = self._items.setdefault(
+                    key,
+                    {
+                        "calls": 0,
+                        "queries": 0,
+                        "max_queries": 0,
+                        "total_ms": 0.0,
+                        "slowest_ms": 0.0,
+                        "slowest_sql": "",
+                    },
+                )
+            item["calls"] += 1
+            item["queries"] += stats.count
+            item["max_queries"] = max(item["max_queries"], stats.count)
+            item["total_ms"] += stats.total_ms
+            if stats.slowest_ms >= item["slowest_ms"] and stats.count:
+                item["slowest_ms"] = stats.slowest_ms
+                item["slowest_sql"] = stats.slowest_sql
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """按查询总耗时降序返回各项汇总"""
+        with self._lock:
+            items = [dict(item, key=key) for key, item in self._items.items()]
+        for item in items:
+            calls = item["calls"] or 1
+            item["avg_queries"] = round(item["queries"] / calls, 2)
+            item["avg_ms"] = round(item["total_ms"] / calls, 3)
+            item["total_ms"] = round(item["total_ms"], 3)
+            item["slowest_ms"] = round(item["slowest_ms"], 3)
+        items.sort(key=lambda item: item["total_ms"], reverse=True)
+        return items
+
+    def reset(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+query_metrics = QueryMetrics()
@@ -5,21 +5,44 @@ from datetime import datetime
 from typing import Any, Dict
 
 import requests
+from sqlalchemy import update
 
+from app.core.db_writer import db_write_queue
+from app.core.failure_journal import failure_journal
 from app.core.job_logger import JobLogger
+from app.core.job_stats import job_stats
+from app.core.metrics_store import metrics_store
+from app.core.query_stats import query_metrics, track_queries
 from app.deps import SessionLocal
 from app.function.registry import get_function
+from app.models.fields import parse_tags
 from app.models.job import Job
 
 logger = logging.getLogger(__name__)
 
 
+def increment_run_count(job_id: int) -> None:
+    """执行次数加一：UPDATE ... SET run_count = run_count + 1，并发执行也不会丢失计数"""
+    stmt = update(Job).where(Job.id == job_id).values(run_count=Job.run_count + 1)
+    try:
+        db_write_queue.execute(lambda conn: conn.execute(stmt))
+    except Exception as e:
+        logger.error(f"更新任务 {job_id} 执行次数失败: {e}")
+
+
 def run_job(job_id: int) -> None:
+    """执行任务，并按任务汇总本次执行的SQL查询"""
+    with track_queries() as stats:
+        _run_job(job_id)
+    query_metrics.record(f"job:{job_id}", stats)
+
+
+def _run_job(job_id: int) -> None:
     """执行任务"""
     log_detail = {}
     job_logger = None
     
-    # 使用上下文管理器自动关闭数据库连接
+    # 使用上下文管理器自动关闭数据库连接（状态和执行次数决定是否执行，读主库避免复制延迟）
     with SessionLocal() as db:
         try:
             job = db.query(Job).filter(Job.id == job_id).first()
@@ -38,7 +61,7 @@ def run_job(job_id: int) -> None:
                 return
 
             # 创建任务日志管理器
-            job_logger = JobLogger(job_id=job.id, job_name=job.name)
+            job_logger = JobLogger(job_id=job.id, job_name=job.name, log_policy=job.log_policy)
 
             start_time = time.time()
             success = False
@@ -79,9 +102,38 @@ def run_job(job_id: int) -> None:
                 if job_logger:
                     job_logger.write_text_log(summary_log)
 
-                # 更新任务执行次数
-                job.run_count += 1
-                db.commit()
+                # 先更新任务执行次数（原子自增，经写入队列提交），统计和日志写入失败不影响计数
+                increment_run_count(job_id)
+
+                try:
+                    job_stats.record(job.id, int(duration * 1000), success, end_time)
+                except Exception as e:
+                    logger.error(f"记录执行统计失败 (任务 {job_id}): {e}")
+                try:
+                    metrics_store.append(
+                        job.id,
+                        job.mode,
+                        int(duration * 1000),
+                        success,
+                        summary_log.get("status_code") or summary_log.get("exit_code"),
+                        end_time,
+                    )
+                except Exception as e:
+                    logger.error(f"写入执行指标失败 (任务 {job_id}): {e}")
+                if not success:
+                    try:
+                        failure_journal.append(
+                            job.id,
+                            job.name,
+                            job.mode,
+                            error_msg,
+                            int(duration * 1000),
+                            summary_log.get("result"),
+                            parse_tags(job.tags),
+                            end_time,
+                        )
+                    except Exception as e:
+                        logger.error(f"写入失败日志失败 (任务 {job_id}): {e}")
 
         except Exception as e:
             logger.error(f"执行任务 {job_id} 时发生错误: {e}")
@@ -1,8 +1,11 @@
 import logging
 import threading
-from typing import Any
+from typing import Any, Iterable, Optional
 
+from apscheduler.jobstores.base import JobLookupError
 from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.schedulers.base import STATE_RUNNING
+from apscheduler.triggers.base import BaseTrigger
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
 
@@ -21,85 +24,120 @@ scheduler = BackgroundScheduler(
 scheduler_lock = threading.Lock()
 
 
+def build_trigger(job: Job) -> Optional[BaseTrigger]:
+    """根据任务配置创建触发器，支持cron和interval，配置无效时返回None"""
+    if (
+        getattr(job, "trigger_type", "cron") == "interval"
+        and getattr(job, "interval_seconds", 0) > 0
+    ):
+        return IntervalTrigger(seconds=job.interval_seconds)
+    if getattr(job, "trigger_type", "cron") == "cron":
+        cron_parts = job.cron_expr.split()
+        logger.debug(
+            f"收到cron表达式: {job.cron_expr}, " f"解析: {cron_parts}, 长度: {len(cron_parts)}"
+        )
+        if len(cron_parts) == 5:
+            # 处理特殊情况：如果日、月、周都是0，则使用默认值
+            minute = cron_parts[0]
+            hour = cron_parts[1]
+            day = cron_parts[2] if cron_parts[2] != "0" else "*"
+            month = cron_parts[3] if cron_parts[3] != "0" else "*"
+            day_of_week = cron_parts[4] if cron_parts[4] != "0" else "*"
+
+            logger.debug(
+                f"使用5位cron, 参数: minute={minute}, "
+                f"hour={hour}, day={day}, "
+                f"month={month}, day_of_week={day_of_week}"
+            )
+            return CronTrigger(
+                minute=minute,
+                hour=hour,
+                day=day,
+                month=month,
+                day_of_week=day_of_week,
+            )
+        if len(cron_parts) == 6:
+            logger.debug(
+                f"使用6位cron, 参数: second={cron_parts[0]}, "
+                f"minute={cron_parts[1]}, hour={cron_parts[2]}, "
+                f"day={cron_parts[3]}, month={cron_parts[4]}, "
+                f"day_of_week={cron_parts[5]}"
+            )
+            return CronTrigger(
+                second=cron_parts[0],
+                minute=cron_parts[1],
+                hour=cron_parts[2],
+                day=cron_parts[3],
+                month=cron_parts[4],
+                day_of_week=cron_parts[5],
+            )
+        logger.error(f"无效的cron表达式: {job.cron_expr}")
+        return None
+    logger.error("无效的trigger_type或参数")
+    return None
+
+
+def _schedule(job: Job) -> bool:
+    """添加单个任务（调用方持有 scheduler_lock），返回是否已加入调度器"""
+    try:
+        # 检查任务是否有效
+        if not job or job.state == 2:  # 状态为2表示停止
+            logger.debug(f"任务 {getattr(job, 'id', 'unknown')} 无效或已停止，不添加到调度器")
+            return False
+
+        trigger = build_trigger(job)
+        if trigger is None:
+            return False
+
+        # 确保调度器正在运行
+        if not scheduler.running:
+            logger.warning("调度器未运行，正在启动...")
+            scheduler.start()
+
+        # 添加任务到调度器
+        scheduler.add_job(
+            run_job, trigger, args=[job.id], id=str(job.id), replace_existing=True
+        )
+        return True
+
+    except Exception as e:
+        logger.error(f"添加任务到调度器失败: {e}")
+        # 记录更详细的错误信息以便调试
+        import traceback
+        logger.debug(f"错误详情: {traceback.format_exc()}")
+        return False
+
+
+def _schedule_many(jobs: Iterable[Job]) -> int:
+    """批量添加（调用方持有 scheduler_lock）：暂停调度器期间逐个添加，恢复时只唤醒一次"""
+    paused = scheduler.state == STATE_RUNNING
+    if paused:
+        scheduler.pause()
+    added = 0
+    try:
+        for job in jobs:
+            if _schedule(job):
+                added += 1
+    finally:
+        if paused:
+            scheduler.resume()
+    return added
+
+
 def add_job_to_scheduler(job: Job) -> None:
     """添加任务到调度器，支持cron和interval"""
     # 使用线程锁确保调度器操作的线程安全
     with scheduler_lock:
-        try:
-            # 检查任务是否有效
-            if not job or job.state == 2:  # 状态为2表示停止
-                logger.debug(f"任务 {getattr(job, 'id', 'unknown')} 无效或已停止，不添加到调度器")
-                return
-                
-            # 根据触发器类型创建触发器
-            if (
-                getattr(job, "trigger_type", "cron") == "interval"
-                and getattr(job, "interval_seconds", 0) > 0
-            ):
-                trigger = IntervalTrigger(seconds=job.interval_seconds)
-            elif getattr(job, "trigger_type", "cron") == "cron":
-                cron_parts = job.cron_expr.split()
-                logger.debug(
-                    f"收到cron表达式: {job.cron_expr}, " f"解析: {cron_parts}, 长度: {len(cron_parts)}"
-                )
-                if len(cron_parts) == 5:
-                    # 处理特殊情况：如果日、月、周都是0，则使用默认值
-                    minute = cron_parts[0]
-                    hour = cron_parts[1]
-                    day = cron_parts[2] if cron_parts[2] != "0" else "*"
-                    month = cron_parts[3] if cron_parts[3] != "0" else "*"
-                    day_of_week = cron_parts[4] if cron_parts[4] != "0" else "*"
-
-                    logger.debug(
-                        f"使用5位cron, 参数: minute={minute}, "
-                        f"hour={hour}, day={day}, "
-                        f"month={month}, day_of_week={day_of_week}"
-                    )
-                    trigger = CronTrigger(
-                        minute=minute,
-                        hour=hour,
-                        day=day,
-                        month=month,
-                        day_of_week=day_of_week,
-                    )
-                elif len(cron_parts) == 6:
-                    logger.debug(
-                        f"使用6位cron, 参数: second={cron_parts[0]}, "
-                        f"minute={cron_parts[1]}, hour={cron_parts[2]}, "
-                        f"day={cron_parts[3]}, month={cron_parts[4]}, "
-                        f"day_of_week={cron_parts[5]}"
-                    )
-                    trigger = CronTrigger(
-                        second=cron_parts[0],
-                        minute=cron_parts[1],
-                        hour=cron_parts[2],
-                        day=cron_parts[3],
-                        month=cron_parts[4],
-                        day_of_week=cron_parts[5],
-                    )
-                else:
-                    logger.error(f"无效的cron表达式: {job.cron_expr}")
-                    return
-            else:
-                logger.error("无效的trigger_type或参数")
-                return
-                
-            # 确保调度器正在运行
-            if not scheduler.running:
-                logger.warning("调度器未运行，正在启动...")
-                scheduler.start()
-                
-            # 添加任务到调度器
-            scheduler.add_job(
-                run_job, trigger, args=[job.id], id=str(job.id), replace_existing=True
-            )
+        if _schedule(job):
             logger.info(f"任务 {job.name} (ID: {job.id}) 已添加到调度器")
-            
-        except Exception as e:
-            logger.error(f"添加任务到调度器失败: {e}")
-            # 记录更详细的错误信息以便调试
-            import traceback
-            logger.debug(f"错误详情: {traceback.format_exc()}")
+
+
+def add_jobs_to_scheduler(jobs: Iterable[Job]) -> int:
+    """批量添加任务到调度器，只获取一次锁，返回成功加入的数量"""
+    with scheduler_lock:
+        added = _schedule_many(jobs)
+    logger.info(f"批量添加 {added} 个任务到调度器")
+    return added
 
 
 def remove_job(job_id: int) -> None:
@@ -112,6 +150,20 @@ def remove_job(job_id: int) -> None:
             logger.error(f"移除任务失败: {e}")
 
 
+def remove_jobs(job_ids: Iterable[int]) -> int:
+    """批量从调度器移除任务，不在调度器中的任务直接跳过，返回移除的数量"""
+    removed = 0
+    with scheduler_lock:
+        for job_id in job_ids:
+            try:
+                scheduler.remove_job(str(job_id))
+                removed += 1
+            except JobLookupError:
+                pass
+    logger.info(f"批量从调度器移除 {removed} 个任务")
+    return removed
+
+
 def start_scheduler() -> None:
     """启动调度器"""
     with scheduler_lock:
@@ -124,8 +176,7 @@ def start_scheduler() -> None:
             try:
                 jobs = db.query(Job).filter(Job.state.in_([0, 1])).all()
                 logger.info(f"发现 {len(jobs)} 个有效任务")
-                for job in jobs:
-                    add_job_to_scheduler(job)
+                _schedule_many(jobs)
             except Exception as e:
                 logger.error(f"加载任务失败: {e}")
             finally:
@@ -1,47 +1,69 @@
 from contextlib import contextmanager
+from contextvars import ContextVar
+import itertools
 import logging
 import os
-from typing import Generator
+import time
+from typing import AsyncGenerator, Generator, Iterator, Optional, Sequence
 
 from sqlalchemy import create_engine, event
 from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import Session, sessionmaker
 
 from app.config import Config
+from app.models.log import JobExecLog
 
 # 配置日志
 logger = logging.getLogger(__name__)
 
-# 确保SQLite数据库目录存在
+# 确保SQLite数据库目录存在（主库和单独存放的历史库）
 if Config.DATABASE_TYPE.lower() == "sqlite":
-    db_path = Config.DATABASE_SQLITE_PATH
-    db_dir = os.path.dirname(db_path)
-    
-    # 如果数据库目录不存在，则创建
-    if not os.path.exists(db_dir):
-        try:
-            os.makedirs(db_dir, exist_ok=True)
-            logger.info(f"已创建数据库目录: {db_dir}")
-        except Exception as e:
-            logger.error(f"创建数据库目录失败: {e}")
-            raise
+    for db_path in (Config.DATABASE_SQLITE_PATH, Config.DATABASE_HISTORY_SQLITE_PATH):
+        db_dir = os.path.dirname(db_path)
+
+        # 如果数据库目录不存在，则创建
+        if db_dir and not os.path.exists(db_dir):
+            try:
+                os.makedirs(db_dir, exist_ok=True)
+                logger.info(f"已创建数据库目录: {db_dir}")
+            except Exception as e:
+                logger.error(f"创建数据库目录失败: {e}")
+                raise
+
+
+def _connect_args(url: str) -> dict:
+    if "sqlite" in url:
+        return {"check_same_thread": False, "timeout": Config.DATABASE_SQLITE_BUSY_TIMEOUT_MS / 1000}
+    return {}
+
 
 # 创建数据库引擎
 try:
     engine = create_engine(
         Config.get_database_url(),
         **Config.get_database_engine_options(),
-        connect_args=(
-            {"check_same_thread": False} if "sqlite" in Config.get_database_url() else {}
-        ),
+        connect_args=_connect_args(Config.get_database_url()),
     )
     
-    # 为SQLite添加外键支持
+    # 为SQLite添加外键支持和生产配置（WAL、同步级别、锁等待、内存映射、页缓存）
     if "sqlite" in Config.get_database_url():
         @event.listens_for(Engine, "connect")
         def set_sqlite_pragma(dbapi_connection, connection_record):
             cursor = dbapi_connection.cursor()
             cursor.execute("PRAGMA foreign_keys=ON")
+            cursor.execute(f"PRAGMA busy_timeout={Config.DATABASE_SQLITE_BUSY_TIMEOUT_MS}")
+            if Config.DATABASE_SQLITE_WAL:
+                cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute(f"PRAGMA synchronous={Config.DATABASE_SQLITE_SYNCHRONOUS}")
+            cursor.execute(f"PRAGMA mmap_size={Config.DATABASE_SQLITE_MMAP_SIZE_MB * 1024 * 1024}")
+            # 负数表示以KB为单位
+            cursor.execute(f"PRAGMA cache_size=-{Config.DATABASE_SQLITE_CACHE_SIZE_MB * 1024}")
             cursor.close()
             
     logger.info(f"数据库引擎已创建: {Config.DATABASE_TYPE}")
@@ -52,6 +74,159 @@ except Exception as e:
 # 创建会话工厂
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# SQLite 单写连接：后台写入队列（app.core.db_writer）独占这一个连接
+writer_engine = (
+    create_engine(
+        Config.get_database_url(),
+        pool_size=1,
+        max_overflow=0,
+        connect_args={
+            "check_same_thread": False,
+            "timeout": Config.DATABASE_SQLITE_BUSY_TIMEOUT_MS / 1000,
+        },
+    )
+    if "sqlite" in Config.get_database_url()
+    else engine
+)
+
+# 异步引擎：读多的接口使用 async def + AsyncSession，等待数据库时不占用线程池
+# （外键 PRAGMA 由上面注册在 Engine 类上的监听器同样应用到异步引擎）
+async_engine = create_async_engine(
+    Config.get_async_database_url(), **Config.get_database_engine_options()
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# 历史库（DATABASE_HISTORY_SQLITE_PATH）：执行记录使用独立的引擎、连接池和单写连接，
+# 未单独配置时与主库共用引擎
+HISTORY_DB_SEPARATE = Config.history_database_separate()
+if HISTORY_DB_SEPARATE:
+    _history_url = Config.get_history_database_url()
+    history_engine = create_engine(
+        _history_url,
+        **Config.get_database_engine_options(),
+        connect_args=_connect_args(_history_url),
+    )
+    history_writer_engine = create_engine(
+        _history_url, pool_size=1, max_overflow=0, connect_args=_connect_args(_history_url)
+    )
+    async_history_engine = create_async_engine(
+        Config.to_async_url(_history_url), **Config.get_database_engine_options()
+    )
+    logger.info(f"执行记录使用单独的历史库: {Config.DATABASE_HISTORY_SQLITE_PATH}")
+else:
+    history_engine = engine
+    history_writer_engine = writer_engine
+    async_history_engine = async_engine
+
+# 会话按模型选择引擎：执行记录固定走历史库，其余模型走会话的 bind（主库或副本）
+HISTORY_MODELS = (JobExecLog,)
+SessionLocal.configure(binds={model: history_engine for model in HISTORY_MODELS})
+AsyncSessionLocal.configure(binds={model: async_history_engine for model in HISTORY_MODELS})
+
+# 只读副本引擎（DATABASE_REPLICA_URLS）
+replica_engines = [
+    create_engine(url, **Config.get_database_engine_options(), connect_args=_connect_args(url))
+    for url in Config.DATABASE_REPLICA_URLS
+]
+async_replica_engines = [
+    create_async_engine(Config.to_async_url(url), **Config.get_database_engine_options())
+    for url in Config.DATABASE_REPLICA_URLS
+]
+
+
+class ClientWrite:
+    """一个请求内客户端的最后写入时间（墙上时钟秒）：请求携带的值，本请求提交后更新"""
+
+    __slots__ = ("last_write", "wrote")
+
+    def __init__(self, last_write: Optional[float] = None):
+        self.last_write = last_write
+        self.wrote = False
+
+
+# 当前请求的客户端写入状态，由 ReadYourWritesMiddleware 按请求设置；后台线程中为 None
+_client_write: ContextVar[Optional[ClientWrite]] = ContextVar("client_write", default=None)
+
+
+class DBRouter:
+    """
+    读写分离路由
+
+    写入使用主库会话（SessionLocal / get_db）；只读会话（get_read_session、get_read_db、
+    get_async_db）轮询使用副本。写后读主库的窗口按客户端计算：客户端在主库提交后
+    sticky_seconds 秒内的请求（携带最后写入时间，见 ReadYourWritesMiddleware）只读会话
+    也使用主库，保证编辑后立即刷新列表、详情能读到刚写入的数据，其他客户端不受影响。
+    """
+
+    def __init__(
+        self,
+        primary: Engine,
+        replicas: Sequence[Engine] = (),
+        async_primary: Optional[AsyncEngine] = None,
+        async_replicas: Sequence[AsyncEngine] = (),
+        sticky_seconds: Optional[float] = None,
+    ):
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.async_primary = async_primary
+        self.async_replicas = list(async_replicas)
+        self.sticky_seconds = (
+            Config.DATABASE_REPLICA_STICKY_SECONDS if sticky_seconds is None else sticky_seconds
+        )
+        self._counter = itertools.count()
+
+    @contextmanager
+    def client_scope(self, last_write: Optional[float] = None) -> Iterator[ClientWrite]:
+        """在一个请求内使用该客户端的最后写入时间"""
+        client = ClientWrite(last_write)
+        token = _client_write.set(client)
+        try:
+            yield client
+        finally:
+            _client_write.reset(token)
+
+    def mark_write(self) -> None:
+        """记录当前客户端的一次主库提交（请求之外的提交不影响读路由）"""
+        client = _client_write.get()
+        if client is not None:
+            client.last_write = time.time()
+            client.wrote = True
+
+    @property
+    def sticky(self) -> bool:
+        """当前客户端是否处于写后读主库的窗口内"""
+        client = _client_write.get()
+        if client is None or client.last_write is None:
+            return False
+        return time.time() - client.last_write < self.sticky_seconds
+
+    def _pick(self, primary, replicas):
+        if not replicas or self.sticky:
+            return primary
+        return replicas[next(self._counter) % len(replicas)]
+
+    def read_bind(self) -> Engine:
+        return self._pick(self.primary, self.replicas)
+
+    def async_read_bind(self) -> AsyncEngine:
+        return self._pick(self.async_primary, self.async_replicas)
+
+
+db_router = DBRouter(engine, replica_engines, async_engine, async_replica_engines)
+
+# 主库会话提交即标记写入；只读会话使用单独的工厂，按 db_router 选择的引擎绑定
+event.listen(SessionLocal, "after_commit", lambda session: db_router.mark_write())
+ReadSessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    binds={model: history_engine for model in HISTORY_MODELS},
+)
+
+
+def get_read_session() -> Session:
+    """创建只读会话（副本或写后窗口内的主库）"""
+    return ReadSessionLocal(bind=db_router.read_bind())
+
 
 def get_db() -> Generator[Session, None, None]:
     """FastAPI依赖函数，用于获取数据库会话"""
@@ -66,6 +241,26 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+def get_read_db() -> Generator[Session, None, None]:
+    """FastAPI依赖函数，用于获取只读数据库会话"""
+    db = get_read_session()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """FastAPI依赖函数，用于获取异步数据库会话（只读接口使用，按 db_router 选择副本）"""
+    async with AsyncSessionLocal(bind=db_router.async_read_bind()) as db:
+        try:
+            yield db
+        except Exception as e:
+            logger.error(f"数据库会话异常: {e}")
+            await db.rollback()
+            raise
+
+
 @contextmanager
 def get_db_context() -> Generator[Session, None, None]:
     """上下文管理器，用于在非API环境中获取数据库会话"""
@@ -9,13 +9,24 @@ from starlette.exceptions import HTTPException as StarletteHTTPException
 
 from app.api import jobs
 from app.config import Config
+from app.core.db_writer import db_write_queue, history_write_queue
+from app.core.failure_journal import failure_journal
+from app.core.job_archive import job_archiver
+from app.core.job_counters import job_state_counters
 from app.core.job_logger import close_all_job_loggers
+from app.core.job_purger import job_purger
+from app.core.job_stats import job_stats
+from app.core.log_retention import log_retention
+from app.core.metrics_store import metrics_store
+from app.core.migrate import ensure_history_tables, upgrade_database
 from app.core.scheduler import start_scheduler
 from app.deps import engine
 from app.function.registry import hot_reload
 from app.middlewares.ip_control import IPControlMiddleware
+from app.middlewares.query_stats import QueryStatsMiddleware
+from app.middlewares.read_your_writes import ReadYourWritesMiddleware
 from app.middlewares.validation import register_validation_handlers
-from app.models.base import Base, error_response
+from app.models.base import error_response
 
 
 @asynccontextmanager
@@ -26,8 +37,11 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
             os.makedirs(directory, exist_ok=True)
             print(f"已创建目录: {directory}")
     
-    # 启动时执行
-    Base.metadata.create_all(bind=engine)
+    # 启动时执行：按迁移升级表结构（已是最新版本时只做一次版本查询）
+    if Config.DATABASE_AUTO_MIGRATE:
+        upgrade_database(engine)
+    # 单独的历史库不由 Alembic 管理，无论是否自动迁移都补建缺少的表
+    ensure_history_tables()
 
     # 加载用户函数
     user_funcs_dir = os.path.join(os.path.dirname(__file__), "function", "user_funcs")
@@ -37,11 +51,39 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     # 启动调度器
     start_scheduler()
 
+    # 启动日志保留策略
+    if Config.JOB_LOG_RETENTION_ENABLED:
+        log_retention.start()
+
+    # 恢复执行统计快照并定期保存
+    job_stats.start()
+
+    # 继续清理上次未完成的已删除任务日志目录
+    job_purger.resume()
+
+    # 启动休眠任务归档
+    if Config.JOB_ARCHIVE_ENABLED:
+        job_archiver.start()
+
+    # 后台定期校准任务状态计数
+    job_state_counters.start()
+
     yield
     # 关闭时执行
+    job_stats.stop()
+    log_retention.stop()
+    if Config.JOB_ARCHIVE_ENABLED:
+        job_archiver.stop()
+    job_state_counters.stop()
+    job_purger.stop()
+    metrics_store.close()
+    failure_journal.close()
     # 关闭所有任务日志文件句柄
     close_all_job_loggers()
     print("已关闭所有任务日志文件句柄")
+    # 日志缓冲写完后再停止写入队列
+    db_write_queue.close()
+    history_write_queue.close()
 
 
 app = FastAPI(
@@ -57,6 +99,12 @@ register_validation_handlers(app)
 # 集成IP控制中间件
 app.add_middleware(IPControlMiddleware)
 
+# SQL查询统计（X-Query-* 响应头）
+app.add_middleware(QueryStatsMiddleware)
+
+# 配置只读副本时按客户端的写后读主库（Cookie / X-Last-Write 携带最后写入时间）
+app.add_middleware(ReadYourWritesMiddleware)
+
 # 路由注册
 app.include_router(jobs.router)
 
@@ -0,0 +1,40 @@
+from typing import Any, AsyncIterator, Callable
+
+from fastapi import Request
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.config import Config
+from app.core.query_stats import QueryStats, query_metrics, track_queries
+
+
+class QueryStatsMiddleware(BaseHTTPMiddleware):
+    """统计每个请求的SQL查询，写入 X-Query-* 响应头并按接口路由汇总
+
+    响应头在正文开始发送前写入：普通响应此时已生成完毕，统计完整；流式响应
+    （StreamingResponse，如导出、日志下载）的正文在发送过程中才生成，其中的查询无法
+    计入响应头，只计入正文发送完后的接口汇总（/jobs/queryStats）。
+    """
+
+    async def dispatch(self, request: Request, call_next: Callable) -> Any:
+        if not Config.QUERY_STATS_ENABLED:
+            return await call_next(request)
+        with track_queries() as stats:
+            response = await call_next(request)
+        response.headers.update(stats.headers())
+        route = request.scope.get("route")
+        path = getattr(route, "path", None) or request.url.path
+        response.body_iterator = _record_after_body(
+            response.body_iterator, f"{request.method} {path}", stats
+        )
+        return response
+
+
+async def _record_after_body(
+    body_iterator: AsyncIterator[bytes], key: str, stats: QueryStats
+) -> AsyncIterator[bytes]:
+    """正文发送完（或中断）后再汇总，包含生成正文时执行的查询"""
+    try:
+        async for chunk in body_iterator:
+            yield chunk
+    finally:
+        query_metrics.record(key, stats)
@@ -0,0 +1,42 @@
+import math
+from typing import Any, Callable, Optional
+
+from fastapi import Request
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.deps import db_router
+
+# 客户端最后写入时间（Unix秒）：浏览器通过 Cookie 回传，其他客户端可使用同名请求头
+LAST_WRITE_COOKIE = "pyjobs_last_write"
+LAST_WRITE_HEADER = "X-Last-Write"
+
+
+def _parse_last_write(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+class ReadYourWritesMiddleware(BaseHTTPMiddleware):
+    """按客户端的写后读主库窗口：读取请求携带的最后写入时间，本请求写入主库后在响应中更新"""
+
+    async def dispatch(self, request: Request, call_next: Callable) -> Any:
+        if not db_router.replicas and not db_router.async_replicas:
+            return await call_next(request)
+        last_write = _parse_last_write(
+            request.headers.get(LAST_WRITE_HEADER) or request.cookies.get(LAST_WRITE_COOKIE)
+        )
+        with db_router.client_scope(last_write) as client:
+            response = await call_next(request)
+        if client.wrote and client.last_write is not None:
+            value = f"{client.last_write:.3f}"
+            response.headers[LAST_WRITE_HEADER] = value
+            response.set_cookie(
+                LAST_WRITE_COOKIE,
+                value,
+                max_age=max(1, math.ceil(db_router.sticky_seconds)),
+                httponly=True,
+                samesite="lax",
+            )
+        return response
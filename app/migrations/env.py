@@ -0,0 +1,53 @@
+"""
+Alembic 迁移环境
+
+启动时由 app.core.migrate.upgrade_database 传入已打开的连接（config.attributes["connection"]）；
+命令行执行 ``alembic upgrade head`` / ``alembic revision --autogenerate -m ...`` 时按 Config 连接数据库。
+"""
+
+from alembic import context
+from sqlalchemy import create_engine
+
+from app.config import Config
+from app.core.migrate import VERSION_TABLE
+from app.models import Base
+
+config = context.config
+target_metadata = Base.metadata
+
+
+def _configure(**kwargs) -> None:
+    context.configure(
+        target_metadata=target_metadata,
+        version_table=VERSION_TABLE,
+        # SQLite 不支持大部分 ALTER TABLE，自动生成的迁移使用批量模式（重建表）
+        render_as_batch=True,
+        compare_type=True,
+        **kwargs,
+    )
+
+
+def run_migrations_offline() -> None:
+    _configure(url=Config.get_database_url(), literal_binds=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _configure(connection=connection)
+        context.run_migrations()
+        return
+
+    engine = create_engine(Config.get_database_url())
+    with engine.begin() as connection:
+        _configure(connection=connection)
+        context.run_migrations()
+    engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,101 @@
+"""基线：管理员、任务和执行日志表（引入迁移前的表结构）
+
+Revision ID: 0001
+Revises:
+Create Date: 2025-01-01 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.models.base import get_table_name
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        get_table_name("admins"),
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("username", sa.String(50), nullable=False, unique=True, comment="用户名"),
+        sa.Column("password", sa.String(100), nullable=False, comment="密码"),
+        sa.Column("email", sa.String(100), nullable=True, comment="邮箱"),
+        sa.Column("role", sa.String(20), nullable=False, comment="角色"),
+        sa.Column("status", sa.Integer(), nullable=False, comment="状态"),
+        sa.Column("is_active", sa.Boolean(), nullable=False, comment="是否激活"),
+        sa.Column("last_login", sa.DateTime(), nullable=True, comment="最后登录时间"),
+        sa.Column("created_at", sa.DateTime(), nullable=False, comment="创建时间"),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, comment="更新时间"),
+    )
+    op.create_table(
+        get_table_name("jobs"),
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("name", sa.String(100), nullable=False, comment="任务名称"),
+        sa.Column("desc", sa.Text(), nullable=True, comment="任务描述"),
+        sa.Column("cron_expr", sa.String(100), nullable=False, comment="cron表达式"),
+        sa.Column("mode", sa.String(20), nullable=False, comment="执行模式"),
+        sa.Column("command", sa.Text(), nullable=False, comment="执行命令或URL"),
+        sa.Column("state", sa.Integer(), nullable=False, comment="任务状态"),
+        sa.Column("allow_mode", sa.Integer(), nullable=False, comment="执行模式"),
+        sa.Column("max_run_count", sa.Integer(), nullable=False, comment="最大执行次数"),
+        sa.Column("run_count", sa.Integer(), nullable=False, comment="已执行次数"),
+        sa.Column("created_at", sa.DateTime(), nullable=False, comment="创建时间"),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, comment="更新时间"),
+        sa.Column(
+            "trigger_type",
+            sa.String(20),
+            nullable=False,
+            comment="触发器类型：cron/interval，interval为秒级调度",
+        ),
+        sa.Column(
+            "interval_seconds",
+            sa.Integer(),
+            nullable=False,
+            comment="interval模式下的间隔秒数，单位秒",
+        ),
+    )
+    op.create_table(
+        get_table_name("job_exec_logs"),
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("time", sa.String(50), nullable=False, comment="开始时间"),
+        sa.Column("end_time", sa.String(50), nullable=False, comment="结束时间"),
+        sa.Column(
+            "job_id",
+            sa.Integer(),
+            sa.ForeignKey(f"{get_table_name('jobs')}.id", ondelete="CASCADE"),
+            nullable=False,
+            comment="任务ID",
+        ),
+        sa.Column("job_name", sa.String(100), nullable=False, comment="任务名称"),
+        sa.Column("status", sa.String(20), nullable=False, comment="执行状态"),
+        sa.Column("duration_ms", sa.Integer(), nullable=False, comment="执行时长(毫秒)"),
+        sa.Column("mode", sa.String(20), nullable=False, comment="执行模式"),
+        sa.Column("command", sa.Text(), nullable=False, comment="执行命令"),
+        sa.Column("exit_code", sa.Integer(), nullable=True, comment="退出码"),
+        sa.Column("stdout", sa.Text(), nullable=True, comment="标准输出"),
+        sa.Column("stderr", sa.Text(), nullable=True, comment="错误输出"),
+        sa.Column("http_url", sa.String(500), nullable=True, comment="HTTP URL"),
+        sa.Column("http_method", sa.String(10), nullable=True, comment="HTTP方法"),
+        sa.Column("http_status", sa.Integer(), nullable=True, comment="HTTP状态码"),
+        sa.Column("http_resp", sa.Text(), nullable=True, comment="HTTP响应内容"),
+        sa.Column("func_name", sa.String(100), nullable=True, comment="函数名称"),
+        sa.Column("func_args", sa.Text(), nullable=True, comment="函数参数"),
+        sa.Column("func_result", sa.Text(), nullable=True, comment="函数执行结果"),
+        sa.Column("error_msg", sa.Text(), nullable=True, comment="错误信息"),
+        sa.Column("created_at", sa.DateTime(), nullable=False, comment="创建时间"),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, comment="更新时间"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table(get_table_name("job_exec_logs"))
+    op.drop_table(get_table_name("jobs"))
+    op.drop_table(get_table_name("admins"))
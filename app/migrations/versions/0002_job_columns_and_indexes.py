@@ -0,0 +1,77 @@
+"""任务日志策略、标签字段和热点查询索引
+
+- jobs.log_policy、jobs.tags
+- jobs: state / mode / trigger_type / name / (updated_at, id) 索引
+- job_exec_logs: (job_id, created_at) / status 索引
+
+旧版本用 create_all 建表时可能已有部分字段或索引，已存在的跳过。
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2025-01-01 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.models.base import get_table_name
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+JOBS = get_table_name("jobs")
+EXEC_LOGS = get_table_name("job_exec_logs")
+
+COLUMNS = [
+    (
+        JOBS,
+        sa.Column(
+            "log_policy",
+            sa.String(50),
+            nullable=False,
+            server_default="always",
+            comment="日志策略：always/sample:N/aggregate:秒",
+        ),
+    ),
+    (
+        JOBS,
+        sa.Column(
+            "tags", sa.String(255), nullable=False, server_default="", comment="任务标签，逗号分隔"
+        ),
+    ),
+]
+
+INDEXES = [
+    (JOBS, f"ix_{JOBS}_state", ["state"]),
+    (JOBS, f"ix_{JOBS}_mode", ["mode"]),
+    (JOBS, f"ix_{JOBS}_trigger_type", ["trigger_type"]),
+    (JOBS, f"ix_{JOBS}_name", ["name"]),
+    (JOBS, f"ix_{JOBS}_updated_at_id", ["updated_at", "id"]),
+    (EXEC_LOGS, f"ix_{EXEC_LOGS}_job_id_created_at", ["job_id", "created_at"]),
+    (EXEC_LOGS, f"ix_{EXEC_LOGS}_status", ["status"]),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    for table, column in COLUMNS:
+        if column.name not in {c["name"] for c in inspector.get_columns(table)}:
+            op.add_column(table, column)
+    for table, name, columns in INDEXES:
+        if name not in {i["name"] for i in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, name, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
+    for table, column in reversed(COLUMNS):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column(column.name)
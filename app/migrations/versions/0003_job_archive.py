@@ -0,0 +1,71 @@
+"""任务归档表
+
+长期停止或已达最大执行次数的任务由后台归档到 job_archive，可搜索、恢复。
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2025-01-01 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.models.base import get_table_name
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, Sequence[str], None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ARCHIVE = get_table_name("job_archive")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        ARCHIVE,
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("job_id", sa.Integer(), nullable=False, comment="归档前的任务ID"),
+        sa.Column("archived_at", sa.DateTime(), nullable=False, comment="归档时间"),
+        sa.Column("name", sa.String(100), nullable=False, comment="任务名称"),
+        sa.Column("desc", sa.Text(), nullable=True, comment="任务描述"),
+        sa.Column("cron_expr", sa.String(100), nullable=False, comment="cron表达式"),
+        sa.Column("mode", sa.String(20), nullable=False, comment="执行模式"),
+        sa.Column("command", sa.Text(), nullable=False, comment="执行命令或URL"),
+        sa.Column("state", sa.Integer(), nullable=False, comment="任务状态"),
+        sa.Column("allow_mode", sa.Integer(), nullable=False, comment="执行模式"),
+        sa.Column("max_run_count", sa.Integer(), nullable=False, comment="最大执行次数"),
+        sa.Column("run_count", sa.Integer(), nullable=False, comment="已执行次数"),
+        sa.Column("created_at", sa.DateTime(), nullable=False, comment="创建时间"),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, comment="更新时间"),
+        sa.Column(
+            "trigger_type",
+            sa.String(20),
+            nullable=False,
+            comment="触发器类型：cron/interval，interval为秒级调度",
+        ),
+        sa.Column(
+            "interval_seconds",
+            sa.Integer(),
+            nullable=False,
+            comment="interval模式下的间隔秒数，单位秒",
+        ),
+        sa.Column(
+            "log_policy", sa.String(50), nullable=False, comment="日志策略：always/sample:N/aggregate:秒"
+        ),
+        sa.Column("tags", sa.String(255), nullable=False, comment="任务标签，逗号分隔"),
+    )
+    op.create_index(f"ix_{ARCHIVE}_job_id", ARCHIVE, ["job_id"])
+    op.create_index(f"ix_{ARCHIVE}_name", ARCHIVE, ["name"])
+    op.create_index(f"ix_{ARCHIVE}_archived_at", ARCHIVE, ["archived_at"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(f"ix_{ARCHIVE}_archived_at", table_name=ARCHIVE)
+    op.drop_index(f"ix_{ARCHIVE}_name", table_name=ARCHIVE)
+    op.drop_index(f"ix_{ARCHIVE}_job_id", table_name=ARCHIVE)
+    op.drop_table(ARCHIVE)
@@ -3,11 +3,13 @@
 from app.models.admin import Admin
 from app.models.base import Base
 from app.models.job import Job
+from app.models.job_archive import JobArchive
 from app.models.log import JobExecLog
 
 __all__ = [
     "Admin",
     "Base",
     "Job",
+    "JobArchive",
     "JobExecLog",
 ]
@@ -0,0 +1,27 @@
+"""
+任务字段解析
+
+模型校验（schemas）和核心服务（日志策略、失败记录）共用的纯解析函数，不依赖任何服务状态。
+"""
+
+from typing import List, Optional, Tuple
+
+POLICY_ALWAYS = "always"
+POLICY_SAMPLE = "sample"
+POLICY_AGGREGATE = "aggregate"
+
+
+def parse_log_policy(policy: Optional[str]) -> Tuple[str, int]:
+    """解析日志策略，返回(模式, 参数)，格式错误抛出 ValueError"""
+    text = (policy or POLICY_ALWAYS).strip().lower()
+    if text == POLICY_ALWAYS:
+        return POLICY_ALWAYS, 0
+    mode, _, value = text.partition(":")
+    if mode not in (POLICY_SAMPLE, POLICY_AGGREGATE) or not value.isdigit() or int(value) < 1:
+        raise ValueError("日志策略格式错误，支持：always、sample:N（N>=1）、aggregate:秒（>=1）")
+    return mode, int(value)
+
+
+def parse_tags(tags: Optional[str]) -> List[str]:
+    """解析逗号分隔的任务标签"""
+    return [tag.strip() for tag in (tags or "").split(",") if tag.strip()]
@@ -1,7 +1,7 @@
 import datetime
 from typing import TYPE_CHECKING, Optional
 
-from sqlalchemy import DateTime, Integer, String, Text
+from sqlalchemy import DateTime, Index, Integer, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models.base import Base, get_table_name
@@ -12,6 +12,14 @@ if TYPE_CHECKING:
 
 class Job(Base):
     __tablename__ = get_table_name("jobs")
+    # 列表过滤/排序索引；二级索引隐含主键，过滤后按 id 排序和键集翻页可直接走索引
+    __table_args__ = (
+        Index(f"ix_{get_table_name('jobs')}_state", "state"),
+        Index(f"ix_{get_table_name('jobs')}_mode", "mode"),
+        Index(f"ix_{get_table_name('jobs')}_trigger_type", "trigger_type"),
+        Index(f"ix_{get_table_name('jobs')}_name", "name"),
+        Index(f"ix_{get_table_name('jobs')}_updated_at_id", "updated_at", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     name: Mapped[str] = mapped_column(String(100), nullable=False, comment="任务名称")
@@ -44,8 +52,17 @@ class Job(Base):
     interval_seconds: Mapped[int] = mapped_column(
         Integer, default=0, comment="interval模式下的间隔秒数，单位秒"
     )
+    log_policy: Mapped[str] = mapped_column(
+        String(50),
+        default="always",
+        server_default="always",
+        comment="日志策略：always/sample:N/aggregate:秒",
+    )
+    tags: Mapped[str] = mapped_column(
+        String(255), default="", server_default="", comment="任务标签，逗号分隔"
+    )
 
-    # 关系
+    # 关系（删除任务时由外键 ON DELETE CASCADE 删除执行日志，ORM 不加载关联行）
     logs: Mapped[list["JobExecLog"]] = relationship(
-        "JobExecLog", back_populates="job", cascade="all, delete-orphan"
+        "JobExecLog", back_populates="job", cascade="all, delete-orphan", passive_deletes=True
     )
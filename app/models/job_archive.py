@@ -0,0 +1,45 @@
+import datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, Index, Integer, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base, get_table_name
+
+
+class JobArchive(Base):
+    """归档任务：长期停止或已达最大执行次数的任务从 jobs 表移到这里（字段同 Job）"""
+
+    __tablename__ = get_table_name("job_archive")
+    __table_args__ = (
+        Index(f"ix_{get_table_name('job_archive')}_job_id", "job_id"),
+        Index(f"ix_{get_table_name('job_archive')}_name", "name"),
+        Index(f"ix_{get_table_name('job_archive')}_archived_at", "archived_at"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    job_id: Mapped[int] = mapped_column(Integer, nullable=False, comment="归档前的任务ID")
+    archived_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime, default=datetime.datetime.utcnow, comment="归档时间"
+    )
+    name: Mapped[str] = mapped_column(String(100), nullable=False, comment="任务名称")
+    desc: Mapped[Optional[str]] = mapped_column(Text, comment="任务描述")
+    cron_expr: Mapped[str] = mapped_column(String(100), nullable=False, comment="cron表达式")
+    mode: Mapped[str] = mapped_column(String(20), nullable=False, comment="执行模式")
+    command: Mapped[str] = mapped_column(Text, nullable=False, comment="执行命令或URL")
+    state: Mapped[int] = mapped_column(Integer, comment="任务状态")
+    allow_mode: Mapped[int] = mapped_column(Integer, comment="执行模式")
+    max_run_count: Mapped[int] = mapped_column(Integer, comment="最大执行次数")
+    run_count: Mapped[int] = mapped_column(Integer, comment="已执行次数")
+    created_at: Mapped[datetime.datetime] = mapped_column(DateTime, comment="创建时间")
+    updated_at: Mapped[datetime.datetime] = mapped_column(DateTime, comment="更新时间")
+    trigger_type: Mapped[str] = mapped_column(
+        String(20), comment="触发器类型：cron/interval，interval为秒级调度"
+    )
+    interval_seconds: Mapped[int] = mapped_column(
+        Integer, comment="interval模式下的间隔秒数，单位秒"
+    )
+    log_policy: Mapped[str] = mapped_column(
+        String(50), comment="日志策略：always/sample:N/aggregate:秒"
+    )
+    tags: Mapped[str] = mapped_column(String(255), comment="任务标签，逗号分隔")
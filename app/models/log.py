@@ -1,7 +1,7 @@
 import datetime
 from typing import TYPE_CHECKING, Optional
 
-from sqlalchemy import DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models.base import Base, get_table_name
@@ -14,6 +14,10 @@ class JobExecLog(Base):
     """任务执行日志模型"""
 
     __tablename__ = get_table_name("job_exec_logs")
+    __table_args__ = (
+        Index(f"ix_{get_table_name('job_exec_logs')}_job_id_created_at", "job_id", "created_at"),
+        Index(f"ix_{get_table_name('job_exec_logs')}_status", "status"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
 
@@ -9,6 +9,8 @@ from typing import Any, Dict, List, Literal, Optional
 
 from pydantic import BaseModel, ConfigDict, Field, field_validator
 
+from app.models.fields import parse_log_policy, parse_tags
+
 
 class JobBase(BaseModel):
     """任务基础模型"""
@@ -93,6 +95,10 @@ class JobCreate(BaseModel):
     allow_mode: int = Field(0, description="并发模式")
     max_run_count: int = Field(0, description="最大执行次数，0为无限制")
     state: int = Field(1, description="任务状态 1=运行 0=等待 2=停止")
+    log_policy: str = Field(
+        "always", description="日志策略：always=全部记录，sample:N=失败+每N次成功记录1次，aggregate:秒=按窗口汇总"
+    )
+    tags: str = Field("", max_length=255, description="任务标签，逗号分隔，如 订单,核心")
 
     @field_validator("cron_expr")
     @classmethod
@@ -125,6 +131,17 @@ class JobCreate(BaseModel):
             raise ValueError("command不能为空")
         return v
 
+    @field_validator("log_policy")
+    @classmethod
+    def validate_log_policy(cls, v: str) -> str:
+        mode, value = parse_log_policy(v)
+        return f"{mode}:{value}" if value else mode
+
+    @field_validator("tags")
+    @classmethod
+    def validate_tags(cls, v: str) -> str:
+        return ",".join(dict.fromkeys(parse_tags(v)))
+
 
 class JobUpdate(BaseModel):
     name: Optional[str] = Field(None, min_length=1, description="任务名称")
@@ -139,6 +156,8 @@ class JobUpdate(BaseModel):
     allow_mode: Optional[int] = Field(None, description="并发模式")
     max_run_count: Optional[int] = Field(None, description="最大执行次数")
     state: Optional[int] = Field(None, description="任务状态")
+    log_policy: Optional[str] = Field(None, description="日志策略：always/sample:N/aggregate:秒")
+    tags: Optional[str] = Field(None, max_length=255, description="任务标签，逗号分隔")
 
     @field_validator("cron_expr")
     @classmethod
@@ -170,12 +189,29 @@ class JobUpdate(BaseModel):
             raise ValueError("command不能为空")
         return v
 
+    @field_validator("log_policy")
+    @classmethod
+    def validate_log_policy(cls, v: Optional[str]) -> Optional[str]:
+        if v is not None:
+            mode, value = parse_log_policy(v)
+            return f"{mode}:{value}" if value else mode
+        return v
+
+    @field_validator("tags")
+    @classmethod
+    def validate_tags(cls, v: Optional[str]) -> Optional[str]:
+        if v is not None:
+            return ",".join(dict.fromkeys(parse_tags(v)))
+        return v
+
 
 class JobResponse(JobBase):
     """任务响应模型"""
 
     id: int = Field(..., description="任务ID")
     run_count: int = Field(..., description="已执行次数")
+    log_policy: Optional[str] = Field("always", description="日志策略")
+    tags: Optional[str] = Field("", description="任务标签，逗号分隔")
     created_at: Optional[datetime] = Field(None, description="创建时间")
     updated_at: Optional[datetime] = Field(None, description="更新时间")
 
@@ -73,14 +73,17 @@ class PyJobsCLI:
   python cli.py stop -f            # 停止守护进程
   python cli.py status             # 查看运行状态
   python cli.py daemon             # 进入守护模式
+  python cli.py export jobs.ndjson # 导出全部任务（NDJSON）
+  python cli.py import jobs.ndjson # 导入任务（按ID更新或插入，- 表示标准输入）
             """,
         )
 
         parser.add_argument(
             "command",
-            choices=["start", "stop", "status", "daemon", "restart", "reload"],
+            choices=["start", "stop", "status", "daemon", "restart", "reload", "export", "import"],
             help="执行命令",
         )
+        parser.add_argument("file", nargs="?", default="jobs.ndjson", help="export/import 的文件路径 (默认: jobs.ndjson)")
         parser.add_argument("-d", "--daemon", action="store_true", help="后台模式运行")
         parser.add_argument("-f", "--foreground", action="store_true", help="守护进程模式运行")
         parser.add_argument(
@@ -90,6 +93,7 @@ class PyJobsCLI:
             "-H", "--host", default=Config.SERVER_HOST, help=f"服务地址 (默认: {Config.SERVER_HOST})"
         )
         parser.add_argument("--reload", action="store_true", help="开发模式热重载")
+        parser.add_argument("--batch", type=int, default=1000, help="import 每批提交的条数 (默认: 1000)")
 
         args = parser.parse_args()
 
@@ -106,6 +110,10 @@ class PyJobsCLI:
                 self.handle_restart(args)
             elif args.command == "reload":
                 self.handle_reload()
+            elif args.command == "export":
+                self.handle_export(args)
+            elif args.command == "import":
+                self.handle_import(args)
         except KeyboardInterrupt:
             print("\n操作被用户中断")
             sys.exit(1)
@@ -179,6 +187,37 @@ class PyJobsCLI:
         else:
             print("未找到运行中的进程")
 
+    def handle_export(self, args):
+        """导出全部任务为NDJSON"""
+        from app.core.job_transfer import iter_job_records
+        from app.core.log_export import iter_ndjson
+        from app.deps import get_db_context
+
+        with get_db_context() as db:
+            count = 0
+            with open(args.file, "wb") as f:
+                for chunk in iter_ndjson(iter_job_records(db)):
+                    f.write(chunk)
+                    count += chunk.count(b"\n")
+            print(f"已导出 {count} 个任务到 {args.file}")
+
+    def handle_import(self, args):
+        """从NDJSON导入任务（离线导入，服务启动时加载调度）"""
+        from app.core.job_transfer import import_lines
+        from app.core.migrate import upgrade_database
+        from app.deps import get_db_context
+
+        upgrade_database()
+        with get_db_context() as db:
+            if args.file == "-":
+                result = import_lines(db, sys.stdin.buffer, args.batch, schedule=False)
+            else:
+                with open(args.file, "rb") as f:
+                    result = import_lines(db, f, args.batch, schedule=False)
+        print(f"导入完成: 新增 {result['inserted']}，更新 {result['updated']}，失败 {result['failed']}")
+        for error in result["errors"]:
+            print(f"  第 {error['line']} 行: {error['msg']}")
+
     def start_foreground_mode(self, args):
         """前台模式启动"""
         try:
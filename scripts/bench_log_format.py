@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日志格式基准测试
+对比 JSON 行日志与二进制日志段的写入吞吐和单条记录字节数
+
+用法:
+    python scripts/bench_log_format.py [-n 条数]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.config import Config  # noqa: E402
+from app.core.job_logger import JobLogger, read_job_log_records  # noqa: E402
+from app.core.log_segment import close_all_segment_writers  # noqa: E402
+
+
+def sample_log(i: int) -> dict:
+    """构造一条接近真实HTTP健康检查任务的执行记录"""
+    return {
+        "job_id": 1,
+        "job_name": "健康检查-订单服务",
+        "status": "成功" if i % 50 else "失败",
+        "duration_ms": 20 + i % 180,
+        "mode": "http",
+        "command": "【url】https://order.example.com/health\n【method】GET\n【timeout】10",
+        "result": f"请求方式: GET\n请求http状态: 200\n返回内容: ok #{i % 7}\n请求结果: 成功",
+        "error_msg": None,
+    }
+
+
+def run(fmt: str, count: int) -> dict:
+    """在临时目录中写入count条记录，返回吞吐与体积统计"""
+    with tempfile.TemporaryDirectory() as workdir:
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        setattr(Config, "JOB_LOG_FORMAT", fmt)
+        try:
+            job_logger = JobLogger(job_id=1, job_name="健康检查-订单服务")
+            records = [sample_log(i) for i in range(count)]
+            start = time.perf_counter()
+            for record in records:
+                job_logger.write_text_log(record)
+            elapsed = time.perf_counter() - start
+            job_logger.close_all_handles()
+            close_all_segment_writers()
+
+            total_bytes = sum(
+                f.stat().st_size for f in Path("runtime", "jobs").rglob("*") if f.is_file()
+            )
+            read_start = time.perf_counter()
+            read_count = len(read_job_log_records(1, time.strftime("%Y-%m-%d")))
+            read_elapsed = time.perf_counter() - read_start
+        finally:
+            os.chdir(cwd)
+
+    return {
+        "format": fmt,
+        "records": count,
+        "write_per_sec": count / elapsed if elapsed else 0.0,
+        "bytes_per_record": total_bytes / count,
+        "read_count": read_count,
+        "read_per_sec": read_count / read_elapsed if read_elapsed else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="日志格式基准测试")
+    parser.add_argument("-n", "--count", type=int, default=20000, help="写入条数")
+    args = parser.parse_args()
+
+    print(f"{'格式':<8}{'写入条/秒':>14}{'字节/条':>12}{'读取条/秒':>14}")
+    for fmt in ("json", "binary"):
+        result = run(fmt, args.count)
+        print(
+            f"{result['format']:<8}{result['write_per_sec']:>14.0f}"
+            f"{result['bytes_per_record']:>12.1f}{result['read_per_sec']:>14.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
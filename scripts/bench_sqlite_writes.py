@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SQLite 并发写入基准测试
+多个线程同时给任务执行次数加一，对比默认配置（回滚日志、各线程直接提交）与
+生产配置（WAL + synchronous=NORMAL + busy_timeout、单写连接队列）的吞吐和失败数
+
+用法:
+    python scripts/bench_sqlite_writes.py [-t 线程数] [-n 每线程写入次数]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, event, update  # noqa: E402
+
+from app.core.db_writer import DBWriteQueue  # noqa: E402
+from app.models.base import Base  # noqa: E402
+from app.models.job import Job  # noqa: E402
+
+PROFILES = {
+    # 名称: (PRAGMA 列表, 是否使用写入队列)
+    "default": (["PRAGMA journal_mode=DELETE", "PRAGMA synchronous=FULL"], False),
+    "wal": (
+        [
+            "PRAGMA journal_mode=WAL",
+            "PRAGMA synchronous=NORMAL",
+            "PRAGMA busy_timeout=5000",
+        ],
+        False,
+    ),
+    "wal+queue": (
+        [
+            "PRAGMA journal_mode=WAL",
+            "PRAGMA synchronous=NORMAL",
+            "PRAGMA busy_timeout=5000",
+        ],
+        True,
+    ),
+}
+
+
+def run(profile: str, threads: int, count: int) -> dict:
+    """在临时数据库中并发执行 threads * count 次自增，返回吞吐与失败数"""
+    pragmas, use_queue = PROFILES[profile]
+    with tempfile.TemporaryDirectory() as workdir:
+        url = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+        engine = create_engine(
+            url, pool_size=threads, max_overflow=0, connect_args={"check_same_thread": False}
+        )
+        writer = create_engine(
+            url, pool_size=1, max_overflow=0, connect_args={"check_same_thread": False}
+        )
+
+        def set_pragma(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for pragma in pragmas:
+                cursor.execute(pragma)
+            cursor.close()
+
+        event.listen(engine, "connect", set_pragma)
+        event.listen(writer, "connect", set_pragma)
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            conn.execute(
+                Job.__table__.insert(),
+                [{"id": 1, "name": "bench", "cron_expr": "* * * * *", "command": ""}],
+            )
+
+        write_queue = DBWriteQueue(writer, enabled=use_queue)
+        stmt = update(Job).where(Job.id == 1).values(run_count=Job.run_count + 1)
+        errors = []
+
+        def worker() -> None:
+            for _ in range(count):
+                try:
+                    if use_queue:
+                        write_queue.execute(lambda conn: conn.execute(stmt))
+                    else:
+                        with engine.begin() as conn:
+                            conn.execute(stmt)
+                except Exception as e:
+                    errors.append(e)
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        start = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        write_queue.close()
+
+        with engine.connect() as conn:
+            run_count = conn.execute(Job.__table__.select()).mappings().one()["run_count"]
+        engine.dispose()
+        writer.dispose()
+
+    total = threads * count
+    return {
+        "profile": profile,
+        "writes_per_sec": (total - len(errors)) / elapsed if elapsed else 0.0,
+        "errors": len(errors),
+        "run_count": run_count,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="SQLite 并发写入基准测试")
+    parser.add_argument("-t", "--threads", type=int, default=8, help="并发线程数")
+    parser.add_argument("-n", "--count", type=int, default=200, help="每线程写入次数")
+    args = parser.parse_args()
+
+    print(f"{'配置':<12}{'写入次/秒':>12}{'失败':>8}{'执行次数':>10}")
+    for profile in PROFILES:
+        result = run(profile, args.threads, args.count)
+        print(
+            f"{result['profile']:<12}{result['writes_per_sec']:>12.0f}"
+            f"{result['errors']:>8}{result['run_count']:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+任务日志迁移脚本
+将 runtime/jobs/任务id/年月/日.log（及二进制 .seg 段）迁移到共享日志段存储
+runtime/logstore/，迁移成功的源文件会被删除；输出已还原到共享存储后，日志全部迁移完的
+月目录中的输出包（objects.pack / objects.idx）随之删除，空目录一并清理。
+
+用法:
+    python scripts/migrate_job_logs.py            # 执行迁移
+    python scripts/migrate_job_logs.py --dry-run  # 只统计不写入
+    python scripts/migrate_job_logs.py --keep     # 迁移后保留源文件和输出包
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.config import Config  # noqa: E402
+from app.core.log_segment import SEGMENT_SUFFIX, iter_segment_records  # noqa: E402
+from app.core.log_store import shared_log_store  # noqa: E402
+from app.core.output_store import INDEX_NAME, PACK_NAME, output_store  # noqa: E402
+
+JOBS_DIR = Path("runtime") / "jobs"
+
+
+def iter_day_files() -> Iterator[Tuple[str, int, List[Path]]]:
+    """按日期升序遍历 (YYYYMMDD, 任务ID, 当天的日志文件列表)"""
+    if not JOBS_DIR.is_dir():
+        return
+    days: Dict[str, Dict[int, List[Path]]] = {}
+    for job_entry in os.scandir(JOBS_DIR):
+        if not job_entry.is_dir() or not job_entry.name.isdigit():
+            continue
+        for month_entry in os.scandir(job_entry.path):
+            if not month_entry.is_dir() or len(month_entry.name) != 6:
+                continue
+            for file_entry in os.scandir(month_entry.path):
+                name = file_entry.name
+                if not (name.endswith(".log") or name.endswith(SEGMENT_SUFFIX)):
+                    continue
+                day = month_entry.name + name[:2]
+                days.setdefault(day, {}).setdefault(int(job_entry.name), []).append(
+                    Path(file_entry.path)
+                )
+    for day in sorted(days):
+        for job_id in sorted(days[day]):
+            # .log 在前，.seg 按序号排序
+            yield day, job_id, sorted(days[day][job_id], key=lambda p: (p.suffix != ".log", p.name))
+
+
+def read_file(path: Path) -> Iterator[Dict[str, Any]]:
+    """读取单个日志文件的记录"""
+    if path.suffix == SEGMENT_SUFFIX:
+        yield from iter_segment_records(str(path))
+        return
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def remove_job_packs() -> int:
+    """删除日志已全部迁移的月目录中的输出包，返回删除的月数"""
+    removed = 0
+    if not JOBS_DIR.is_dir():
+        return removed
+    for job_entry in os.scandir(JOBS_DIR):
+        if not job_entry.is_dir() or not job_entry.name.isdigit():
+            continue
+        for month_entry in os.scandir(job_entry.path):
+            if not month_entry.is_dir() or len(month_entry.name) != 6:
+                continue
+            names = set(os.listdir(month_entry.path))
+            # 仍有未迁移的日志时保留输出包
+            if any(name.endswith(".log") or name.endswith(SEGMENT_SUFFIX) for name in names):
+                continue
+            packs = [name for name in (PACK_NAME, INDEX_NAME) if name in names]
+            if not packs:
+                continue
+            output_store.forget(int(job_entry.name), month_entry.name)
+            for name in packs:
+                os.remove(os.path.join(month_entry.path, name))
+            removed += 1
+    return removed
+
+
+def remove_empty_dirs() -> None:
+    """清理迁移后留下的空目录"""
+    for root, _, _ in os.walk(JOBS_DIR, topdown=False):
+        if root != str(JOBS_DIR) and not os.listdir(root):
+            try:
+                os.rmdir(root)
+            except OSError:
+                pass
+
+
+def migrate(dry_run: bool = False, keep: bool = False) -> Dict[str, int]:
+    """执行迁移，返回统计信息"""
+    stats = {"files": 0, "records": 0, "packs": 0}
+    for day, job_id, paths in iter_day_files():
+        for path in paths:
+            count = 0
+            for record in read_file(path):
+                record.setdefault("job_id", job_id)
+                if not dry_run:
+                    # 任务目录下的输出包不随迁移保留：先还原输出，再按共享存储重新去重
+                    if record.get("output_ref"):
+                        output_store.rehydrate(record)
+                    if Config.JOB_LOG_OUTPUT_DEDUPE:
+                        record = output_store.dedupe(record, shared=True)
+                    shared_log_store.append(record, day=day)
+                count += 1
+            stats["files"] += 1
+            stats["records"] += count
+            if not dry_run and not keep:
+                path.unlink()
+            print(f"{'[预览] ' if dry_run else ''}{path} -> {day} ({count} 条)")
+
+    shared_log_store.close()
+    if not dry_run and not keep:
+        stats["packs"] = remove_job_packs()
+        remove_empty_dirs()
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="迁移任务日志到共享日志段存储")
+    parser.add_argument("--dry-run", action="store_true", help="只统计不写入")
+    parser.add_argument(
+        "--keep", action="store_true", help="迁移后保留源文件和输出包（重复执行会产生重复记录）"
+    )
+    args = parser.parse_args()
+
+    stats = migrate(dry_run=args.dry_run, keep=args.keep)
+    print(
+        f"迁移完成 - 文件数: {stats['files']}, 记录数: {stats['records']}, "
+        f"删除输出包: {stats['packs']} 个月"
+    )
+    if not args.dry_run:
+        print("请设置环境变量 JOB_LOG_STORAGE=shared 后重启服务")
+
+
+if __name__ == "__main__":
+    main()
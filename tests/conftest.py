@@ -5,14 +5,21 @@
 
 import os
 import tempfile
-from typing import Any, Generator
+from contextlib import contextmanager
+from typing import Any, Callable, ContextManager, Generator
 
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool
 
-from app.deps import get_db
+from app.core.job_counters import job_state_counters
+from app.core.job_query import job_count_cache
+from app.core.job_stats import job_stats
+from app.core.query_stats import QueryStats, track_queries
+from app.deps import get_async_db, get_db, get_read_db
 from app.main import app
 from app.models.admin import Admin
 from app.models.base import Base
@@ -61,7 +68,7 @@ def db_session(engine: Any) -> Generator[Session, None, None]:
 
 
 @pytest.fixture(scope="function")
-def client(db_session: Session) -> Generator[TestClient, None, None]:
+def client(db_session: Session, tmp_path: Any) -> Generator[TestClient, None, None]:
     """创建测试客户端"""
 
     # 覆盖依赖
@@ -71,12 +78,30 @@ def client(db_session: Session) -> Generator[TestClient, None, None]:
         finally:
             pass
 
+    # 异步会话连接同一个测试数据库文件
+    async_engine = create_async_engine(
+        f"sqlite+aiosqlite:///{db_session.get_bind().url.database}", poolclass=NullPool
+    )
+    TestingAsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    async def override_get_async_db() -> Any:
+        async with TestingAsyncSessionLocal() as session:
+            yield session
+
     app.dependency_overrides = {}
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
 
     # 为测试环境禁用IP控制
     os.environ["IP_WHITELIST"] = "127.0.0.1,localhost,testclient"
 
+    # 执行统计快照写入临时目录
+    job_stats.snapshot_path = str(tmp_path / "job_stats.json")
+    # 任务列表总数缓存、状态计数不跨测试
+    job_count_cache.invalidate()
+    job_state_counters.invalidate()
+
     with TestClient(app) as test_client:
         yield test_client
 
@@ -100,6 +125,32 @@ def sample_job(db_session: Session) -> Job:
     return job
 
 
+@pytest.fixture
+def query_budget() -> Callable[[Any, int], None]:
+    """断言接口响应的SQL查询次数不超过预算（读取 X-Query-Count 响应头）"""
+
+    def check(response: Any, budget: int) -> None:
+        count = int(response.headers["X-Query-Count"])
+        path = response.request.url.path
+        assert count <= budget, f"{path} 执行了 {count} 次查询，超出预算 {budget}"
+
+    return check
+
+
+@pytest.fixture
+def max_queries() -> Callable[[int], ContextManager[QueryStats]]:
+    """断言 with 块内的SQL查询次数不超过预算，超出时列出全部语句"""
+
+    @contextmanager
+    def budget(limit: int) -> Generator[QueryStats, None, None]:
+        with track_queries(keep_statements=True) as stats:
+            yield stats
+        statements = "\n".join(stats.statements or [])
+        assert stats.count <= limit, f"执行了 {stats.count} 次查询，超出预算 {limit}:\n{statements}"
+
+    return budget
+
+
 @pytest.fixture
 def sample_admin(db_session: Session) -> Admin:
     """创建示例管理员"""
@@ -222,6 +222,33 @@ class ReadOnlyUser(HttpUser):
         self.client.post("/jobs/logs?id=1")
 
 
+class DashboardUser(HttpUser):
+    """看板轮询用户：高频读取 list/read/jobState/jobStatus/logs（异步接口，不占用线程池）
+
+    与 HeavyLoadUser 同时运行，对比写入变慢时读接口的响应时间：
+        locust -f tests/locustfile.py DashboardUser HeavyLoadUser --headless -u 200 -r 50 -t 60s
+    """
+
+    wait_time = between(0.05, 0.2)
+
+    @task(4)
+    def poll_status(self) -> None:
+        """轮询状态统计"""
+        self.client.get("/jobs/jobStatus")
+        self.client.get("/jobs/jobState")
+
+    @task(3)
+    def poll_list(self) -> None:
+        """键集翻页读取任务列表"""
+        self.client.get("/jobs/list?cursor=&size=20&with_total=false", name="/jobs/list?cursor")
+
+    @task(2)
+    def poll_detail(self) -> None:
+        """读取任务详情和日志"""
+        self.client.get("/jobs/read?id=1")
+        self.client.post("/jobs/logs?id=1")
+
+
 # 自定义事件监听器
 @events.test_start.add_listener  # type: ignore
 def on_test_start(environment: Any, **kwargs: Any) -> None:
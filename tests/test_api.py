@@ -40,6 +40,69 @@ class TestJobAPI:
         assert "data" in data
         assert isinstance(data["data"], list)
 
+    def test_get_job_list_keyset(self, client: Any, db_session: Any) -> None:
+        """测试任务列表键集翻页和过滤"""
+        from app.models.job import Job
+
+        for i in range(5):
+            db_session.add(
+                Job(
+                    name=f"翻页任务{i}",
+                    cron_expr="0 0 * * *",
+                    command="https://example.com",
+                    mode="http",
+                    state=2 if i % 2 else 0,
+                    tags="keyset,demo" if i < 3 else "demo",
+                )
+            )
+        db_session.commit()
+
+        ids = []
+        cursor = ""
+        while cursor is not None:
+            data = client.get(
+                "/jobs/list", params={"name": "翻页任务", "size": 2, "cursor": cursor}
+            ).json()["data"]
+            assert data["total"] == 5
+            ids += [item["id"] for item in data["items"]]
+            cursor = data["next_cursor"]
+        assert len(ids) == 5 and ids == sorted(ids)
+
+        data = client.get(
+            "/jobs/list", params={"name": "翻页任务", "tag": "keyset", "state": 0, "cursor": ""}
+        ).json()["data"]
+        assert [item["name"] for item in data["items"]] == ["翻页任务0", "翻页任务2"]
+
+        data = client.get(
+            "/jobs/list",
+            params={"name": "翻页任务", "sort": "-updated_at", "cursor": "", "with_total": False},
+        ).json()["data"]
+        assert data["total"] is None and len(data["items"]) == 5
+
+        assert client.get("/jobs/list", params={"cursor": "bad"}).json()["code"] == 400
+        assert client.get("/jobs/list", params={"sort": "name"}).json()["code"] == 400
+
+    def test_get_job_list_prefix_and_total(self, client: Any, db_session: Any) -> None:
+        """测试名称前缀转义通配符，停止任务后总数缓存失效"""
+        from app.models.job import Job
+
+        for name in ("a_b任务", "axb任务", "a%任务"):
+            db_session.add(
+                Job(name=name, cron_expr="0 0 * * *", command="https://example.com", mode="http", state=1)
+            )
+        db_session.commit()
+
+        data = client.get("/jobs/list", params={"name": "a_b", "cursor": ""}).json()["data"]
+        assert [item["name"] for item in data["items"]] == ["a_b任务"]
+        data = client.get("/jobs/list", params={"name": "a%", "cursor": ""}).json()["data"]
+        assert [item["name"] for item in data["items"]] == ["a%任务"]
+
+        params = {"name": "a", "state": 1, "cursor": ""}
+        data = client.get("/jobs/list", params=params).json()["data"]
+        assert data["total"] == 3
+        client.post(f"/jobs/stop?id={data['items'][0]['id']}")
+        assert client.get("/jobs/list", params=params).json()["data"]["total"] == 2
+
     def test_get_job_detail(self, client: Any, sample_job: Any) -> None:
         """测试获取任务详情"""
         response = client.get(f"/jobs/read?id={sample_job.id}")
@@ -49,6 +112,16 @@ class TestJobAPI:
         assert data["data"]["id"] == sample_job.id
         assert data["data"]["name"] == sample_job.name
 
+    def test_update_job_log_policy(self, client: Any, sample_job: Any) -> None:
+        """测试设置任务日志策略"""
+        response = client.post(f"/jobs/edit?id={sample_job.id}", json={"log_policy": "Sample:10"})
+        assert response.json()["code"] == 200
+        data = client.get(f"/jobs/read?id={sample_job.id}").json()["data"]
+        assert data["log_policy"] == "sample:10"
+
+        response = client.post(f"/jobs/edit?id={sample_job.id}", json={"log_policy": "sample:0"})
+        assert response.json()["code"] != 200
+
     def test_get_job_detail_not_found(self, client: Any) -> None:
         """测试获取不存在的任务详情"""
         response = client.get("/jobs/read?id=99999")
@@ -81,6 +154,50 @@ class TestJobAPI:
         assert "任务删除成功" in data["msg"]
         assert data["code"] == 200
 
+    def test_delete_job_with_history(
+        self,
+        client: Any,
+        db_session: Any,
+        sample_job: Any,
+        tmp_path: Any,
+        monkeypatch: Any,
+        query_budget: Any,
+    ) -> None:
+        """测试删除任务：执行日志由数据库级联删除，日志目录交给后台清理"""
+        from sqlalchemy import insert
+
+        from app.core.job_purger import job_purger
+        from app.models.log import JobExecLog
+
+        monkeypatch.chdir(tmp_path)
+        job_id = sample_job.id
+        row = {
+            "time": "2024-01-05 10:00:00.000",
+            "end_time": "2024-01-05 10:00:00.100",
+            "job_id": job_id,
+            "job_name": sample_job.name,
+            "status": "成功",
+            "duration_ms": 100,
+            "mode": "http",
+            "command": sample_job.command,
+        }
+        db_session.execute(insert(JobExecLog), [row] * 2000)
+        db_session.commit()
+        month_dir = tmp_path / "runtime" / "jobs" / str(job_id) / "202401"
+        month_dir.mkdir(parents=True)
+        for day in range(1, 29):
+            (month_dir / f"{day:02d}.log").write_text("日志", encoding="utf-8")
+
+        response = client.post(f"/jobs/del?id={job_id}")
+        assert response.json()["code"] == 200
+        # 查询任务 + 删除任务，不加载执行日志
+        query_budget(response, 2)
+        assert not (tmp_path / "runtime" / "jobs" / str(job_id)).exists()
+        assert db_session.query(JobExecLog).filter(JobExecLog.job_id == job_id).count() == 0
+
+        job_purger.join(timeout=5)
+        assert list((tmp_path / "runtime" / "purge").iterdir()) == []
+
     def test_delete_job_not_found(self, client: Any) -> None:
         """测试删除不存在的任务"""
         response = client.post("/jobs/del?id=99999")
@@ -147,6 +264,192 @@ class TestJobAPI:
         assert "waiting" in data
         assert "stopped" in data
 
+    def test_job_status_counters(
+        self, client: Any, db_session: Any, valid_job_data: Any, query_budget: Any
+    ) -> None:
+        """测试状态计数随新增、停止、重启、删除增量更新，并与数据库一致"""
+        from app.models.job import Job
+
+        def db_counts() -> Any:
+            jobs = db_session.query(Job).all()
+            return {
+                "total": len(jobs),
+                "running": sum(1 for j in jobs if j.state == 1),
+                "waiting": sum(1 for j in jobs if j.state == 0),
+                "stopped": sum(1 for j in jobs if j.state == 2),
+            }
+
+        assert client.get("/jobs/jobStatus").json() == db_counts()
+
+        # 校准间隔内直接返回内存计数，不查询数据库
+        query_budget(client.get("/jobs/jobStatus"), 0)
+        query_budget(client.get("/jobs/jobState"), 0)
+
+        job_id = client.post("/jobs/add", json=valid_job_data).json()["data"]["id"]
+        client.post(f"/jobs/stop?id={job_id}")
+        assert client.get("/jobs/jobStatus").json() == db_counts()
+        client.post(f"/jobs/restart?id={job_id}")
+        client.post("/jobs/edit", params={"id": job_id}, json={"state": 0})
+        assert client.get("/jobs/jobStatus").json() == db_counts()
+        client.post(f"/jobs/del?id={job_id}")
+        assert client.get("/jobs/jobStatus").json() == db_counts()
+
+    def test_query_budget(self, client: Any, sample_job: Any, query_budget: Any) -> None:
+        """测试接口查询次数预算和查询统计汇总"""
+        response = client.get("/jobs/list", params={"with_total": True})
+        assert int(response.headers["X-Query-Count"]) >= 1
+        assert float(response.headers["X-Query-Time-Ms"]) >= 0
+        # 一页数据 + 一次总数
+        query_budget(response, 2)
+        query_budget(client.get("/jobs/read", params={"id": sample_job.id}), 1)
+
+        stats = client.get("/jobs/queryStats", params={"key": "/jobs/read"}).json()["data"]
+        assert [item["key"] for item in stats] == ["GET /jobs/read"]
+        assert stats[0]["calls"] >= 1 and stats[0]["max_queries"] == 1
+        assert "SELECT" in stats[0]["slowest_sql"]
+
+    def test_query_stats_streaming(self, client: Any, sample_job: Any) -> None:
+        """测试流式响应在正文发送完后汇总，包含生成正文时的查询"""
+        response = client.get("/jobs/export")
+        assert response.status_code == 200 and "X-Query-Count" in response.headers
+        stats = client.get("/jobs/queryStats", params={"key": "/jobs/export"}).json()["data"]
+        assert [item["key"] for item in stats] == ["GET /jobs/export"]
+        assert stats[0]["max_queries"] >= 1
+
+    def test_bulk_add_edit_del(self, client: Any, valid_job_data: Any) -> None:
+        """测试批量创建、更新、删除的逐条结果"""
+        from app.core.scheduler import scheduler
+
+        items = [dict(valid_job_data, name=f"批量任务{i}", state=1) for i in range(3)]
+        items.append(dict(valid_job_data, mode="invalid"))
+        data = client.post("/jobs/bulk/add", json=items).json()["data"]
+        assert data["succeeded"] == 3 and data["failed"] == 1
+        assert data["results"][3]["ok"] is False and "mode" in data["results"][3]["msg"]
+        ids = [r["id"] for r in data["results"][:3]]
+        assert all(scheduler.get_job(str(job_id)) for job_id in ids)
+
+        data = client.post("/jobs/bulk/add?atomic=true", json=items).json()["data"]
+        assert data["succeeded"] == 0 and data["failed"] == 4
+
+        edits = [{"id": ids[0], "state": 2}, {"id": ids[1], "name": "改名"}, {"id": 999999}]
+        data = client.post("/jobs/bulk/edit", json=edits).json()["data"]
+        assert [r["ok"] for r in data["results"]] == [True, True, False]
+        assert scheduler.get_job(str(ids[0])) is None
+        detail = client.get(f"/jobs/read?id={ids[1]}").json()["data"]
+        assert detail["name"] == "改名"
+
+        data = client.post("/jobs/bulk/del", json=ids + [999999, "x"]).json()["data"]
+        assert data["succeeded"] == 3 and data["failed"] == 2
+        assert not any(scheduler.get_job(str(job_id)) for job_id in ids)
+        assert client.get(f"/jobs/read?id={ids[2]}").json()["code"] == 404
+
+    def test_export_import_jobs(self, client: Any, sample_job: Any) -> None:
+        """测试任务导出后原样导入（按ID更新或插入）"""
+        import json
+
+        response = client.get("/jobs/export")
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        records = [json.loads(line) for line in response.text.splitlines()]
+        exported = next(r for r in records if r["id"] == sample_job.id)
+        assert exported["name"] == sample_job.name and "run_count" in exported
+
+        new_id = max(r["id"] for r in records) + 1000
+        body = "\n".join(
+            [
+                json.dumps(dict(exported, name="导入更新", state=2)),
+                json.dumps(dict(exported, id=new_id, name="导入新增", run_count=7, state=2)),
+                "not json",
+            ]
+        )
+        data = client.post("/jobs/import?batch=1", content=body.encode("utf-8")).json()["data"]
+        assert (data["inserted"], data["updated"], data["failed"]) == (1, 1, 1)
+        assert data["errors"][0]["line"] == 3
+
+        assert client.get(f"/jobs/read?id={sample_job.id}").json()["data"]["name"] == "导入更新"
+        imported = client.get(f"/jobs/read?id={new_id}").json()["data"]
+        assert imported["name"] == "导入新增" and imported["run_count"] == 7
+        client.post(f"/jobs/del?id={new_id}")
+
+    def test_import_batch_error_falls_back(
+        self, db_session: Any, sample_job: Any, monkeypatch: Any
+    ) -> None:
+        """测试整批写入出错时回滚并逐条重试，失败的行记入错误列表"""
+        import json
+
+        from sqlalchemy.exc import IntegrityError
+
+        from app.core.job_transfer import import_lines, job_to_record
+        from app.models.job import Job
+
+        bulk_insert = db_session.bulk_insert_mappings
+
+        def failing_insert(mapper: Any, rows: Any) -> None:
+            if any(row["name"] == "冲突任务" for row in rows):
+                raise IntegrityError("INSERT", {}, Exception("UNIQUE constraint failed"))
+            bulk_insert(mapper, rows)
+
+        monkeypatch.setattr(db_session, "bulk_insert_mappings", failing_insert)
+        record = job_to_record(sample_job)
+        base = sample_job.id + 1000
+        lines = [
+            json.dumps(dict(record, id=base + i, name=name, state=2))
+            for i, name in enumerate(("导入甲", "冲突任务", "导入乙"))
+        ]
+        data = import_lines(db_session, [json.dumps(dict(record, name="导入更新"))] + lines)
+        assert (data["inserted"], data["updated"], data["failed"]) == (2, 1, 1)
+        assert data["errors"][0]["line"] == 3 and "UNIQUE" in data["errors"][0]["msg"]
+        names = db_session.query(Job.name).filter(Job.id >= base).order_by(Job.id).all()
+        assert [name for name, in names] == ["导入甲", "导入乙"]
+        db_session.query(Job).filter(Job.id >= base).delete()
+        db_session.commit()
+
+    def test_archive_and_restore(self, client: Any, db_session: Any, valid_job_data: Any) -> None:
+        """测试休眠任务归档、搜索和恢复"""
+        from datetime import datetime, timedelta
+
+        from sqlalchemy import update
+
+        from app.models.job import Job
+
+        items = [
+            dict(valid_job_data, name="归档-停止", state=2, tags="archive"),
+            dict(valid_job_data, name="归档-次数", state=1, max_run_count=3, tags="archive"),
+            dict(valid_job_data, name="归档-活跃", state=0, tags="archive"),
+        ]
+        results = client.post("/jobs/bulk/add", json=items).json()["data"]["results"]
+        stopped, finished, active = (r["id"] for r in results)
+        old = datetime.utcnow() - timedelta(days=60)
+        db_session.execute(update(Job).where(Job.id == finished).values(run_count=3))
+        db_session.execute(
+            update(Job).where(Job.id.in_([stopped, finished, active])).values(updated_at=old)
+        )
+        db_session.commit()
+
+        assert client.post("/jobs/archive/run?days=30").json()["code"] == 400
+        assert client.get(f"/jobs/read?id={stopped}").json()["code"] == 200
+        response = client.post("/jobs/archive/run?days=30&purge_history=true")
+        assert response.json()["data"]["archived"] == 2
+        assert client.get(f"/jobs/read?id={stopped}").json()["code"] == 404
+        assert client.get(f"/jobs/read?id={active}").json()["code"] == 200
+
+        page = client.get("/jobs/archive/list?tag=archive&size=1").json()["data"]
+        assert len(page["items"]) == 1 and page["next_cursor"]
+        rest = client.get(f"/jobs/archive/list?tag=archive&cursor={page['next_cursor']}").json()
+        archived = {item["job_id"]: item for item in page["items"] + rest["data"]["items"]}
+        assert set(archived) == {stopped, finished}
+        assert archived[finished]["run_count"] == 3
+
+        data = client.post(
+            "/jobs/archive/restore", json=[archived[stopped]["id"], 999999]
+        ).json()["data"]
+        assert data["restored"] == [{"archive_id": archived[stopped]["id"], "id": stopped}]
+        assert data["missing"] == [999999]
+        assert client.get(f"/jobs/read?id={stopped}").json()["data"]["name"] == "归档-停止"
+        # 恢复时刻记为更新时间，下一轮不会再次归档
+        client.post("/jobs/archive/run?days=30&purge_history=true")
+        assert client.get(f"/jobs/read?id={stopped}").json()["code"] == 200
+        client.post("/jobs/bulk/del", json=[stopped, active])
+
     def test_scheduler_tasks(self, client: Any) -> None:
         """测试获取调度器任务"""
         response = client.get("/jobs/scheduler")
@@ -192,6 +495,120 @@ class TestJobLogsAPI:
         assert "data" in data
 
 
+    def test_get_job_logs_from_db(
+        self, client: Any, db_session: Any, sample_job: Any, monkeypatch: Any
+    ) -> None:
+        """测试db日志存储时从job_exec_logs读取"""
+        from datetime import datetime
+
+        from app.config import Config
+        from app.models.log import JobExecLog
+
+        monkeypatch.setattr(Config, "JOB_LOG_STORAGE", "db")
+        now = datetime(2024, 1, 6, 8, 0, 0)
+        db_session.add(
+            JobExecLog(
+                time="2024-01-06 08:00:00.000",
+                end_time="2024-01-06 08:00:00.100",
+                job_id=sample_job.id,
+                job_name=sample_job.name,
+                status="成功",
+                duration_ms=100,
+                mode="command",
+                command="echo ok",
+                stdout="ok",
+                created_at=now,
+            )
+        )
+        db_session.commit()
+
+        response = client.post(f"/jobs/logs?id={sample_job.id}&date=2024-01-06")
+        data = response.json()
+        assert data["total"] == 1
+        assert data["data"][0]["output"] == "ok"
+        assert data["data"][0]["status"] == "成功"
+
+
+    def test_export_job_logs(self, client: Any, tmp_path: Any, monkeypatch: Any) -> None:
+        """测试按任务集合和日期范围流式导出NDJSON（含gzip）"""
+        import gzip
+        import json
+        from datetime import datetime, timedelta
+
+        monkeypatch.chdir(tmp_path)
+        # 使用近两天的日期，避免被后台日志保留策略清理
+        today = datetime.now()
+        days = [(today - timedelta(days=1)).strftime("%Y-%m-%d"), today.strftime("%Y-%m-%d")]
+        for job_id, day in ((1, days[0]), (1, days[1]), (2, days[1]), (3, days[1])):
+            log_dir = tmp_path / "runtime" / "jobs" / str(job_id) / day[:7].replace("-", "")
+            log_dir.mkdir(parents=True, exist_ok=True)
+            record = {"time": f"{day} 08:00:00.000", "job_id": job_id, "output": day}
+            (log_dir / f"{day[8:]}.log").write_text(json.dumps(record) + "\n", encoding="utf-8")
+
+        url = f"/jobs/logs/export?ids=1,2&start={days[0]}&end={days[1]}"
+        response = client.get(url)
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        records = [json.loads(line) for line in response.text.splitlines()]
+        expected = [(1, days[0]), (1, days[1]), (2, days[1])]
+        assert [(r["job_id"], r["output"]) for r in records] == expected
+
+        response = client.get(url + "&gzip=true")
+        lines = gzip.decompress(response.content).decode("utf-8").splitlines()
+        assert [json.loads(line) for line in lines] == records
+
+        url = f"/jobs/logs/export?start={days[1]}&end={days[0]}"
+        assert client.get(url).json()["code"] != 200
+
+    def test_zap_logs_incremental(self, client: Any, tmp_path: Any, monkeypatch: Any) -> None:
+        """测试系统日志尾部读取和增量游标"""
+        log_path = tmp_path / "system.log"
+        log_path.write_text("a\nb\nc\n", encoding="utf-8")
+        monkeypatch.setenv("SYSTEM_LOG_PATH", str(log_path))
+
+        data = client.get("/jobs/zapLogs?n=2").json()["data"]
+        assert data["lines"] == ["b", "c"]
+        with open(log_path, "a", encoding="utf-8") as f:
+            f.write("d\n")
+        data = client.get(f"/jobs/zapLogs?since_offset={data['offset']}").json()["data"]
+        assert data["lines"] == ["d"]
+
+    def test_job_stats(self, client: Any, sample_job: Any) -> None:
+        """测试任务执行统计接口"""
+        from app.core.job_stats import job_stats
+
+        job_stats.forget(sample_job.id)
+        assert client.get(f"/jobs/stats?id={sample_job.id}").json()["code"] == 404
+        job_stats.record(sample_job.id, 120, True)
+        data = client.get(f"/jobs/stats?id={sample_job.id}").json()["data"]
+        assert data["runs"] == 1 and data["success_rate"] == 1.0
+        job_stats.forget(sample_job.id)
+
+    def test_job_failures(self, client: Any, tmp_path: Any, monkeypatch: Any) -> None:
+        """测试最近失败记录接口"""
+        from app.api import jobs
+        from app.core.failure_journal import FailureJournal
+
+        journal = FailureJournal(path=str(tmp_path / "failures.ring"), capacity=10)
+        monkeypatch.setattr(jobs, "failure_journal", journal)
+        journal.append(1, "订单同步", "http", "连接超时", tags=["订单"])
+        journal.append(2, "清理", "command", "退出码: 1")
+
+        data = client.get("/jobs/failures?limit=1").json()["data"]
+        assert [e["job_id"] for e in data["items"]] == [2]
+        data = client.get(f"/jobs/failures?cursor={data['next_cursor']}").json()["data"]
+        assert [e["job_id"] for e in data["items"]] == [1]
+        data = client.get("/jobs/failures?tag=订单&minutes=15").json()["data"]
+        assert [e["job_name"] for e in data["items"]] == ["订单同步"]
+        journal.close()
+
+    def test_job_metrics_validation(self, client: Any) -> None:
+        """测试执行指标接口参数校验"""
+        data = client.get(
+            "/jobs/metrics?start=2024-01-02T00:00:00&end=2024-01-01T00:00:00"
+        ).json()
+        assert data["code"] in (400, 501)
+
+
 class TestSystemAPI:
     """系统API测试"""
 
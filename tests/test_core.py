@@ -5,6 +5,8 @@
 
 from typing import Any
 
+import pytest
+
 from app.function.common import parse_multiline_config
 
 
@@ -205,3 +207,1295 @@ class TestFunctionCommon:
         config = parse_multiline_config("【url】https://example.com")
         assert config["mode"] == "GET"
         assert config["timeout"] == 60
+
+
+class TestBinaryLogSegment:
+    """二进制日志段测试"""
+
+    def _write(self, job_logger: Any, count: int) -> None:
+        for i in range(count):
+            job_logger.write_text_log(
+                {
+                    "job_id": 7,
+                    "job_name": "段测试",
+                    "status": "成功",
+                    "duration_ms": i,
+                    "mode": "command",
+                    "command": "echo 你好",
+                    "result": f"输出{i}",
+                }
+            )
+
+    def test_binary_roundtrip(self, tmp_path: Any, monkeypatch: Any) -> None:
+        """测试二进制记录写入后读取结构与JSON一致"""
+        from datetime import datetime
+
+        from app.config import Config
+        from app.core.job_logger import JobLogger, read_job_log_records
+        from app.core.log_segment import close_all_segment_writers
+
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(Config, "JOB_LOG_FORMAT", "binary")
+        job_logger = JobLogger(job_id=7, job_name="段测试")
+        self._write(job_logger, 3)
+        close_all_segment_writers()
+
+        records = read_job_log_records(7, datetime.now().strftime("%Y-%m-%d"))
+        assert [r["duration_ms"] for r in records] == [0, 1, 2]
+        assert records[0]["job_name"] == "段测试"
+        assert records[0]["command"] == "echo 你好"
+        assert records[2]["output"] == "输出2"
+        assert set(records[0]) == set(job_logger._build_json_log({}))
+
+    def test_segment_rolls_by_size(self, tmp_path: Any, monkeypatch: Any) -> None:
+        """测试段超过大小限制后滚动，且新段字典独立"""
+        from datetime import datetime
+
+        from app.core.log_segment import SegmentWriter, iter_segment_records, list_day_segments
+
+        monkeypatch.chdir(tmp_path)
+        writer = SegmentWriter(job_id=8, max_bytes=200)
+        for i in range(10):
+            writer.append({"job_name": "滚动", "duration_ms": i, "output": "x" * 50})
+        writer.close()
+
+        segments = list_day_segments(8, datetime.now().strftime("%Y-%m-%d"))
+        assert len(segments) > 1
+        durations = [r["duration_ms"] for p in segments for r in iter_segment_records(p)]
+        assert durations == list(range(10))
+        assert next(iter_segment_records(segments[-1]))["job_name"] == "滚动"
+
+    def test_truncated_tail_is_recovered(self, tmp_path: Any, monkeypatch: Any) -> None:
+        """测试异常退出留下的残帧被忽略，续写时截断"""
+        from app.core.log_segment import SegmentWriter, iter_segment_records
+
+        monkeypatch.chdir(tmp_path)
+        writer = SegmentWriter(job_id=9)
+        writer.append({"job_name": "残帧", "duration_ms": 1})
+        path = writer.path
+        writer.close()
+        with open(path, "ab") as f:
+            f.write(b"\x00\x00\x01\x00\x02partial")
+
+        writer = SegmentWriter(job_id=9)
+        writer.append({"job_name": "残帧", "duration_ms": 2})
+        writer.close()
+
+        records = list(iter_segment_records(path))
+        assert [r["duration_ms"] for r in records] == [1, 2]
+        assert records[1]["job_name"] == "残帧"
+
+
+class TestSharedLogStore:
+    """共享日志段存储测试"""
+
+    def test_per_job_index_lookup(self, tmp_path: Any, monkeypatch: Any) -> None:
+        """测试多任务交错写入后按任务读取"""
+        from datetime import datetime
+
+        from app.core.log_store import SharedLogStore
+
+        monkeypatch.chdir(tmp_path)
+        store = SharedLogStore(max_bytes=150)
+        for i in range(6):
+            store.append({"job_id": 1 + i % 2, "duration_ms": i, "status": "成功"})
+        today = datetime.now().strftime("%Y-%m-%d")
+
+        assert [r["duration_ms"] for r in store.read_job_records(1, today)] == [0, 2, 4]
+        store.append({"job_id": 2, "duration_ms": 6})
+        assert [r["duration_ms"] for r in store.read_job_records(2, today)] == [1, 3, 5, 6]
+        assert len(list((tmp_path / "runtime" / "logstore").rglob("*.seg"))) > 1
+        assert store.job_days(2) == [datetime.now().strftime("%Y%m%d")]
+        store.close()
+
+    def test_repair_index_on_open(self, tmp_path: Any, monkeypatch: Any) -> None:
+        """测试重新打开时截断残缺索引条目和数据未落盘的条目"""
+        from app.core.log_store import _INDEX_ENTRY, INDEX_FILE, SharedLogStore
+
+        monkeypatch.chdir(tmp_path)
+        store = SharedLogStore()
+        for i in range(2):
+            store.append({"job_id": 1, "duration_ms": i}, day="20240105")
+        store.close()
+
+        day_dir = tmp_path / "runtime" / "logstore" / "20240105"
+        with open(day_dir / INDEX_FILE, "ab") as fh:
+            fh.write(_INDEX_ENTRY.pack(1, 0, 10_000, 50))
+            fh.write(b"\x01\x02\x03")
+
+        store = SharedLogStore()
+        store.append({"job_id": 1, "duration_ms": 2}, day="20240105")
+        assert (day_dir / INDEX_FILE).stat().st_size == 3 * _INDEX_ENTRY.size
+        assert [r["duration_ms"] for r in store.read_job_records(1, "2024-01-05")] == [0, 1, 2]
+        store.close()
+
+    def test_forget_job(self, tmp_path: Any, monkeypatch: Any) -> None:
+        """测试删除任务后忽略此前的记录，复用ID的新任务只读到自己的记录"""
+        from datetime import datetime
+
+        from app.core.log_store import SharedLogStore
+
+        monkeypatch.chdir(tmp_path)
+        today = datetime.now().strftime("%Y-%m-%d")
+        store = SharedLogStore()
+        store.append({"job_id": 5, "duration_ms": 0}, day="20240105")
+        for i in range(2):
+            store.append({"job_id": 5 + i, "duration_ms": 1})
+        store.forget_job(5)
+        store.append({"job_id": 5, "duration_ms": 2})
+
+        assert [r["duration_ms"] for r in store.read_job_records(5, today)] == [2]
+        assert store.read_job_records(5, "2024-01-05") == []
+        assert [r["duration_ms"] for r in store.read_job_records(6, today)] == [1]
+        store.close()
+
+        # 删除位置持久化，重新打开后仍然生效
+        reopened = SharedLogStore()
+        assert [r["duration_ms"] for r in reopened.read_job_records(5, today)] == [2]
+        assert reopened.job_days(5) == [datetime.now().strftime("%Y%m%d")]
+        reopened.close()
+
+    def test_index_cache_bounded(self, tmp_path: Any, monkeypatch: Any) -> None:
+        """测试索引缓存超出条目上限时按查询扫描"""
+        from app.core.log_store import SharedLogStore
+
+        monkeypatch.chdir(tmp_path)
+        store = SharedLogStore(cached_entries=3)
+        for day in ("20240105", "20240106"):
+            for i in range(2):
+                store.append({"job_id": 1 + i, "duration_ms": i}, day=day)
+        store.append({"job_id": 1, "duration_ms": 9}, day="20240106")
+
+        assert [r["duration_ms"] for r in store.read_job_records(1, "2024-01-05")] == [0]
+        assert list(store._indexes) == ["20240105"]
+        # 第二天有3条，缓存两天会超出上限，淘汰前一天
+        assert [r["duration_ms"] for r in store.read_job_records(1, "2024-01-06")] == [0, 9]
+        assert list(store._indexes) == ["20240106"]
+        store.append({"job_id": 2, "duration_ms": 5}, day="20240106")
+        # 单天超出上限，不缓存，直接扫描索引
+        assert [r["duration_ms"] for r in store.read_job_records(2, "2024-01-06")] == [1, 5]
+        assert list(store._indexes) == []
+        assert store.job_days(1) == ["20240105", "20240106"]
+        store.close()
+
+    def test_migrate_from_job_dirs(self, tmp_path: Any, monkeypatch: Any) -> None:
+        """测试将 runtime/jobs 下的日志迁移到共享段"""
+        import importlib.util
+        import json
+        import os
+
+        from app.core.log_store import shared_log_store
+        from app.config import Config
+        from app.core.output_store import OutputStore, output_store
+
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(Config, "JOB_LOG_OUTPUT_DEDUPE", True)
+        shared_log_store.close()
+        log_dir = tmp_path / "runtime" / "jobs" / "3" / "202401"
+        log_dir.mkdir(parents=True)
+        body = "重复输出 " * 100
+        # 任务目录下去重过的输出，迁移时还原
+        deduped = OutputStore(min_bytes=1).dedupe(
+            {"job_id": 3, "time": "2024-01-05 10:00:00.000", "duration_ms": 3, "output": body}
+        )
+        assert (log_dir / "objects.pack").exists()
+        with open(log_dir / "05.log", "w", encoding="utf-8") as f:
+            for i in range(3):
+                f.write(json.dumps({"job_id": 3, "duration_ms": i}, ensure_ascii=False) + "\n")
+            f.write(json.dumps(deduped, ensure_ascii=False) + "\n")
+
+        script = os.path.join(os.path.dirname(__file__), "..", "scripts", "migrate_job_logs.py")
+        spec = importlib.util.spec_from_file_location("migrate_job_logs", script)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        stats = module.migrate()
+
+        assert stats == {"files": 1, "records": 4, "packs": 1}
+        assert not (tmp_path / "runtime" / "jobs" / "3").exists()
+        records = shared_log_store.read_job_records(3, "2024-01-05")
+        assert [r["duration_ms"] for r in records] == [0, 1, 2, 3]
+        # 迁移后按共享存储重新去重
+        assert output_store.rehydrate(records[3], shared=True)["output"] == body
+
+
+class TestDBLogWriter:
+    """数据库日志后端测试"""
+
+    def test_bulk_flush(self, engine: Any, db_session: Any, sample_job: Any) -> None:
+        """测试缓冲记录批量写入，并跳过已删除任务的记录"""
+        from app.core.db_log_writer import DBLogWriter, build_exec_log_row
+        from app.models.log import JobExecLog
+
+        writer = DBLogWriter(bind=engine, flush_ms=60000, batch_size=100)
+        for i in range(3):
+            writer.submit(
+                build_exec_log_row(
+                    {
+                        "time": "2024-01-05 10:00:00.500",
+                        "job_id": sample_job.id,
+                        "job_name": sample_job.name,
+                        "status": "成功",
+                        "duration_ms": 500,
+                        "mode": "http",
+                        "command": sample_job.command,
+                        "status_code": 200,
+                        "result": f"返回内容: ok{i}",
+                    }
+                )
+            )
+        writer.submit(build_exec_log_row({"job_id": 999999, "status": "成功"}))
+        assert writer.flush() == 3
+        writer.close()
+
+        rows = db_session.query(JobExecLog).filter(JobExecLog.job_id == sample_job.id).all()
+        assert len(rows) == 3
+        assert rows[0].time == "2024-01-05 10:00:00.000"
+        assert rows[0].http_status == 200
+        assert rows[0].http_resp == "返回内容: ok0"
+
+
+class TestDBWriteQueue:
+    """SQLite 单写连接队列测试"""
+
+    def test_group_commit(self, engine: Any, db_session: Any, sample_job: Any) -> None:
+        """测试并发自增不丢失计数，组内失败的操作不影响其他操作"""
+        from concurrent.futures import ThreadPoolExecutor
+
+        from sqlalchemy import text, update
+
+        from app.core.db_writer import DBWriteQueue
+        from app.models.job import Job
+
+        write_queue = DBWriteQueue(bind=engine, enabled=True)
+        stmt = update(Job).where(Job.id == sample_job.id).values(run_count=Job.run_count + 1)
+        before = sample_job.run_count
+
+        def fail(conn: Any) -> None:
+            conn.execute(text("SELECT * FROM missing_table"))
+
+        futures = [write_queue.submit(lambda conn: conn.execute(stmt).rowcount) for _ in range(50)]
+        failed = write_queue.submit(fail)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda _: write_queue.execute(lambda conn: conn.execute(stmt)), range(50)))
+        assert [f.result(timeout=10) for f in futures] == [1] * 50
+        assert failed.exception(timeout=10) is not None
+        write_queue.close()
+
+        db_session.refresh(sample_job)
+        assert sample_job.run_count == before + 100
+
+    def test_queries_counted_for_submitter(self, engine: Any, max_queries: Any) -> None:
+        """测试经队列执行的写入计入提交方的查询统计"""
+        from sqlalchemy import text
+
+        from app.core.db_writer import DBWriteQueue
+
+        write_queue = DBWriteQueue(bind=engine, enabled=True)
+        with max_queries(1) as stats:
+            write_queue.execute(lambda conn: conn.execute(text("SELECT 1")))
+        write_queue.close()
+        assert stats.count == 1 and stats.statements == ["SELECT 1"]
+
+
+class TestDBRouter:
+    """读写分离路由测试（两个SQLite文件分别模拟主库和副本）"""
+
+    def test_read_your_writes(self, tmp_path: Any) -> None:
+        """测试读请求走副本，客户端主库提交后窗口内该客户端改走主库"""
+        import time
+
+        from sqlalchemy import create_engine, event
+        from sqlalchemy.ext.asyncio import create_async_engine
+        from sqlalchemy.orm import sessionmaker
+
+        from app.deps import DBRouter, ReadSessionLocal
+        from app.models.base import Base
+        from app.models.job import Job
+
+        primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+        replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+        async_primary = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}")
+        async_replica = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+        for bind in (primary, replica):
+            Base.metadata.create_all(bind=bind)
+
+        router = DBRouter(primary, [replica], async_primary, [async_replica], sticky_seconds=0.3)
+        PrimarySession = sessionmaker(bind=primary)
+        event.listen(PrimarySession, "after_commit", lambda session: router.mark_write())
+
+        def read_names() -> list:
+            with ReadSessionLocal(bind=router.read_bind()) as db:
+                return [job.name for job in db.query(Job).all()]
+
+        assert router.async_read_bind() is async_replica
+        with router.client_scope() as client:
+            with PrimarySession() as db:
+                db.add(Job(name="主库任务", cron_expr="0 0 * * *", command="echo"))
+                db.commit()
+            assert client.wrote
+            # 同一请求内写后读主库
+            assert router.sticky and read_names() == ["主库任务"]
+        last_write = client.last_write
+
+        # 其他客户端和请求之外（后台线程）仍读副本（测试中副本不复制，读不到主库数据）
+        with router.client_scope(None):
+            assert not router.sticky and read_names() == []
+        assert not router.sticky and router.async_read_bind() is async_replica
+        # 同一客户端的下一个请求携带最后写入时间，窗口内读主库
+        with router.client_scope(last_write):
+            assert read_names() == ["主库任务"]
+            assert router.async_read_bind() is async_primary
+            time.sleep(0.35)
+            # 窗口结束后回到副本
+            assert not router.sticky and read_names() == []
+            assert router.async_read_bind() is async_replica
+
+        for bind in (primary, replica):
+            bind.dispose()
+
+    def test_read_your_writes_middleware(self, tmp_path: Any, monkeypatch: Any) -> None:
+        """测试中间件在写入后下发最后写入时间，后续请求携带后读主库"""
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+        from sqlalchemy import create_engine
+
+        from app.deps import DBRouter
+        from app.middlewares import read_your_writes
+        from app.middlewares.read_your_writes import (
+            LAST_WRITE_COOKIE,
+            LAST_WRITE_HEADER,
+            ReadYourWritesMiddleware,
+        )
+
+        primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+        replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+        router = DBRouter(primary, [replica], sticky_seconds=30)
+        monkeypatch.setattr(read_your_writes, "db_router", router)
+
+        app = FastAPI()
+        app.add_middleware(ReadYourWritesMiddleware)
+
+        @app.post("/write")
+        def write() -> dict:
+            router.mark_write()
+            return {}
+
+        @app.get("/read")
+        def read() -> dict:
+            return {"primary": router.read_bind() is primary}
+
+        client = TestClient(app)
+        assert client.get("/read").json() == {"primary": False}
+        response = client.post("/write")
+        assert LAST_WRITE_HEADER in response.headers and LAST_WRITE_COOKIE in response.cookies
+        # TestClient 保存 Cookie，同一客户端读主库
+        assert client.get("/read").json() == {"primary": True}
+        other = TestClient(app)
+        assert other.get("/read").json() == {"primary": False}
+        headers = {LAST_WRITE_HEADER: response.headers[LAST_WRITE_HEADER]}
+        assert other.get("/read", headers=headers).json() == {"primary": True}
+        for bind in (primary, replica):
+            bind.dispose()
+
+
+class TestMigrations:
+    """数据库迁移测试"""
+
+    def test_upgrade_matches_models(self, tmp_path: Any) -> None:
+        """测试空库升级后与模型一致，已是最新版本时不再升级"""
+        from alembic.autogenerate import compare_metadata
+        from alembic.runtime.migration import MigrationContext
+        from sqlalchemy import create_engine
+
+        from app.core.migrate import VERSION_TABLE, current_revision, head_revision, upgrade_database
+        from app.models import Base
+
+        engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+        assert upgrade_database(engine) is True
+        assert current_revision(engine) == head_revision()
+        assert upgrade_database(engine) is False
+        with engine.connect() as conn:
+            context = MigrationContext.configure(
+                conn, opts={"compare_type": True, "version_table": VERSION_TABLE}
+            )
+            assert compare_metadata(context, Base.metadata) == []
+        engine.dispose()
+
+    def test_upgrade_legacy_database(self, tmp_path: Any) -> None:
+        """测试无版本记录的旧库：标记基线后补齐字段和索引，保留已有数据"""
+        from alembic import command
+        from sqlalchemy import create_engine, inspect, text
+
+        from app.core.migrate import VERSION_TABLE, alembic_config, upgrade_database
+        from app.models.base import get_table_name
+
+        engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+        cfg = alembic_config()
+        with engine.begin() as conn:
+            cfg.attributes["connection"] = conn
+            command.upgrade(cfg, "0001")
+            conn.execute(text(f"DROP TABLE {VERSION_TABLE}"))
+            conn.execute(
+                text(
+                    f"INSERT INTO {get_table_name('jobs')} (name, cron_expr, mode, command, state,"
+                    " allow_mode, max_run_count, run_count, created_at, updated_at, trigger_type,"
+                    " interval_seconds) VALUES ('旧任务', '0 0 * * *', 'http', 'https://example.com',"
+                    " 0, 0, 0, 3, '2024-01-01 00:00:00', '2024-01-01 00:00:00', 'cron', 0)"
+                )
+            )
+
+        assert upgrade_database(engine) is True
+        indexes = {i["name"] for i in inspect(engine).get_indexes(get_table_name("jobs"))}
+        assert f"ix_{get_table_name('jobs')}_state" in indexes
+        with engine.connect() as conn:
+            row = conn.execute(
+                text(f"SELECT name, run_count, log_policy, tags FROM {get_table_name('jobs')}")
+            ).one()
+        assert tuple(row) == ("旧任务", 3, "always", "")
+        engine.dispose()
+
+    def test_separate_history_database(self, tmp_path: Any) -> None:
+        """测试执行记录单独存放在历史库：按模型路由会话，删除任务后后台删除执行记录"""
+        from datetime import datetime, timedelta
+
+        from sqlalchemy import create_engine, func, inspect, select
+        from sqlalchemy.orm import sessionmaker
+
+        from app.core.db_writer import DBWriteQueue
+        from app.core.job_purger import JobPurger
+        from app.core.migrate import ensure_history_tables, upgrade_database
+        from app.models.job import Job
+        from app.models.log import JobExecLog
+
+        engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+        history = create_engine(f"sqlite:///{tmp_path / 'history.db'}")
+        upgrade_database(engine)
+        assert ensure_history_tables(history) is True
+        assert ensure_history_tables(history) is False
+        assert inspect(history).get_table_names() == [JobExecLog.__tablename__]
+        assert inspect(history).get_foreign_keys(JobExecLog.__tablename__) == []
+
+        Session = sessionmaker(bind=engine, binds={JobExecLog: history})
+        with Session() as db:
+            job = Job(name="历史库任务", cron_expr="0 0 * * *", command="echo", mode="cmd")
+            db.add(job)
+            db.commit()
+            row = {
+                "time": "2024-01-05 10:00:00.000",
+                "end_time": "2024-01-05 10:00:00.100",
+                "job_id": job.id,
+                "job_name": job.name,
+                "status": "成功",
+                "duration_ms": 100,
+                "mode": "cmd",
+                "command": "echo",
+            }
+            db.add_all(JobExecLog(**row, created_at=datetime(2024, 1, 5, 10)) for _ in range(5))
+            # 删除之后写入的记录（任务ID被复用）不在清理范围内
+            db.add(JobExecLog(**row, created_at=datetime.now() + timedelta(hours=1)))
+            db.commit()
+            job_id = job.id
+            assert db.scalar(select(func.count(JobExecLog.id))) == 6
+            db.delete(job)
+            db.commit()
+        with engine.connect() as conn:
+            assert conn.scalar(select(func.count(JobExecLog.id))) == 0
+
+        purger = JobPurger(
+            batch_size=2,
+            pause_ms=0,
+            jobs_dir=str(tmp_path / "jobs"),
+            purge_dir=str(tmp_path / "purge"),
+            history_queue=DBWriteQueue(history, enabled=False),
+        )
+        purger.purge([job_id])
+        purger.join(timeout=5)
+        with history.connect() as conn:
+            assert conn.scalar(select(func.count(JobExecLog.id))) == 1
+        engine.dispose()
+        history.dispose()
+
+
+class TestLogTail:
+    """日志尾部读取测试"""
+
+    def _make_log(self, tmp_path: Any, count: int) -> str:
+        path = tmp_path / "system.log"
+        with open(path, "w", encoding="utf-8") as f:
+            for i in range(count):
+                f.write(f"{'ERROR' if i % 10 == 0 else 'INFO'} 第{i}行\n")
+        return str(path)
+
+    def test_tail_small_blocks(self, tmp_path: Any) -> None:
+        """测试小块反向扫描得到正确的最后N行"""
+        from app.core.log_tail import tail_lines
+
+        path = self._make_log(tmp_path, 500)
+        lines, offset = tail_lines(path, 3, block_size=16)
+        assert lines == ["INFO 第497行", "INFO 第498行", "INFO 第499行"]
+        assert offset == len(open(path, "rb").read())
+
+    def test_tail_with_grep(self, tmp_path: Any) -> None:
+        """测试过滤条件在扫描时生效"""
+        from app.core.log_tail import tail_lines
+
+        path = self._make_log(tmp_path, 500)
+        lines, _ = tail_lines(path, 2, grep="ERROR", block_size=32)
+        assert lines == ["ERROR 第480行", "ERROR 第490行"]
+        lines, _ = tail_lines(path, 100, grep="第1行")
+        assert lines == ["INFO 第1行"]
+
+    def test_read_since_offset(self, tmp_path: Any) -> None:
+        """测试按偏移增量读取，未写完的行留到下次"""
+        from app.core.log_tail import read_since, tail_lines
+
+        path = self._make_log(tmp_path, 5)
+        _, offset = tail_lines(path, 10)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("INFO 新增\nINFO 未写完")
+        lines, offset = read_since(path, offset, 10, block_size=4)
+        assert lines == ["INFO 新增"]
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("的行\n")
+        lines, _ = read_since(path, offset, 10)
+        assert lines == ["INFO 未写完的行"]
+
+    def test_tail_holds_back_partial_line(self, tmp_path: Any) -> None:
+        """测试尾部读取不返回未写完的最后一行，续读时只返回一次"""
+        from app.core.log_tail import read_since, tail_lines
+
+        path = tmp_path / "partial.log"
+        path.write_bytes("第一行\n第二行\n未写完".encode("utf-8"))
+        lines, offset = tail_lines(str(path), 10, block_size=4)
+        assert lines == ["第一行", "第二行"]
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("的行\n")
+        lines, _ = read_since(str(path), offset, 10)
+        assert lines == ["未写完的行"]
+
+        path.write_bytes("没有换行".encode("utf-8"))
+        assert tail_lines(str(path), 10) == ([], 0)
+
+
+class TestLogPubSub:
+    """实时日志发布订阅测试"""
+
+    def test_fanout_from_writer_thread(self) -> None:
+        """测试多个订阅者共享同一发布方，跨线程投递"""
+        import asyncio
+        import threading
+
+        from app.core.log_pubsub import ALL_JOBS_TOPIC, LogBroker, job_topic
+
+        async def scenario() -> list:
+            broker = LogBroker(queue_size=10)
+            first = broker.subscribe(job_topic(5))
+            second = broker.subscribe(job_topic(5))
+            every = broker.subscribe(ALL_JOBS_TOPIC)
+            thread = threading.Thread(
+                target=broker.publish_job_record, args=({"job_id": 5, "status": "成功"},)
+            )
+            thread.start()
+            thread.join()
+            return [
+                await asyncio.wait_for(sub.queue.get(), timeout=1)
+                for sub in (first, second, every)
+            ]
+
+        items = asyncio.run(scenario())
+        assert [item["job_id"] for item in items] == [5, 5, 5]
+
+    def test_slow_subscriber_dropped(self) -> None:
+        """测试队列满的慢订阅者被断开而不是无限缓冲"""
+        import asyncio
+
+        from app.core.log_pubsub import LogBroker
+
+        async def scenario() -> tuple:
+            broker = LogBroker(queue_size=2)
+            sub = broker.subscribe("system")
+            for i in range(5):
+                broker.publish("system", f"第{i}行")
+            await asyncio.sleep(0)
+            items = [sub.queue.get_nowait() for _ in range(sub.queue.qsize())]
+            broker.publish("system", "之后")
+            return items, sub.dropped, broker.has_subscribers("system")
+
+        items, dropped, still_subscribed = asyncio.run(scenario())
+        assert dropped is True
+        assert items[-1] is None
+        assert len(items) == 2
+        assert still_subscribed is False
+
+
+class TestLogRetention:
+    """日志保留策略测试"""
+
+    def _touch(self, tmp_path: Any, job_id: int, day: str, size: int = 10) -> Any:
+        path = tmp_path / "runtime" / "jobs" / str(job_id) / day[:6] / f"{day[6:]}.log"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"x" * size)
+        return path
+
+    def test_expire_by_days_and_keep_count(self, tmp_path: Any, monkeypatch: Any) -> None:
+        """测试按保留天数和保留数量删除，只删除过期文件"""
+        from datetime import datetime
+
+        from app.core.log_retention import LogRetention
+
+        monkeypatch.chdir(tmp_path)
+        for day in ("20240101", "20240108", "20240109", "20240110"):
+            self._touch(tmp_path, 1, day)
+        for day in ("20231230", "20240110"):
+            self._touch(tmp_path, 2, day)
+
+        retention = LogRetention(log_days=3, keep_count=1, budget_bytes=0, batch_size=1, pause_ms=0)
+        stats = retention.run_once(now=datetime(2024, 1, 10, 12, 0))
+
+        assert stats["files"] == 4
+        assert [f.day for f in retention.catalogue[1]] == ["20240110"]
+        assert [f.day for f in retention.catalogue[2]] == ["20240110"]
+        assert not (tmp_path / "runtime" / "jobs" / "2" / "202312").exists()
+
+    def test_catalogue_rescans_changed_months_only(self, tmp_path: Any, monkeypatch: Any) -> None:
+        """测试跨轮保留目录：只重扫当月和修改时间变化的月目录"""
+        import os
+        from datetime import datetime
+
+        from app.core import log_retention
+        from app.core.log_retention import LogRetention
+
+        monkeypatch.chdir(tmp_path)
+        old = self._touch(tmp_path, 1, "20231201").parent
+        self._touch(tmp_path, 1, "20240105")
+        os.utime(old, ns=(10**18, 10**18))
+        scanned = []
+        scan = log_retention.scan_month_days
+
+        def counting_scan(month_dir: str, month: str) -> Any:
+            scanned.append(month)
+            return scan(month_dir, month)
+
+        monkeypatch.setattr(log_retention, "scan_month_days", counting_scan)
+        retention = LogRetention(log_days=0, keep_count=0, budget_bytes=0, pause_ms=0)
+        now = datetime(2024, 1, 10)
+        retention.run_once(now=now)
+        assert sorted(scanned) == ["202312", "202401"]
+
+        scanned.clear()
+        retention.run_once(now=now)
+        assert scanned == ["202401"]
+
+        self._touch(tmp_path, 1, "20231202")
+        scanned.clear()
+        retention.run_once(now=now)
+        assert sorted(scanned) == ["202312", "202401"]
+        assert [f.day for f in retention.catalogue[1]] == ["20231201", "20231202", "20240105"]
+
+    def test_disk_budget_evicts_oldest(self, tmp_path: Any, monkeypatch: Any) -> None:
+        """测试超出磁盘预算时跨任务从最旧的日志开始淘汰"""
+        from datetime import datetime
+
+        from app.core.log_retention import LogRetention
+
+        monkeypatch.chdir(tmp_path)
+        old = self._touch(tmp_path, 1, "20240107", size=100)
+        older = self._touch(tmp_path, 2, "20240106", size=100)
+        kept = self._touch(tmp_path, 1, "20240108", size=100)
+        today = self._touch(tmp_path, 2, "20240110", size=100)
+
+        retention = LogRetention(log_days=0, keep_count=0, budget_bytes=250, pause_ms=0)
+        stats = retention.run_once(now=datetime(2024, 1, 10))
+
+        assert stats["budget_evicted"] == 2
+        assert not older.exists() and not old.exists()
+        assert kept.exists() and today.exists()
+
+
+class TestJobStats:
+    """任务执行统计测试"""
+
+    def test_window_summary_and_ring(self) -> None:
+        """测试时间窗口统计、环形缓冲覆盖和全量分位数"""
+        import time
+
+        from app.core.job_stats import JobStats
+
+        stats = JobStats(window_size=4, snapshot_path="unused.json")
+        now = time.time()
+        stats.record(1, 5000, False, now - 7200)
+        for duration in (100, 200, 300, 400):
+            stats.record(1, duration, duration != 400, now)
+
+        summary = stats.summary(1, window_seconds=3600)
+        assert summary["runs"] == 4
+        assert summary["failures"] == 1
+        assert summary["success_rate"] == 0.75
+        assert summary["p50_ms"] == 250
+        assert summary["lifetime"]["runs"] == 5
+        # 草图相对误差约1%
+        assert abs(summary["lifetime"]["p50_ms"] - 300) / 300 < 0.02
+        assert stats.summary(2) is None
+        # 窗口早于缓冲区中最早的记录且缓冲区已满：更早的执行已被覆盖，统计不完整
+        summary = stats.summary(1, window_seconds=3 * 3600)
+        assert summary["samples"] == 4 and summary["runs"] == 4
+        assert summary["truncated"] is True and summary["covered_since"] == now
+        stats.record(2, 100, True, now - 7200)
+        assert stats.summary(2, window_seconds=3 * 3600)["truncated"] is False
+
+    def test_snapshot_roundtrip(self, tmp_path: Any) -> None:
+        """测试快照保存后恢复"""
+        from app.core.job_stats import JobStats
+
+        path = str(tmp_path / "stats.json")
+        stats = JobStats(window_size=8, snapshot_path=path)
+        for duration in (10, 20, 30):
+            stats.record(3, duration, True)
+        assert stats.save() is True
+        # 没有新记录时不重复写入
+        assert stats.save() is False
+
+        restored = JobStats(window_size=8, snapshot_path=path)
+        assert restored.load() == 1
+        assert restored.summary(3) == stats.summary(3)
+
+
+class TestMetricsStore:
+    """执行指标时序存储测试"""
+
+    def test_append_and_query_buckets(self, tmp_path: Any) -> None:
+        """测试按分钟聚合次数、失败率和分位数，并按任务/模式过滤"""
+        from datetime import datetime
+
+        pytest.importorskip("numpy")
+        from app.core.metrics_store import MetricsStore
+
+        store = MetricsStore(base_dir=str(tmp_path / "metrics"))
+        base = datetime(2024, 1, 31, 23, 59).timestamp()
+        for i, duration in enumerate((10, 20, 30, 40)):
+            store.append(1, "http", duration, i != 3, 200, base + i)
+        store.append(2, "command", 500, True, 0, base + 30)
+        # 跨月写入新分区
+        store.append(1, "http", 99, False, 500, base + 61)
+        store.close()
+
+        rows = store.query(datetime(2024, 1, 31, 23, 59), datetime(2024, 2, 1, 0, 1), 60, job_id=1)
+        assert [r["count"] for r in rows] == [4, 1]
+        assert rows[0]["errors"] == 1 and rows[0]["error_rate"] == 0.25
+        assert rows[0]["p50_ms"] == 20 and rows[0]["p99_ms"] == 30
+        assert rows[1]["time"] == "2024-02-01 00:00:00"
+
+        rows = store.query(datetime(2024, 1, 31), datetime(2024, 2, 2), 86400, mode="command")
+        assert rows == [
+            {
+                "time": "2024-01-31 00:00:00",
+                "count": 1,
+                "errors": 0,
+                "error_rate": 0.0,
+                "mean_ms": 500.0,
+                "p50_ms": 500,
+                "p95_ms": 500,
+                "p99_ms": 500,
+            }
+        ]
+        assert (tmp_path / "metrics" / "202402" / "ts.col").stat().st_size == 8
+
+    def test_append_partial_write_repaired(self, tmp_path: Any) -> None:
+        """测试部分列写入失败后截断到完整记录"""
+        from datetime import datetime
+
+        pytest.importorskip("numpy")
+        from app.core.metrics_store import COLUMNS, MetricsStore
+
+        class BrokenFile:
+            def write(self, data: bytes) -> int:
+                raise OSError("disk full")
+
+            def flush(self) -> None:
+                pass
+
+            def close(self) -> None:
+                pass
+
+        store = MetricsStore(base_dir=str(tmp_path / "metrics"))
+        base = datetime(2024, 3, 1, 12, 0).timestamp()
+        store.append(1, "http", 10, True, 200, base)
+        store._handles["status"].close()
+        store._handles["status"] = BrokenFile()
+        with pytest.raises(OSError):
+            store.append(1, "http", 20, True, 200, base + 1)
+        store.append(1, "http", 30, False, 500, base + 2)
+        store.close()
+
+        month_dir = tmp_path / "metrics" / "202403"
+        sizes = {column: (month_dir / f"{column}.col").stat().st_size for column, _ in COLUMNS}
+        assert sizes == {"ts": 16, "job_id": 8, "duration_ms": 8, "status": 2, "mode": 2, "code": 8}
+        data = store.load(datetime(2024, 3, 1), datetime(2024, 3, 2))
+        assert data["duration_ms"].tolist() == [10, 30]
+
+    def test_forget_deleted_jobs(self, tmp_path: Any) -> None:
+        """测试删除任务在删除时刻之前的记录，删除后的记录和其他任务保留"""
+        from datetime import datetime
+
+        pytest.importorskip("numpy")
+        from app.core.metrics_store import MetricsStore
+
+        store = MetricsStore(base_dir=str(tmp_path / "metrics"))
+        base = datetime(2024, 3, 1, 12, 0).timestamp()
+        for i in range(4):
+            store.append(1 + i % 2, "http", i, True, 200, base + i)
+        store.append(1, "http", 99, True, 200, base + 100)
+
+        assert store.forget([1], before=base + 50) == 2
+        store.append(2, "http", 7, True, 200, base + 101)
+        data = store.load(datetime(2024, 3, 1), datetime(2024, 3, 2))
+        assert data["job_id"].tolist() == [2, 2, 1, 2]
+        assert data["duration_ms"].tolist() == [1, 3, 99, 7]
+        store.close()
+
+
+class TestOutputStore:
+    """执行输出去重测试"""
+
+    def test_dedupe_and_rehydrate(self, tmp_path: Any, monkeypatch: Any) -> None:
+        """测试重复输出只保存一次，读取时还原"""
+        import json
+        from datetime import datetime
+
+        from app.core.job_logger import JobLogger, read_job_log_records
+        from app.core.output_store import output_store
+
+        monkeypatch.chdir(tmp_path)
+        output_store.forget(31)
+        body = "健康检查正常 " * 100
+        job_logger = JobLogger(job_id=31, job_name="去重测试")
+        for i in range(3):
+            job_logger.write_text_log(
+                {"job_id": 31, "status": "成功", "duration_ms": i, "mode": "http", "result": body}
+            )
+        job_logger.write_text_log({"job_id": 31, "status": "成功", "result": "短输出"})
+        job_logger.close_all_handles()
+
+        now = datetime.now()
+        month_dir = tmp_path / "runtime" / "jobs" / "31" / now.strftime("%Y%m")
+        log_text = (month_dir / f"{now.day:02d}.log").read_text("utf-8")
+        lines = [json.loads(line) for line in log_text.splitlines()]
+        assert all(line["output"] == "" and line["output_ref"] for line in lines[:3])
+        assert lines[3]["output"] == "短输出" and "output_ref" not in lines[3]
+        assert (month_dir / "objects.pack").stat().st_size == len(body.encode("utf-8"))
+
+        output_store.forget(31)
+        records = read_job_log_records(31, now.strftime("%Y-%m-%d"))
+        assert [r["output"] for r in records] == [body, body, body, "短输出"]
+        assert "output_ref" not in records[0]
+
+    def test_dedupe_shared_storage(self, tmp_path: Any, monkeypatch: Any) -> None:
+        """测试共享存储时输出包放在共享段日目录下，不创建任务目录"""
+        from datetime import datetime
+
+        from app.config import Config
+        from app.core.job_logger import JobLogger, read_job_log_records
+        from app.core.log_store import shared_log_store
+        from app.core.output_store import output_store
+
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(Config, "JOB_LOG_STORAGE", "shared")
+        monkeypatch.setattr(Config, "JOB_LOG_OUTPUT_DEDUPE", True)
+        shared_log_store.close()
+        body = "共享去重输出 " * 100
+        for job_id in (33, 34):
+            job_logger = JobLogger(job_id=job_id, job_name="共享去重")
+            for i in range(2):
+                job_logger.write_text_log(
+                    {"job_id": job_id, "status": "成功", "duration_ms": i, "mode": "http", "result": body}
+                )
+            job_logger.close_all_handles()
+        shared_log_store.close()
+
+        now = datetime.now()
+        day_dir = tmp_path / "runtime" / "logstore" / now.strftime("%Y%m%d")
+        assert not list((tmp_path / "runtime" / "jobs").iterdir())
+        assert (day_dir / "objects.pack").stat().st_size == len(body.encode("utf-8"))
+
+        output_store.forget_day(now.strftime("%Y%m%d"))
+        records = read_job_log_records(34, now.strftime("%Y-%m-%d"))
+        assert [r["output"] for r in records] == [body, body]
+
+    def test_retention_removes_orphan_pack(self, tmp_path: Any, monkeypatch: Any) -> None:
+        """测试该月日志全部过期后删除输出包"""
+        from datetime import datetime
+
+        from app.core.log_retention import LogRetention
+        from app.core.output_store import OutputPack, _month_dir
+
+        monkeypatch.chdir(tmp_path)
+        OutputPack(_month_dir(32, "202312")).put(b"x" * 300)
+        OutputPack(_month_dir(32, "202401")).put(b"y" * 300)
+        (tmp_path / "runtime" / "jobs" / "32" / "202312" / "31.log").write_text("{}\n")
+        (tmp_path / "runtime" / "jobs" / "32" / "202401" / "10.log").write_text("{}\n")
+
+        retention = LogRetention(log_days=3, keep_count=0, budget_bytes=0, pause_ms=0)
+        stats = retention.run_once(now=datetime(2024, 1, 10))
+
+        assert stats["files"] == 1 and stats["packs"] == 1
+        assert not (tmp_path / "runtime" / "jobs" / "32" / "202312").exists()
+        assert (tmp_path / "runtime" / "jobs" / "32" / "202401" / "objects.pack").exists()
+
+
+class TestLogPolicy:
+    """日志采样策略测试"""
+
+    def _record(self, i: int, status: str = "成功") -> Any:
+        return {
+            "job_id": 41,
+            "job_name": "高频任务",
+            "status": status,
+            "duration_ms": i,
+            "output": f"ok{i}",
+        }
+
+    def test_sample_keeps_failures(self) -> None:
+        """测试1/N采样：失败全部保留，成功每N次保留1次"""
+        from app.core.log_policy import LogSampler
+
+        sampler = LogSampler()
+        kept = []
+        for i in range(10):
+            kept += sampler.filter(41, "sample:4", self._record(i, "失败" if i == 5 else "成功"))
+        assert [r["duration_ms"] for r in kept] == [0, 4, 5, 9]
+        assert kept[0]["sampled"] == 4 and "sampled" not in kept[2]
+
+    def test_aggregate_window_summary(self) -> None:
+        """测试按窗口汇总：窗口结束时写入一条汇总记录"""
+        from app.core.log_policy import AGGREGATE_STATUS, LogSampler
+
+        sampler = LogSampler()
+        for i, duration in enumerate((30, 10, 20)):
+            assert sampler.filter(41, "aggregate:60", self._record(duration), now=1000.0 + i) == []
+        records = sampler.filter(41, "aggregate:60", self._record(50), now=1061.0)
+        assert len(records) == 1
+        summary = records[0]
+        assert summary["status"] == AGGREGATE_STATUS
+        assert summary["output"] == "ok20"
+        assert summary["aggregate"]["count"] == 3
+        assert (summary["aggregate"]["min_ms"], summary["aggregate"]["max_ms"]) == (10, 30)
+        assert summary["aggregate"]["mean_ms"] == 20
+
+        remaining = sampler.flush_expired(force=True)
+        assert [s["aggregate"]["count"] for s in remaining] == [1]
+
+    def test_invalid_policy(self) -> None:
+        """测试策略格式校验"""
+        from app.models.fields import parse_log_policy
+
+        assert parse_log_policy(None) == ("always", 0)
+        assert parse_log_policy("aggregate:300") == ("aggregate", 300)
+        with pytest.raises(ValueError):
+            parse_log_policy("sample:0")
+
+
+class TestFailureJournal:
+    """全局失败日志测试"""
+
+    def test_ring_paging_and_recovery(self, tmp_path: Any) -> None:
+        """测试环形覆盖、内存外回退读文件、游标翻页和重启恢复"""
+        from app.core.failure_journal import FailureJournal
+
+        path = str(tmp_path / "failures.ring")
+        journal = FailureJournal(path=path, capacity=5, memory_size=2)
+        for i in range(1, 8):
+            mode = "http" if i % 2 else "command"
+            journal.append(i, f"任务{i}", mode, f"错误{i}", timestamp=1000.0 + i)
+
+        page = journal.query(limit=3)
+        assert [e["job_id"] for e in page["items"]] == [7, 6, 5]
+        page = journal.query(limit=3, cursor=page["next_cursor"])
+        # 只保留最近5条，更早的已被覆盖
+        assert [e["job_id"] for e in page["items"]] == [4, 3]
+        assert page["next_cursor"] is None
+        journal.close()
+
+        restored = FailureJournal(path=path, capacity=5, memory_size=2)
+        assert [e["job_id"] for e in restored.query(limit=10)["items"]] == [7, 6, 5, 4, 3]
+        entry = restored.append(8, "任务8", "http", "超时", timestamp=1010.0)
+        assert entry["seq"] == 8
+        restored.close()
+
+    def test_forget_deleted_jobs(self, tmp_path: Any) -> None:
+        """测试清除已删除任务的记录：内存和文件中都不再返回，删除后的新记录保留"""
+        from app.core.failure_journal import FailureJournal
+
+        path = str(tmp_path / "failures.ring")
+        journal = FailureJournal(path=path, capacity=8, memory_size=2)
+        for i in range(1, 7):
+            journal.append(1 + i % 2, f"任务{i}", "http", f"错误{i}", timestamp=1000.0 + i)
+        journal.append(2, "新任务", "http", "复用ID", timestamp=2000.0)
+
+        assert journal.forget([2], before=1500.0) == 3
+        items = journal.query(limit=10)["items"]
+        assert [(e["job_id"], e["error_msg"]) for e in items] == [
+            (2, "复用ID"),
+            (1, "错误6"),
+            (1, "错误4"),
+            (1, "错误2"),
+        ]
+        journal.close()
+
+        restored = FailureJournal(path=path, capacity=8, memory_size=2)
+        assert [e["seq"] for e in restored.query(limit=10)["items"]] == [7, 6, 4, 2]
+        assert restored.append(3, "任务8", "http", "超时")["seq"] == 8
+        restored.close()
+
+    def test_oversized_entry(self, tmp_path: Any) -> None:
+        """测试名称和标签都取最大长度时截断字段写入完整JSON，无法解析的槽位不影响翻页"""
+        from app.core.failure_journal import _HEADER, SLOT_SIZE, FailureJournal
+
+        path = str(tmp_path / "failures.ring")
+        journal = FailureJournal(path=path, capacity=5, memory_size=1)
+        journal.append(1, "任务1", "http", "错误1", timestamp=1001.0)
+        tags = ["标签" * 20 + str(i) for i in range(6)]
+        journal.append(2, "名" * 100, "command", "错" * 500, output="出" * 200, tags=tags)
+        journal.append(3, "任务3", "http", "错误3", timestamp=1003.0)
+        journal.close()
+
+        restored = FailureJournal(path=path, capacity=5, memory_size=1)
+        items = restored.query(limit=10)["items"]
+        assert [e["job_id"] for e in items] == [3, 2, 1]
+        assert items[1]["output"] == "" and items[1]["error_msg"] == ""
+        assert items[1]["job_name"].startswith("名")
+        restored.close()
+
+        # 损坏第2条的槽位，更早的记录仍可翻到
+        with open(path, "r+b") as fh:
+            fh.seek(_HEADER.size + 2 * SLOT_SIZE + 30)
+            fh.write(b"\xff\xfe")
+        restored = FailureJournal(path=path, capacity=5, memory_size=1)
+        assert [e["job_id"] for e in restored.query(limit=10)["items"]] == [3, 1]
+        restored.close()
+
+    def test_filters(self, tmp_path: Any) -> None:
+        """测试按模式、错误内容、标签和时间过滤"""
+        from app.core.failure_journal import FailureJournal
+
+        journal = FailureJournal(path=str(tmp_path / "failures.ring"), capacity=10)
+        journal.append(1, "订单同步", "http", "连接超时", tags=["订单"], timestamp=1000.0)
+        journal.append(2, "清理", "command", "退出码: 1", tags=["运维"], timestamp=2000.0)
+        journal.append(3, "对账", "http", "HTTP 500", tags=["订单", "核心"], timestamp=3000.0)
+
+        def ids(**kwargs: Any) -> Any:
+            return [e["job_id"] for e in journal.query(**kwargs)["items"]]
+
+        assert ids(mode="http") == [3, 1]
+        assert ids(keyword="超时") == [1]
+        assert ids(tag="订单") == [3, 1]
+        assert ids(since=1500.0) == [3, 2]
+        journal.close()
+
+
+class TestLogSink:
+    """日志投递测试（本地监听模拟集中日志系统）"""
+
+    def test_udp_and_syslog(self) -> None:
+        """测试UDP报文和syslog格式"""
+        import json
+        import socket
+
+        from app.core.log_sink import LogShipper, create_sink
+
+        server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        server.bind(("127.0.0.1", 0))
+        server.settimeout(5)
+        port = server.getsockname()[1]
+        try:
+            shipper = LogShipper(create_sink(f"udp://127.0.0.1:{port}"), flush_ms=10)
+            shipper.submit({"job_id": 1, "status": "成功"})
+            assert json.loads(server.recv(65535)) == {"job_id": 1, "status": "成功"}
+            shipper.close()
+
+            shipper = LogShipper(create_sink(f"syslog://127.0.0.1:{port}"), flush_ms=10)
+            shipper.submit({"job_id": 2, "status": "失败"})
+            message = server.recv(65535).decode("utf-8")
+            # local0.err
+            assert message.startswith("<131>1 ")
+            assert message.endswith('{"job_id": 2, "status": "失败"}')
+            shipper.close()
+        finally:
+            server.close()
+
+    def test_tcp_reconnect(self) -> None:
+        """测试TCP NDJSON投递在采集端重启后重连并补发"""
+        import json
+        import socket
+        import time
+
+        from app.core.log_sink import LogShipper, TCPSink
+
+        probe = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+        probe.close()
+        # 采集端尚未监听，首次发送失败
+        shipper = LogShipper(TCPSink("127.0.0.1", port), flush_ms=10, retry_min=0.05)
+        shipper.submit({"job_id": 1})
+        shipper.submit({"job_id": 2})
+        deadline = time.time() + 5
+        while shipper.stats["errors"] == 0 and time.time() < deadline:
+            time.sleep(0.01)
+
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind(("127.0.0.1", port))
+        listener.listen(1)
+        listener.settimeout(5)
+        conn, _ = listener.accept()
+        conn.settimeout(5)
+        data = b""
+        while data.count(b"\n") < 2:
+            data += conn.recv(65535)
+        assert [json.loads(line)["job_id"] for line in data.splitlines()] == [1, 2]
+        shipper.close()
+        assert shipper.stats["errors"] >= 1 and shipper.stats["sent"] == 2
+        conn.close()
+        listener.close()
+
+    def test_drop_policy(self) -> None:
+        """测试队列满时的丢弃策略（发送线程阻塞在 send_batch 中，队列必然写满）"""
+        import threading
+
+        from app.core.log_sink import LogShipper, LogSink
+
+        class BlockingSink(LogSink):
+            def __init__(self) -> None:
+                self.entered = threading.Event()
+                self.release = threading.Event()
+                self.sent: list = []
+
+            def send_batch(self, records: Any) -> None:
+                self.entered.set()
+                assert self.release.wait(5)
+                self.sent.extend(record["i"] for record in records)
+
+        for policy, expected_results, expected_sent in (
+            ("drop_newest", [True, True, False, False], [0, 1, 2]),
+            ("drop_oldest", [True, True, True, True], [0, 3, 4]),
+        ):
+            sink = BlockingSink()
+            shipper = LogShipper(sink, queue_size=2, batch_size=1, drop_policy=policy)
+            assert shipper.submit({"i": 0})
+            # 第一条已被发送线程取走并阻塞，之后的记录只能留在队列中
+            assert sink.entered.wait(5)
+            results = [shipper.submit({"i": i}) for i in range(1, 5)]
+            assert results == expected_results
+            assert shipper.stats["dropped"] == 2
+            sink.release.set()
+            shipper.close()
+            assert sink.sent == expected_sent
+
+        with pytest.raises(ValueError):
+            LogShipper(BlockingSink(), drop_policy="block")
+        with pytest.raises(TypeError):
+            LogSink()  # type: ignore[abstract]
+
+    def test_udp_truncates_output(self) -> None:
+        """测试超长记录截短输出字段后仍是完整JSON"""
+        import json
+
+        from app.core.log_sink import UDP_MAX_PAYLOAD, UDPSink
+
+        sink = UDPSink("127.0.0.1", 9)
+        record = {"job_id": 1, "status": "成功", "output": "输出\n" * 40000}
+        payload = sink._fit(record)
+        assert payload is not None and len(payload) <= UDP_MAX_PAYLOAD
+        decoded = json.loads(payload)
+        assert decoded["job_id"] == 1 and decoded["output"].endswith("...")
+        assert len(record["output"]) == 120000
+        assert sink._fit({"job_id": 1, "command": "x" * UDP_MAX_PAYLOAD}) is None
+
+
+class TestJobStateCounters:
+    """任务状态计数测试"""
+
+    def test_reconcile_keeps_concurrent_adjust(self) -> None:
+        """测试校准查询期间的增量叠加到查询结果上，校准后读取不再查询"""
+        import asyncio
+
+        from sqlalchemy import create_engine, text
+        from sqlalchemy.orm import Session
+
+        from app.core.job_counters import JobStateCounters
+
+        counters = JobStateCounters(reconcile_seconds=30)
+
+        class Result:
+            def all(self) -> list:
+                return [(0, 3), (1, 2)]
+
+        class SlowSession:
+            def execute(self, query: Any) -> Result:
+                # 查询期间提交：新增一个运行中任务、停止一个运行中任务
+                with Session(create_engine("sqlite://")) as writer:
+                    writer.execute(text("SELECT 1"))
+                    writer.commit()
+                counters.adjust(None, 1)
+                counters.adjust(1, 2)
+                return Result()
+
+        class FailingSession:
+            async def execute(self, query: Any) -> Any:
+                raise AssertionError("已校准时不应查询数据库")
+
+        assert counters.reconcile_sync(SlowSession()) == {0: 3, 1: 2, 2: 1}
+        assert counters._pending == []
+        counters.adjust(0, 1)
+        assert asyncio.run(counters.summary(FailingSession())) == {
+            "total": 6,
+            "running": 3,
+            "waiting": 2,
+            "stopped": 1,
+        }
+
+    def test_reconcile_skips_committed_before_query(self) -> None:
+        """测试查询开始前已提交、查询之后才调用 adjust 的变更不重复叠加"""
+        from sqlalchemy import create_engine, text
+        from sqlalchemy.orm import Session
+
+        from app.core.job_counters import JobStateCounters
+
+        counters = JobStateCounters(reconcile_seconds=30)
+        with Session(create_engine("sqlite://")) as writer:
+            writer.execute(text("SELECT 1"))
+            writer.commit()
+
+        class Result:
+            def all(self) -> list:
+                # 查询结果已包含上面提交的新任务
+                return [(0, 4)]
+
+        class SlowSession:
+            def execute(self, query: Any) -> Result:
+                counters.adjust(None, 0)
+                return Result()
+
+        assert counters.reconcile_sync(SlowSession()) == {0: 4}
+
+
+class TestJobArchiver:
+    """任务归档测试"""
+
+    def test_pass_continues_after_skipped_candidates(self, monkeypatch: Any) -> None:
+        """测试一批候选全部不再满足条件时继续扫描后续批次"""
+        from app.core import job_archive
+        from app.core.job_archive import JobArchiver
+
+        batches = [([1, 2], {}), ([3, 4], {3: 2, 4: 2}), ([5], {5: 2})]
+        calls = []
+
+        def fake_batch(db: Any, cutoff: Any, after_id: int, batch_size: int) -> Any:
+            calls.append(after_id)
+            return batches[len(calls) - 1]
+
+        monkeypatch.setattr(job_archive, "archive_batch", fake_batch)
+        monkeypatch.setattr(job_archive, "forget_jobs", lambda states: None)
+        archiver = JobArchiver(after_days=1, batch_size=2, pause_ms=0)
+        assert archiver.run_once(db=object()) == 3
+        assert calls == [0, 2, 4]